@@ -0,0 +1,354 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+import contextlib
+import multiprocessing
+from datetime import datetime
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+
+try:
+    import resource
+except ImportError:  # Windows: sin ru_maxrss
+    resource = None
+
+# el tablero se dibuja sobre una superficie en memoria, sin abrir ventana
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+RUTA_GEOZ = os.path.join(CARPETA, "GeoZ Definitivo.py")
+RUTA_GEOZ_V1 = os.path.join(CARPETA, "GeoZ v1 definitivo.0")
+
+FORMATO_RESULTADOS = 1
+# métricas donde un valor mayor es mejor; en el resto (tiempos, memoria, bytes) mejor cuanto menor
+METRICAS_MAYOR_MEJOR = {"turnos_por_segundo"}
+# por debajo de esto las diferencias de tiempo son sobre todo ruido del sistema
+TIEMPO_MINIMO_COMPARABLE = 0.002
+
+#----------C A S O S----------
+# (tipo, motor, ancho del tablero cuadrado, población total)
+CASOS = {
+    "rapida": [
+        ("turnos", "objetos", 50, 100),
+        ("turnos", "objetos", 100, 1000),
+        ("turnos", "vectorizado", 200, 10000),
+        ("persistencia", "objetos", 50, 100),
+        ("persistencia", "objetos", 100, 1000),
+        ("dibujo", "objetos", 50, 100),
+        ("dibujo", "objetos", 100, 1000),
+    ],
+    "completa": [
+        ("turnos", "objetos", 50, 100),
+        ("turnos", "objetos", 100, 1000),
+        ("turnos", "objetos", 250, 10000),
+        ("turnos", "objetos", 500, 100000),
+        ("turnos", "objetos", 2000, 100000),
+        ("turnos", "vectorizado", 50, 100),
+        ("turnos", "vectorizado", 250, 10000),
+        ("turnos", "vectorizado", 500, 100000),
+        ("turnos", "vectorizado", 1000, 300000),
+        ("turnos", "vectorizado", 2000, 1000000),
+        ("persistencia", "objetos", 50, 100),
+        ("persistencia", "objetos", 100, 1000),
+        ("persistencia", "objetos", 250, 10000),
+        ("persistencia", "objetos", 500, 100000),
+        ("dibujo", "objetos", 50, 100),
+        ("dibujo", "objetos", 100, 1000),
+        ("dibujo", "objetos", 250, 10000),
+        ("dibujo", "objetos", 500, 100000),
+    ],
+}
+# reparto de civiles por rol del escenario predeterminado (normales, atacantes, defensores, productores, científicos, médicos)
+PESOS_ROLES = (10, 5, 3, 4, 2, 3)
+FRACCION_CIVILES = 0.3
+
+
+def nombre_caso(tipo:str, motor:str, ancho:int, poblacion:int):
+    return f"{tipo}/{motor}/{ancho}x{ancho}/{poblacion}"
+
+
+def cargar_modulo(ruta:str, nombre:str):
+    """Importa un script del proyecto por ruta (los nombres llevan espacios y el v1 no termina en .py)."""
+    cargador = SourceFileLoader(nombre, ruta)
+    modulo = module_from_spec(spec_from_loader(nombre, cargador))
+    sys.modules[nombre] = modulo
+    cargador.exec_module(modulo)
+    return modulo
+
+
+def rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devuelve KiB y macOS bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def repartir(total:int, pesos):
+    cantidades = [total * p // sum(pesos) for p in pesos]
+    cantidades[0] += total - sum(cantidades)
+    return cantidades
+
+
+def construir_escenario(escenario, poblacion:int):
+    """Tablero cuadrado con la misma disposición que el predeterminado, escalada, usando definir_*/poblar_*."""
+    lado = escenario.ancho
+    ciudad = max(1, lado // 3)
+    inicio_ciudad = (lado - ciudad) // 2
+    escenario.definir_ciudad(inicio_ciudad, inicio_ciudad, ciudad, ciudad)
+    escenario.definir_lago(lado // 10, lado // 10, max(1, lado // 8), max(1, lado // 8))
+    escenario.definir_rio(lado // 7, lado * 2 // 7, lado * 3 // 5, max(1, lado // 25))
+    escenario.definir_bosque(lado // 10, lado * 2 // 5, max(1, lado // 6), max(1, lado // 6))
+    escenario.definir_bosque(lado * 7 // 10, lado // 10, max(1, lado // 5), max(1, lado // 5))
+
+    civiles = int(poblacion * FRACCION_CIVILES)
+    escenario.poblar_ciudad(*repartir(civiles, PESOS_ROLES), inicio_ciudad, inicio_ciudad, ciudad, ciudad)
+    # los zombis van con poblar_zona_zombie: definir_zona_zombie añade 4 por celda y no dejaría fijar la población
+    zona = max(1, lado // 10)
+    esquinas = [(0, 0), (lado - zona, 0), (0, lado - zona), (lado - zona, lado - zona)]
+    for (x, y), cantidad in zip(esquinas, repartir(poblacion - civiles, (1, 1, 1, 1))):
+        escenario.poblar_zona_zombie(cantidad, x, y, zona, zona)
+    return escenario
+
+
+def cronometrar_turnos(escenario, turnos_min:int, turnos_max:int, segundos_min:float):
+    """Simula turnos hasta superar `segundos_min` (entre turnos_min y turnos_max) tras un turno de calentamiento."""
+    escenario.simular_turno()
+    duraciones = []
+    inicio = time.perf_counter()
+    while len(duraciones) < turnos_max:
+        t0 = time.perf_counter()
+        escenario.simular_turno()
+        duraciones.append(time.perf_counter() - t0)
+        if len(duraciones) >= turnos_min and time.perf_counter() - inicio >= segundos_min:
+            break
+    total = sum(duraciones)
+    return {
+        "turnos": len(duraciones),
+        "turnos_por_segundo": len(duraciones) / total if total > 0 else float("inf"),
+        "segundos_por_turno_mediana": statistics.median(duraciones),
+    }
+
+#----------M E D I C I O N E S----------
+def medir_turnos(motor:str, ancho:int, poblacion:int, semilla:int, opciones:dict):
+    geoz = cargar_modulo(RUTA_GEOZ, "geoz")
+    t0 = time.perf_counter()
+    if motor == "vectorizado":
+        civiles = int(poblacion * FRACCION_CIVILES)
+        escenario = geoz.crear_escenario_vectorizado_masivo(ancho, ancho, civiles, poblacion - civiles, semilla=semilla)
+    else:
+        escenario = construir_escenario(geoz.Escenario(ancho, ancho, semilla=semilla), poblacion)
+    metricas = {"segundos_construccion": time.perf_counter() - t0}
+    metricas.update(cronometrar_turnos(escenario, opciones["turnos_min"], opciones["turnos_max"], opciones["segundos_min"]))
+    return metricas
+
+
+def medir_persistencia(motor:str, ancho:int, poblacion:int, semilla:int, opciones:dict):
+    """Guardado y carga de un slot con la Persistencia (formato columnar) del v1."""
+    v1 = cargar_modulo(RUTA_GEOZ_V1, "geoz_v1")
+    random.seed(semilla)
+    escenario = construir_escenario(v1.Escenario(ancho, ancho), poblacion)
+    jugador = v1.Jugador(posicion_x=ancho // 2, posicion_y=ancho // 2)
+    escenario.agregar_personaje(jugador)
+    guardados, cargas = [], []
+    with tempfile.TemporaryDirectory() as carpeta, contextlib.redirect_stdout(io.StringIO()):
+        persistencia = v1.Persistencia(carpeta)
+        for _ in range(opciones["repeticiones"]):
+            t0 = time.perf_counter()
+            if not persistencia.guarda_slot(0, escenario, jugador):
+                raise RuntimeError("guarda_slot falló")
+            guardados.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            cargado, _ = persistencia.rescatar_slot(0)
+            cargas.append(time.perf_counter() - t0)
+            if cargado is None:
+                raise RuntimeError("rescatar_slot falló")
+        bytes_archivo = os.path.getsize(persistencia.nombre_slot(0))
+    return {
+        "segundos_guardado": statistics.median(guardados),
+        "segundos_carga": statistics.median(cargas),
+        "bytes_archivo": bytes_archivo,
+    }
+
+
+def medir_dibujo(motor:str, ancho:int, poblacion:int, semilla:int, opciones:dict):
+    """Tiempo de Vista.dibujar_escenario sobre una superficie fuera de pantalla."""
+    geoz = cargar_modulo(RUTA_GEOZ, "geoz")
+    pygame = geoz.cargar_pygame()
+    pygame.init()
+    escenario = construir_escenario(geoz.Escenario(ancho, ancho, semilla=semilla), poblacion)
+    jugador = geoz.Jugador(posicion_x=ancho // 2, posicion_y=ancho // 2)
+    escenario.agregar_personaje(jugador)
+    celda = max(1, 1000 // ancho)
+
+    # Vista sin ventana ni bucle de eventos: solo lo que usa dibujar_escenario
+    vista = geoz.Vista.__new__(geoz.Vista)
+    vista.escenario = escenario
+    vista.jugador = jugador
+    vista.ventana = pygame.Surface((ancho * celda, ancho * celda))
+    t0 = time.perf_counter()
+    vista.renderizador = geoz.RenderizadorEscenario(escenario, jugador, celda, celda)
+    segundos_capa = time.perf_counter() - t0
+    vista.overlay_perfil = geoz.OverlayPerfil(vista.renderizador)
+
+    completos, incrementales = [], []
+    for _ in range(opciones["repeticiones"]):
+        t0 = time.perf_counter()
+        vista.dibujar_escenario(completo=True)
+        completos.append(time.perf_counter() - t0)
+        escenario.simular_turno()
+        t0 = time.perf_counter()
+        vista.dibujar_escenario()
+        incrementales.append(time.perf_counter() - t0)
+    pygame.quit()
+    return {
+        "segundos_capa_terreno": segundos_capa,
+        "segundos_frame_completo": statistics.median(completos),
+        "segundos_frame_incremental": statistics.median(incrementales),
+    }
+
+
+MEDICIONES = {"turnos": medir_turnos, "persistencia": medir_persistencia, "dibujo": medir_dibujo}
+
+
+def _ejecutar_caso(conexion, caso, semilla, opciones):
+    # proceso hijo: el pico de RSS medido es solo el de este caso
+    try:
+        tipo, motor, ancho, poblacion = caso
+        metricas = MEDICIONES[tipo](motor, ancho, poblacion, semilla, opciones)
+        metricas["rss_pico_mb"] = rss_pico_mb()
+        conexion.send(("ok", metricas))
+    except Exception as e:
+        conexion.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conexion.close()
+
+
+def correr_caso(caso, semilla:int, opciones:dict):
+    """Mide un caso en un proceso nuevo (spawn) y devuelve sus métricas o lanza RuntimeError."""
+    contexto = multiprocessing.get_context("spawn")
+    receptor, emisor = contexto.Pipe(duplex=False)
+    proceso = contexto.Process(target=_ejecutar_caso, args=(emisor, caso, semilla, opciones))
+    proceso.start()
+    emisor.close()
+    try:
+        estado, datos = receptor.recv()
+    except EOFError:
+        estado, datos = "error", "el proceso terminó sin resultados"
+    proceso.join()
+    if estado != "ok":
+        raise RuntimeError(f"{nombre_caso(*caso)}: {datos}")
+    return datos
+
+#----------R E S U L T A D O S----------
+def entorno():
+    import numpy
+    datos = {
+        "python": platform.python_version(),
+        "implementacion": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+        "numpy": numpy.__version__,
+    }
+    try:
+        import pygame
+        datos["pygame"] = pygame.version.ver
+    except ImportError:
+        datos["pygame"] = None
+    return datos
+
+
+def comparar(resultados:dict, base:dict, tolerancia:float):
+    """Devuelve la lista de regresiones (caso, métrica, base, actual, cambio relativo) frente a `base`."""
+    casos_base = {caso["nombre"]: caso["metricas"] for caso in base.get("casos", [])}
+    regresiones = []
+    for caso in resultados["casos"]:
+        anteriores = casos_base.get(caso["nombre"])
+        if anteriores is None:
+            continue
+        for metrica, actual in caso["metricas"].items():
+            anterior = anteriores.get(metrica)
+            if not isinstance(actual, (int, float)) or not isinstance(anterior, (int, float)) or anterior <= 0:
+                continue
+            if metrica == "turnos" or metrica.startswith("bytes_"):
+                continue  # dependen de la duración de la corrida o del formato, no del rendimiento
+            if metrica.startswith("segundos_") and max(anterior, actual) < TIEMPO_MINIMO_COMPARABLE:
+                continue
+            cambio = (actual - anterior) / anterior
+            if metrica in METRICAS_MAYOR_MEJOR:
+                cambio = -cambio
+            if cambio > tolerancia:
+                regresiones.append((caso["nombre"], metrica, anterior, actual, cambio))
+    return regresiones
+
+
+def correr_benchmark(escala:str="rapida", semilla:int=0, opciones:dict=None, tipos=None):
+    opciones = dict({"turnos_min": 3, "turnos_max": 200, "segundos_min": 1.0, "repeticiones": 5}, **(opciones or {}))
+    resultados = {
+        "formato": FORMATO_RESULTADOS,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "escala": escala,
+        "semilla": semilla,
+        "opciones": opciones,
+        "entorno": entorno(),
+        "casos": [],
+    }
+    for caso in CASOS[escala]:
+        if tipos and caso[0] not in tipos:
+            continue
+        nombre = nombre_caso(*caso)
+        t0 = time.perf_counter()
+        try:
+            metricas = correr_caso(caso, semilla, opciones)
+        except RuntimeError as e:
+            print(f"[Benchmark] {e}")
+            resultados["casos"].append({"nombre": nombre, "error": str(e).split(": ", 1)[-1], "metricas": {}})
+            continue
+        resultados["casos"].append({"nombre": nombre, "tipo": caso[0], "motor": caso[1], "ancho": caso[2],
+                                    "poblacion": caso[3], "metricas": metricas})
+        resumen = ", ".join(f"{k}={v:.4g}" for k, v in metricas.items() if isinstance(v, (int, float)))
+        print(f"[Benchmark] {nombre} ({time.perf_counter() - t0:.1f}s): {resumen}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de GeoZ: turnos/s, memoria, guardado/carga y dibujo por tamaño")
+    parser.add_argument("--escala", choices=sorted(CASOS), default="rapida", help="conjunto de casos a medir")
+    parser.add_argument("--tipos", nargs="+", choices=sorted(MEDICIONES), help="medir solo estos tipos de caso")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla de todos los escenarios")
+    parser.add_argument("--segundos", type=float, default=1.0, help="tiempo mínimo simulando en cada caso de turnos")
+    parser.add_argument("--repeticiones", type=int, default=5, help="repeticiones de guardado/carga y de dibujo (se usa la mediana)")
+    parser.add_argument("--salida", default="benchmark_resultados.json", help="archivo JSON de resultados")
+    parser.add_argument("--base", help="resultados de referencia; si no existe se crea con esta corrida")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="empeoramiento relativo admitido frente a la base")
+    args = parser.parse_args()
+
+    resultados = correr_benchmark(args.escala, args.semilla, {"segundos_min": args.segundos, "repeticiones": args.repeticiones},
+                                  args.tipos)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=1)
+    print(f"[Benchmark] resultados en {args.salida}")
+
+    if args.base:
+        if not os.path.exists(args.base):
+            with open(args.base, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, indent=1)
+            print(f"[Benchmark] no había base: se guarda esta corrida en {args.base}")
+        else:
+            with open(args.base, encoding="utf-8") as f:
+                base = json.load(f)
+            regresiones = comparar(resultados, base, args.tolerancia)
+            for nombre, metrica, anterior, actual, cambio in regresiones:
+                print(f"[Regresión] {nombre} {metrica}: {anterior:.4g} -> {actual:.4g} ({cambio:+.0%} peor)")
+            if regresiones:
+                sys.exit(1)
+            print(f"[Benchmark] sin regresiones frente a {args.base} (tolerancia {args.tolerancia:.0%})")
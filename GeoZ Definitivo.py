@@ -1,8 +1,35 @@
-import pygame
+import csv
+import json
 import math
+import os
+import struct
+import sys
 import time
+import zlib
+import copy
+import argparse
+import multiprocessing
+from array import array
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+from enum import IntEnum
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+# pygame se importa al abrir la Vista; el modo headless no lo necesita
+pygame = None
+
+def cargar_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as modulo_pygame
+        pygame = modulo_pygame
+    return pygame
 
 class Recurso:
+    __slots__ = ("tipo", "cantidad", "posicion_x", "posicion_y")
+
     def __init__(self, tipo:str, cantidad:int, posicion_x:int, posicion_y:int):
         self.tipo = tipo
         self.cantidad = cantidad
@@ -10,7 +37,14 @@ class Recurso:
         self.posicion_y = posicion_y
 
 class Personaje:
+    # sin __dict__ por instancia: con cientos de miles de personajes la diferencia es de cientos de MB
+    __slots__ = ("_celda", "vida", "ataque", "defensa", "velocidad", "categoria", "habilidad", "_estado", "_con_vida",
+                 "posicion_x", "posicion_y", "_efectos", "_inventario", "id")
+    familia = None
+    inventario_inicial = ()  # se copia a una lista propia la primera vez que se usa el inventario
+
     def __init__(self, vida:int, ataque:int, defensa:float, velocidad:float, categoria:str, habilidad:str, estado:bool, posicion_x:int, posicion_y:int, con_vida:bool=True):
+        self._celda = None  # celda que lleva los contadores de este personaje
         self.vida = vida
         self.ataque = ataque
         self.defensa = defensa
@@ -21,36 +55,112 @@ class Personaje:
         self.con_vida = con_vida
         self.posicion_x = posicion_x
         self.posicion_y = posicion_y
-        self.efectos = {}
-        self.inventario = []
+        self._efectos = None  # dict creado al primer uso; la mayoría de personajes nunca tiene efectos
+        self._inventario = None
+        self.id = None  # lo asigna el RegistroPersonajes del escenario
+
+    @property
+    def efectos(self):
+        efectos = self._efectos
+        if efectos is None:
+            efectos = self._efectos = {}
+        return efectos
+
+    @efectos.setter
+    def efectos(self, valor):
+        self._efectos = valor
+
+    @property
+    def inventario(self):
+        inventario = self._inventario
+        if inventario is None:
+            inventario = self._inventario = list(self.inventario_inicial)
+        return inventario
+
+    @inventario.setter
+    def inventario(self, valor):
+        self._inventario = valor
+
+    # estado y con_vida avisan a la celda para mantener sus contadores de sanos/infectados/zombis
+    @property
+    def estado(self):
+        return self._estado
+
+    @estado.setter
+    def estado(self, valor):
+        self._actualizar_conteo("_estado", valor)
+
+    @property
+    def con_vida(self):
+        return self._con_vida
+
+    @con_vida.setter
+    def con_vida(self, valor):
+        self._actualizar_conteo("_con_vida", valor)
+
+    def _actualizar_conteo(self, atributo:str, valor):
+        celda = self._celda
+        if celda is None:
+            setattr(self, atributo, valor)
+            return
+        antes = self.clave_conteo()
+        setattr(self, atributo, valor)
+        despues = self.clave_conteo()
+        if antes != despues:
+            celda.reclasificar(self, antes, despues)
+
+    def clave_conteo(self):
+        """Contador de la celda en el que entra el personaje ("sano", "infectado", "zombi" o None)."""
+        return None
 
     def mover_aleatorio(self, escenario):
-        import random
-        dx = random.choice([-1, 0, 1])
-        dy = random.choice([-1, 0, 1])
-        nuevo_x = self.posicion_x + dx
-        nuevo_y = self.posicion_y + dy
-
-        if 0 <= nuevo_x < escenario.ancho and 0 <= nuevo_y < escenario.alto:
-            escenario.tablero[self.posicion_x][self.posicion_y].entidades.remove(self)
-            self.posicion_x = nuevo_x
-            self.posicion_y = nuevo_y
-            escenario.tablero[nuevo_x][nuevo_y].entidades.append(self)
+        dx, dy = escenario.aleatorio_movimiento.desplazamiento()
+        escenario.mover_personaje(self, self.posicion_x + dx, self.posicion_y + dy)
+
+    def mover_hacia(self, escenario, clave:str, excluir_propia:bool=False):
+        """Un paso hacia la celda más cercana con `clave` (ver IndiceEspacial).
+
+        Sin índice espacial en el escenario o sin objetivo dentro del radio de búsqueda, paso aleatorio.
+        """
+        indice = escenario.indice
+        if indice is not None:
+            x, y = self.posicion_x, self.posicion_y
+            objetivo = indice.mas_cercano(x, y, clave, escenario.radio_busqueda, self._celda if excluir_propia else None)
+            if objetivo is not None:
+                dx = (objetivo.posicion_x > x) - (objetivo.posicion_x < x)
+                dy = (objetivo.posicion_y > y) - (objetivo.posicion_y < y)
+                escenario.mover_personaje(self, x + dx, y + dy)
+                return
+        self.mover_aleatorio(escenario)
+
+    def mover_en_turno(self, escenario):
+        """Movimiento de simular_turno con movimiento dirigido activo; cada rol elige su objetivo."""
+        self.mover_aleatorio(escenario)
 
     def actuar(self, escenario):
         pass
 
 #----------C I V I L E S----------
 class Civil(Personaje):
+    __slots__ = ("energia", "turnos_infeccion", "infectado_por")
+    familia = "civiles"  # subconjunto de Celda en el que se guarda
+
     def __init__(self, vida:int, ataque:int, defensa:float, velocidad:float, categoria:str, habilidad:str, estado:bool, energia:int, posicion_x:int, posicion_y:int, con_vida:bool=True):
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, posicion_x, posicion_y, con_vida)
         self.energia = energia
         self.estado = estado
         self.turnos_infeccion = None
+        self.infectado_por = None  # color del zombi que lo infectó
 
-    def infectar(self):
+    def clave_conteo(self):
+        if not self.con_vida:
+            return None
+        return "infectado" if self.estado else "sano"
+
+    def infectar(self, color:str=None):
         self.estado = True
         self.turnos_infeccion = 3
+        self.infectado_por = color
 
     def morir(self):
         self.con_vida = False
@@ -63,17 +173,20 @@ class Civil(Personaje):
             if self.turnos_infeccion <= 0:
                 self.morir()
 
-        for efecto in list(self.efectos.keys()):
-            self.efectos[efecto] -= 1
-            if self.efectos[efecto] <= 0:
-                del self.efectos[efecto]
+        efectos = self._efectos
+        if efectos:
+            for efecto in list(efectos):
+                efectos[efecto] -= 1
+                if efectos[efecto] <= 0:
+                    del efectos[efecto]
 
 class Civil_Normal(Civil):
+    __slots__ = ()
+
     def __init__(self, vida:int=100, ataque:int=5, defensa:float=None, velocidad:float=2.5, categoria:str="Civil Normal", habilidad:str="Sobrevivir", estado:bool=False, energia:int=50, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.1
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = []
 
     def actuar(self, escenario):
         if not self.con_vida:
@@ -82,35 +195,38 @@ class Civil_Normal(Civil):
         self.avanzar_turno()
 
 class Atacante(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Espada",)
+
     def __init__(self, vida:int=100, ataque:int=40, defensa:float=None, velocidad:float=5.0, categoria:str="Atacante", habilidad:str="Esquivar", estado:bool=False, energia:int=100, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.2
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Espada"]
 
     def esquivar(self):
         self.efectos["esquivando"] = 5
 
     def mover_hacia_zombi(self, escenario):
-        self.mover_aleatorio(escenario)
+        self.mover_hacia(escenario, "zombi")
+
+    mover_en_turno = mover_hacia_zombi
 
     def atacar(self, escenario):
         x = self.posicion_x
         y = self.posicion_y
         celda = escenario.tablero[x][y]
-        for entidad in list(celda.entidades):
-            if isinstance(entidad, Zombie) and entidad.con_vida:
+        if not celda.zombies_vivos:
+            return None
+        for entidad in list(celda.zombies):
+            if entidad.con_vida:
                 daño = max(0, self.ataque - entidad.defensa)
                 entidad.vida -= daño
                 killed = False
                 if entidad.vida <= 0:
                     entidad.con_vida = False
-                    if entidad in celda.entidades:
-                        celda.entidades.remove(entidad)
-                    if entidad in escenario.personajes:
-                        escenario.personajes.remove(entidad)
+                    escenario.eliminar_personaje(entidad)
                     killed = True
-                return (entidad.__class__.__name__, daño, killed, (x, y))
+                return (entidad.__class__.__name__, daño, killed, (x, y), entidad.id)
         return None
 
     def actuar(self, escenario):
@@ -121,17 +237,23 @@ class Atacante(Civil):
         self.avanzar_turno()
 
 class Defensor(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Escudo",)
+
     def __init__(self, vida:int=100, ataque:int=20, defensa:float=None, velocidad:float=3.5, categoria:str="Defensor", habilidad:str="Bloqueo", estado:bool=False, energia:int=100, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.5
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Escudo"]
 
     def bloquear(self):
         self.efectos["bloqueando"] = 8
 
     def mover_hacia_civil(self, escenario):
-        self.mover_aleatorio(escenario)
+        # su propia celda siempre tiene un civil (él mismo): solo cuenta si hay alguien más
+        celda = self._celda
+        self.mover_hacia(escenario, "civil", excluir_propia=celda is None or len(celda.civiles) <= 1)
+
+    mover_en_turno = mover_hacia_civil
 
     def proteger(self, civil:Civil):
         if civil.con_vida:
@@ -152,47 +274,47 @@ class Defensor(Civil):
         self.avanzar_turno()
 
 class Productor(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Saco",)
+
     def __init__(self, vida:int=100, ataque:int=5, defensa:float=None, velocidad:float=4.0, categoria:str="Productor", habilidad:str="Duplicar", estado:bool=False, energia:int=150, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.1
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Saco"]
-
-    def recolectar(self, recurso:Recurso):
-        if recurso.cantidad > 0:
-            cantidad = 1
-            if self.efectos.get("recolectando_doble", 0) > 0:
-                cantidad *= 2
-            cantidad_real = min(cantidad, recurso.cantidad)
-            recurso.cantidad = max(0, recurso.cantidad - cantidad_real)
-            self.inventario.append((recurso.tipo, cantidad_real))
-            return (recurso.tipo, cantidad_real)
-        return None
+
+    def recolectar(self, escenario):
+        """Toma recurso de su celda en el CampoRecursos del escenario. Devuelve (tipo, cantidad) o None."""
+        cantidad = 1
+        if self.efectos.get("recolectando_doble", 0) > 0:
+            cantidad *= 2
+        tomado = escenario.recursos.tomar(self.posicion_x, self.posicion_y, cantidad)
+        if tomado is not None:
+            self.inventario.append(tomado)
+        return tomado
 
     def duplicar_recoleccion(self, recurso:Recurso):
         self.efectos["recolectando_doble"] = 3
 
     def mover_hacia_recurso(self, escenario):
-        self.mover_aleatorio(escenario)
+        self.mover_hacia(escenario, "recurso")
+
+    mover_en_turno = mover_hacia_recurso
 
     def actuar(self, escenario):
         if not self.con_vida:
             return
-        x, y = self.posicion_x, self.posicion_y
-        celda = escenario.tablero[x][y]
-        for entidad in celda.entidades:
-            if isinstance(entidad, Recurso) and entidad.cantidad > 0:
-                self.recolectar(entidad)
-                break
+        self.recolectar(escenario)
         self.mover_hacia_recurso(escenario)
         self.avanzar_turno()
 
 class Cientifico(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Kit Cientifico",)
+
     def __init__(self, vida:int=100, ataque:int=5, defensa:float=None, velocidad:float=4.0, categoria:str="Científico", habilidad:str="Reducción", estado:bool=False, energia:int=100, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.1
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Kit Cientifico"]
 
     def reducir_tiempo_espera(self, civiles:list):
         for civil in civiles:
@@ -200,7 +322,9 @@ class Cientifico(Civil):
                 civil.turnos_infeccion += 2
 
     def mover_hacia_infectados(self, escenario):
-        self.mover_aleatorio(escenario)
+        self.mover_hacia(escenario, "infectado")
+
+    mover_en_turno = mover_hacia_infectados
 
     def actuar(self, escenario):
         if not self.con_vida:
@@ -214,11 +338,13 @@ class Cientifico(Civil):
         self.avanzar_turno()
 
 class Medico(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Vendas",)
+
     def __init__(self, vida:int=100, ataque:int=5, defensa:float=None, velocidad:float=3.0, categoria:str="Médico", habilidad:str="Curación", estado:bool=False, energia:int=150, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.1
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Vendas"]
 
     def curar(self, civil:Civil):
         if civil.estado and civil.con_vida:
@@ -231,14 +357,18 @@ class Medico(Civil):
         x = self.posicion_x
         y = self.posicion_y
         celda = escenario.tablero[x][y]
+        if not celda.civiles_infectados:
+            return None
 
-        for entidad in list(celda.entidades):
-            if isinstance(entidad, Civil) and entidad.estado and entidad.con_vida:
+        for entidad in list(celda.civiles):
+            if entidad.estado and entidad.con_vida:
                 return self.curar(entidad)
         return None
 
     def mover_hacia_infectado(self, escenario):
-        self.mover_aleatorio(escenario)
+        self.mover_hacia(escenario, "infectado")
+
+    mover_en_turno = mover_hacia_infectado
 
     def actuar(self, escenario):
         if not self.con_vida:
@@ -249,36 +379,43 @@ class Medico(Civil):
 
 #----------Z O M B I E S----------
 class Zombie(Personaje):
+    __slots__ = ("color",)
+    familia = "zombies"
+
     def __init__(self, vida:int, ataque:int, defensa:float, velocidad:float, categoria:str, habilidad:str, estado:bool, color:str, posicion_x:int, posicion_y:int, con_vida:bool=True):
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, posicion_x, posicion_y, con_vida)
         self.color = color
         self.con_vida = con_vida
 
-    def mover_aleatorio(self, escenario):
-        import random
-        dx = random.choice([-1, 0, 1])
-        dy = random.choice([-1, 0, 1])
-        nuevo_x = self.posicion_x + dx
-        nuevo_y = self.posicion_y + dy
-
-        if 0 <= nuevo_x < escenario.ancho and 0 <= nuevo_y < escenario.alto:
-            escenario.tablero[self.posicion_x][self.posicion_y].entidades.remove(self)
-            self.posicion_x = nuevo_x
-            self.posicion_y = nuevo_y
-            escenario.tablero[nuevo_x][nuevo_y].entidades.append(self)
+    def clave_conteo(self):
+        return "zombi" if self.con_vida else None
+
+    def seguir_flujo(self, escenario):
+        """Un paso por el campo de flujo del escenario hacia los civiles; fuera de su alcance, paso aleatorio."""
+        paso = escenario.campo_flujo.paso(self.posicion_x, self.posicion_y)
+        if paso is None:
+            self.mover_aleatorio(escenario)
+        else:
+            escenario.mover_personaje(self, self.posicion_x + paso[0], self.posicion_y + paso[1])
+
+    mover_en_turno = seguir_flujo
 
 class Verde(Zombie):
+    __slots__ = ()
+
     def __init__(self, posicion_x:int, posicion_y:int):
         super().__init__(vida=100, ataque=40, defensa=100*0.2, velocidad=3.5, categoria="Normal", habilidad="Escupir", estado=True, color="Verde",
                          posicion_x=posicion_x, posicion_y=posicion_y, con_vida=True)
 
     def escupir(self, civil:Civil):
         if civil.con_vida and not civil.estado:
-            civil.infectar()
+            civil.infectar(self.color)
             return civil
         return None
 
 class Morado(Zombie):
+    __slots__ = ()
+
     def __init__(self, posicion_x:int, posicion_y:int):
         super().__init__(vida=150, ataque=30, defensa=150*0.5, velocidad=2.0, categoria="Tanque", habilidad="Aplastar", estado=True, color="Morado",
                          posicion_x=posicion_x, posicion_y=posicion_y, con_vida=True)
@@ -290,6 +427,8 @@ class Morado(Zombie):
         return None
 
 class Amarillo(Zombie):
+    __slots__ = ()
+
     def __init__(self, posicion_x:int, posicion_y:int):
         super().__init__(vida=80, ataque=50, defensa=80*0.1, velocidad=5.5, categoria="Veloz", habilidad="Doble ataque", estado=True, color="Amarillo",
                          posicion_x=posicion_x, posicion_y=posicion_y, con_vida=True)
@@ -299,20 +438,24 @@ class Amarillo(Zombie):
         y = self.posicion_y
         celda = escenario.tablero[x][y]
         infectados = []
-        for entidad in list(celda.entidades):
-            if isinstance(entidad, Civil) and entidad.con_vida and not entidad.estado:
-                entidad.infectar()
+        if not celda.civiles_sanos:
+            return infectados
+        for entidad in list(celda.civiles):
+            if entidad.con_vida and not entidad.estado:
+                entidad.infectar(self.color)
                 infectados.append(entidad)
                 if len(infectados) == 2:
                     break
         return infectados
 
 class Jugador(Civil):
+    __slots__ = ()
+    inventario_inicial = ("Botiquín", "Mapa")
+
     def __init__(self, vida:int=100, ataque:int=25, defensa:float=None, velocidad:float=4.0, categoria:str="Jugador", habilidad:str="Interactuar", estado:bool=False, energia:int=100, posicion_x:int=0, posicion_y:int=0, con_vida:bool=True):
         if defensa is None:
             defensa = vida * 0.3
         super().__init__(vida, ataque, defensa, velocidad, categoria, habilidad, estado, energia, posicion_x, posicion_y, con_vida)
-        self.inventario = ["Botiquín", "Mapa"]
         self.efectos["controlado_por_jugador"] = True
 
     def mover(self, direccion:str, escenario):
@@ -327,14 +470,7 @@ class Jugador(Civil):
         elif direccion == "D":
             dx = 1
 
-        nuevo_x = self.posicion_x + dx
-        nuevo_y = self.posicion_y + dy
-
-        if 0 <= nuevo_x < escenario.ancho and 0 <= nuevo_y < escenario.alto:
-            escenario.tablero[self.posicion_x][self.posicion_y].entidades.remove(self)
-            self.posicion_x = nuevo_x
-            self.posicion_y = nuevo_y
-            escenario.tablero[nuevo_x][nuevo_y].entidades.append(self)
+        escenario.mover_personaje(self, self.posicion_x + dx, self.posicion_y + dy)
 
     def atacar_zombie(self, zombie:Zombie):
         if zombie.con_vida:
@@ -357,66 +493,1004 @@ class Jugador(Civil):
                 self.curar(entidad)
                 acciones.append("Curaste a un civil infectado.")
 
-        for entidad in celda.entidades[:]:
-            if isinstance(entidad, Recurso):
-                resultado = self.recolectar(entidad)
-                acciones.append(f"Recolectaste {resultado}.")
-                celda.entidades.remove(entidad)
-                break
+        if escenario.recursos.hay(self.posicion_x, self.posicion_y):
+            acciones.append(f"{self.recolectar(escenario)}.")
 
         return ", ".join(acciones) if acciones else "Nada que hacer aquí."
 
-    def recolectar(self, recurso):
+    def recolectar(self, escenario):
         if self.energia <= 0:
             return "Estás demasiado cansado para recolectar"
 
-        self.inventario.append(recurso.tipo)
+        # el jugador se lleva todo el recurso de la celda
+        tipo = escenario.recursos.vaciar(self.posicion_x, self.posicion_y)
+        if tipo is None:
+            return "Aquí no hay recursos"
+        self.inventario.append(tipo)
         self.energia -= 1
-        return f"Recolectaste {recurso.tipo}"
+        return f"Recolectaste {tipo}"
 
     def curar(self, civil:Civil):
         if civil.estado and civil.con_vida:
             civil.estado = False
             civil.turnos_infeccion = None
 
+#----------E V E N T O S----------
+# Tipos de evento del Escenario; categoría y plantilla de cada uno, por código
+(EV_MUERTE_INFECCION, EV_CURA, EV_AYUDA_CIENTIFICO, EV_RECOLECCION, EV_ATAQUE, EV_ABATIDO, EV_PROTECCION,
+ EV_INFECCION_VERDE, EV_APLASTAMIENTO, EV_INFECCION_AMARILLO) = range(10)
+CATEGORIAS_EVENTO = ("General", "Medicos", "Cientificos", "Productores", "Atacantes", "Atacantes", "Defensores",
+                     "Zombie_Verde", "Zombie_Morado", "Zombie_Amarillo")
+PLANTILLAS_EVENTO = (
+    "{detalle} murió por infección en ({x},{y}).",
+    "Médico cura a {detalle} en ({x},{y}).",
+    "Científico ayuda a {valor} infectado(s) en ({x},{y}).",
+    "Productor en ({x},{y}) recolecta {valor}x {detalle}.",
+    "Atacante en ({x},{y}) ataca {detalle} (-{valor} vida).",
+    "Atacante mata a {detalle} en ({x},{y}).",
+    "Defensor protege a {detalle} en ({x},{y}).",
+    "Zombi Verde infecta a {detalle} en ({x},{y}).",
+    "Zombi Morado aplasta a {detalle} en ({x},{y}).",
+    "Zombi Amarillo infecta {valor} civil(es) en ({x},{y}).",
+)
+
+class BufferEventos:
+    """Anillo preasignado de eventos compactos: tipo, actor, objetivo, detalle, x, y, valor.
+
+    actor y objetivo son ids del RegistroPersonajes (-1 si no hay); detalle es un código interno para
+    el nombre de clase o de recurso. Los textos no se construyen al registrar sino al leer un TurnoEventos,
+    así que una simulación sin lectores no formatea nada. Con más de `capacidad` eventos se pisan los
+    más antiguos.
+    """
+    def __init__(self, capacidad:int=1 << 16):
+        self.capacidad = capacidad
+        self.tipo = array("B", bytes(capacidad))
+        self.actor = array("q", bytes(8 * capacidad))
+        self.objetivo = array("q", bytes(8 * capacidad))
+        self.detalle = array("H", bytes(2 * capacidad))
+        self.x = array("i", bytes(4 * capacidad))
+        self.y = array("i", bytes(4 * capacidad))
+        self.valor = array("d", bytes(8 * capacidad))
+        self.escritos = 0  # total registrado; el evento n está en la posición n % capacidad
+        self.inicio_turno = 0
+        self.nombres_detalle = []
+        self._codigos_detalle = {}
+        self._suscriptores = []
+
+    def codigo_detalle(self, clave):
+        """Código de una clase (o nombre) para el campo detalle; se asigna la primera vez que aparece."""
+        codigo = self._codigos_detalle.get(clave)
+        if codigo is None:
+            codigo = self._codigos_detalle[clave] = len(self.nombres_detalle)
+            self.nombres_detalle.append(clave if isinstance(clave, str) else clave.__name__)
+        return codigo
+
+    def registrar(self, tipo:int, actor:int, objetivo:int, detalle, x:int, y:int, valor=0):
+        i = self.escritos % self.capacidad
+        self.tipo[i] = tipo
+        self.actor[i] = -1 if actor is None else actor
+        self.objetivo[i] = -1 if objetivo is None else objetivo
+        self.detalle[i] = self.codigo_detalle(detalle)
+        self.x[i] = x
+        self.y[i] = y
+        self.valor[i] = valor
+        self.escritos += 1
+
+    def iniciar_turno(self):
+        self.inicio_turno = self.escritos
+
+    def cerrar_turno(self):
+        """Devuelve los eventos del turno y se los pasa a los suscriptores (filtrados por categoría)."""
+        turno = TurnoEventos(self, self.inicio_turno, self.escritos)
+        for funcion, categorias in self._suscriptores:
+            funcion(turno if categorias is None else turno.filtrar(categorias))
+        return turno
+
+    def suscribir(self, funcion, categorias=None):
+        """`funcion(TurnoEventos)` se llama al final de cada turno; `categorias` limita los eventos que recibe."""
+        self._suscriptores.append((funcion, None if categorias is None else frozenset(categorias)))
+        return funcion
+
+    def desuscribir(self, funcion):
+        self._suscriptores = [(f, c) for f, c in self._suscriptores if f is not funcion]
+
+    def disponible(self, n:int):
+        """True si el evento n aún no se ha pisado."""
+        return self.escritos - self.capacidad <= n < self.escritos
+
+    def categoria(self, n:int):
+        return CATEGORIAS_EVENTO[self.tipo[n % self.capacidad]]
+
+    def registro(self, n:int):
+        """(tipo, actor, objetivo, detalle, x, y, valor) del evento n, con el detalle ya como nombre."""
+        i = n % self.capacidad
+        return (self.tipo[i], self.actor[i], self.objetivo[i], self.nombres_detalle[self.detalle[i]],
+                self.x[i], self.y[i], self.valor[i])
+
+    def mensaje(self, n:int):
+        i = n % self.capacidad
+        tipo = self.tipo[i]
+        valor = self.valor[i]
+        # solo el daño es decimal (y max(0, ...) lo deja en 0 entero); el resto son conteos
+        if tipo != EV_ATAQUE or not valor:
+            valor = int(valor)
+        return PLANTILLAS_EVENTO[tipo].format(detalle=self.nombres_detalle[self.detalle[i]], x=self.x[i], y=self.y[i], valor=valor)
+
+class TurnoEventos:
+    """Vista sobre los eventos de un turno en un BufferEventos.
+
+    Se recorre como la antigua lista de (categoria, mensaje), formateando cada mensaje al pedirlo;
+    `registros()` da los campos sin formatear y `contar()` los totales por categoría. len() cuenta
+    todos los eventos del turno aunque el anillo ya haya pisado parte de ellos.
+    """
+    def __init__(self, buffer:BufferEventos, inicio:int, fin:int, categorias:frozenset=None):
+        self.buffer = buffer
+        self.inicio = inicio
+        self.fin = fin
+        self.categorias = categorias
+        self._numeros = None
+        self._desde = None  # primer evento disponible cuando se calculó _numeros
+
+    def numeros(self):
+        """Números de evento (del buffer) que siguen disponibles y pasan el filtro de categorías."""
+        buffer = self.buffer
+        desde = max(self.inicio, buffer.escritos - buffer.capacidad)
+        # si el anillo pisó parte del turno desde la última lectura, la lista guardada ya no vale
+        if self._numeros is None or desde != self._desde:
+            numeros = range(desde, self.fin)
+            if self.categorias is not None:
+                numeros = [n for n in numeros if buffer.categoria(n) in self.categorias]
+            self._numeros = numeros
+            self._desde = desde
+        return self._numeros
+
+    def filtrar(self, categorias):
+        return TurnoEventos(self.buffer, self.inicio, self.fin, frozenset(categorias))
+
+    def __len__(self):
+        if self.categorias is None:
+            return self.fin - self.inicio
+        return len(self.numeros())
+
+    def __iter__(self):
+        buffer = self.buffer
+        for n in self.numeros():
+            yield buffer.categoria(n), buffer.mensaje(n)
+
+    def __getitem__(self, indice):
+        buffer = self.buffer
+        if isinstance(indice, slice):
+            return [(buffer.categoria(n), buffer.mensaje(n)) for n in self.numeros()[indice]]
+        n = self.numeros()[indice]
+        return buffer.categoria(n), buffer.mensaje(n)
+
+    def registros(self):
+        return [self.buffer.registro(n) for n in self.numeros()]
+
+    def contar(self):
+        return Counter(self.buffer.categoria(n) for n in self.numeros())
+
 #----------E S C E N A R I O----------
-class Celda:
-    def __init__(self, tipo:str, posicion_x:int, posicion_y:int):
+class RegistroPersonajes:
+    """Lista densa de personajes con ids estables y borrado O(1) por intercambio con el último.
+
+    Se recorre en orden de la lista densa: determinista, aunque un borrado mueve al último
+    personaje al hueco que deja el eliminado.
+    """
+    def __init__(self):
+        self._densos = []
+        self._posiciones = {}
+        self._siguiente_id = 0
+
+    def append(self, personaje):
+        if personaje.id is None or personaje.id in self._posiciones:
+            personaje.id = self._siguiente_id
+        self._siguiente_id = max(self._siguiente_id, personaje.id + 1)
+        self._posiciones[personaje.id] = len(self._densos)
+        self._densos.append(personaje)
+
+    def remove(self, personaje):
+        if personaje not in self:
+            raise ValueError("personaje no registrado")
+        posicion = self._posiciones.pop(personaje.id)
+        ultimo = self._densos.pop()
+        if ultimo is not personaje:
+            self._densos[posicion] = ultimo
+            self._posiciones[ultimo.id] = posicion
+
+    def discard(self, personaje):
+        try:
+            self.remove(personaje)
+        except ValueError:
+            pass
+
+    def obtener(self, id_personaje:int):
+        posicion = self._posiciones.get(id_personaje)
+        return None if posicion is None else self._densos[posicion]
+
+    def __contains__(self, personaje):
+        posicion = self._posiciones.get(getattr(personaje, "id", None))
+        return posicion is not None and self._densos[posicion] is personaje
+
+    def __iter__(self):
+        return iter(self._densos)
+
+    def __len__(self):
+        return len(self._densos)
+
+    def __getitem__(self, indice):
+        return self._densos[indice]
+
+class ConjuntoOrdenado(dict):
+    """Conjunto que conserva el orden de llegada (las claves de un dict), con alta y borrado O(1)."""
+    __slots__ = ()
+
+    def append(self, elemento):
+        self[elemento] = None
+
+    def remove(self, elemento):
+        del self[elemento]
+
+    def discard(self, elemento):
+        self.pop(elemento, None)
+
+class Terreno(IntEnum):
+    """Tipos de terreno; el escenario los guarda como un byte por celda (MapaTerreno)."""
+    CAMPO = 0
+    CIUDAD = 1
+    ZONA_ZOMBIE = 2
+    LAGO = 3
+    RIO = 4
+    BOSQUE = 5
+    MINA = 6
+
+    @property
+    def nombre(self):
+        return self.name.lower()
+
+NOMBRES_TERRENO = [terreno.nombre for terreno in Terreno]
+CODIGOS_TERRENO = {terreno.nombre: terreno for terreno in Terreno}
+# tablas indexadas por código de terreno
+SIMBOLOS_TERRENO = np.array(["F", "C", "Z", "L", "R", "B", "M"])
+TRANSITABLE_TERRENO = np.array([t not in (Terreno.LAGO, Terreno.RIO) for t in Terreno])
+
+class RegionTerreno:
+    """Rectángulo con nombre aplicado al mapa (ya recortado al tablero)."""
+    __slots__ = ("nombre", "tipo", "x", "y", "ancho", "alto")
+
+    def __init__(self, nombre:str, tipo:Terreno, x:int, y:int, ancho:int, alto:int):
+        self.nombre = nombre
         self.tipo = tipo
+        self.x = x
+        self.y = y
+        self.ancho = ancho
+        self.alto = alto
+
+    def contiene(self, x:int, y:int):
+        return self.x <= x < self.x + self.ancho and self.y <= y < self.y + self.alto
+
+    def __repr__(self):
+        return f"RegionTerreno({self.nombre!r}, {self.tipo.nombre}, {self.x}, {self.y}, {self.ancho}, {self.alto})"
+
+class MapaTerreno:
+    """Terreno del escenario: rejilla de códigos Terreno (uint8) y tabla de regiones con nombre.
+
+    Se rellena por rectángulos de una vez; las consultas derivadas (celdas de un tipo, transitabilidad)
+    se calculan con numpy y se guardan hasta el siguiente cambio (`version`).
+    """
+    def __init__(self, ancho:int, alto:int, fondo:Terreno=Terreno.CAMPO):
+        self.ancho = ancho
+        self.alto = alto
+        self.codigos = np.full((ancho, alto), fondo, dtype=np.uint8)
+        self.regiones = []  # en orden de aplicación: la última que contiene un punto es la visible
+        self.version = 0
+        self._cache = {}
+
+    def _cambiado(self):
+        self.version += 1
+        self._cache.clear()
+
+    def rellenar(self, tipo:Terreno, x:int, y:int, ancho:int, alto:int, nombre:str=None):
+        """Pinta el rectángulo (recortado al mapa) y lo anota en la tabla de regiones. Devuelve la región."""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.ancho, x + ancho), min(self.alto, y + alto)
+        region = RegionTerreno(nombre or f"{Terreno(tipo).nombre}_{len(self.regiones)}", Terreno(tipo),
+                               x0, y0, max(0, x1 - x0), max(0, y1 - y0))
+        self.codigos[x0:x1, y0:y1] = tipo
+        self.regiones.append(region)
+        self._cambiado()
+        return region
+
+    def poner(self, x:int, y:int, tipo:Terreno):
+        self.codigos[x, y] = tipo
+        self._cambiado()
+
+    def tipo_en(self, x:int, y:int):
+        return Terreno(self.codigos[x, y])
+
+    def region_en(self, x:int, y:int):
+        """Última región definida que contiene (x, y), o None."""
+        for region in reversed(self.regiones):
+            if region.contiene(x, y):
+                return region
+        return None
+
+    def region(self, nombre:str):
+        for region in self.regiones:
+            if region.nombre == nombre:
+                return region
+        return None
+
+    def _calculado(self, clave, calcular):
+        valor = self._cache.get(clave)
+        if valor is None:
+            valor = self._cache[clave] = calcular()
+        return valor
+
+    def mascara(self, *tipos:Terreno):
+        """Array booleano (ancho, alto) de las celdas de alguno de `tipos`."""
+        return self._calculado(("mascara", tipos), lambda: np.isin(self.codigos, tipos))
+
+    def celdas_de(self, tipo:Terreno):
+        """(xs, ys) de todas las celdas de `tipo`."""
+        return self._calculado(("celdas", tipo), lambda: np.nonzero(self.mascara(tipo)))
+
+    def contar(self, tipo:Terreno):
+        return int(self.celdas_de(tipo)[0].size)
+
+    @property
+    def transitable(self):
+        """Celdas que se pueden atravesar a pie (ni lago ni río)."""
+        return self._calculado("transitable", lambda: TRANSITABLE_TERRENO[self.codigos])
+
+    def colores(self, paleta):
+        """Array (ancho, alto, 3) con el color de cada celda según `paleta` (una fila RGB por código)."""
+        return paleta[self.codigos]
+
+TIPOS_RECURSO = ["agua", "madera", "mineral"]
+# terreno en el que vuelve a crecer cada tipo de recurso si se activa la regeneración
+TERRENOS_RECURSO = {"agua": (Terreno.LAGO, Terreno.RIO), "madera": (Terreno.BOSQUE,), "mineral": (Terreno.MINA,)}
+
+class CampoRecursos:
+    """Recursos del escenario como un plano int32 (ancho, alto) de cantidades por tipo.
+
+    Recolectar es leer y restar en una celda, y una celda agotada no deja ningún objeto detrás.
+    Los planos se crean al colocar el primer recurso de su tipo; al recolectar se prueban en ese orden.
+    """
+    def __init__(self, mapa:MapaTerreno):
+        self.mapa = mapa
+        self.planos = {}
+        self.restante = Counter()  # total por tipo, al día sin tener que sumar los planos
+        self.regeneracion = {}  # tipo -> (cantidad por turno, máximo, terrenos)
+
+    def plano(self, tipo:str):
+        plano = self.planos.get(tipo)
+        if plano is None:
+            plano = self.planos[tipo] = np.zeros((self.mapa.ancho, self.mapa.alto), dtype=np.int32)
+        return plano
+
+    def agregar(self, tipo:str, x:int, y:int, cantidad:int):
+        self.plano(tipo)[x, y] += cantidad
+        self.restante[tipo] += cantidad
+
+    def agregar_region(self, tipo:str, region:RegionTerreno, cantidad:int):
+        self.plano(tipo)[region.x:region.x + region.ancho, region.y:region.y + region.alto] += cantidad
+        self.restante[tipo] += cantidad * region.ancho * region.alto
+
+    def cantidad(self, x:int, y:int, tipo:str=None):
+        if tipo is not None:
+            plano = self.planos.get(tipo)
+            return 0 if plano is None else int(plano[x, y])
+        return sum(int(plano[x, y]) for plano in self.planos.values())
+
+    def hay(self, x:int, y:int):
+        for plano in self.planos.values():
+            if plano[x, y] > 0:
+                return True
+        return False
+
+    def tomar(self, x:int, y:int, cantidad:int):
+        """Resta hasta `cantidad` del primer tipo con existencias en (x, y). Devuelve (tipo, tomado) o None."""
+        for tipo, plano in self.planos.items():
+            disponible = int(plano[x, y])
+            if disponible > 0:
+                tomado = min(cantidad, disponible)
+                plano[x, y] = disponible - tomado
+                self.restante[tipo] -= tomado
+                return (tipo, tomado)
+        return None
+
+    def vaciar(self, x:int, y:int):
+        """Agota el primer tipo con existencias en (x, y) y devuelve ese tipo (o None)."""
+        for tipo, plano in self.planos.items():
+            if plano[x, y] > 0:
+                self.restante[tipo] -= int(plano[x, y])
+                plano[x, y] = 0
+                return tipo
+        return None
+
+    def celdas_con_recurso(self):
+        """(xs, ys) de las celdas con algún recurso."""
+        hay = np.zeros((self.mapa.ancho, self.mapa.alto), dtype=bool)
+        for plano in self.planos.values():
+            hay |= plano > 0
+        return np.nonzero(hay)
+
+    def totales(self):
+        return {tipo: self.restante[tipo] for tipo in self.planos}
+
+    def definir_regeneracion(self, tipo:str, cantidad:int, maximo:int, terrenos:tuple=None):
+        """Cada turno suma `cantidad` (hasta `maximo`) en las celdas de `terrenos`; cantidad 0 la desactiva."""
+        if cantidad <= 0:
+            self.regeneracion.pop(tipo, None)
+            return
+        self.plano(tipo)
+        self.regeneracion[tipo] = (cantidad, maximo, tuple(terrenos or TERRENOS_RECURSO[tipo]))
+
+    def regenerar(self, devolver_nuevas:bool=False):
+        """Aplica las reglas de regeneración, una operación por plano.
+
+        Con `devolver_nuevas` devuelve las (xs, ys) de celdas agotadas que vuelven a tener recurso.
+        """
+        nuevas = None
+        for tipo, (cantidad, maximo, terrenos) in self.regeneracion.items():
+            plano = self.planos[tipo]
+            zona = self.mapa.mascara(*terrenos)
+            if devolver_nuevas:
+                agotadas = zona & (plano == 0)
+                nuevas = agotadas if nuevas is None else nuevas | agotadas
+            np.copyto(plano, np.minimum(plano + cantidad, maximo), where=zona & (plano < maximo))
+            self.restante[tipo] = int(plano.sum())
+        if nuevas is None:
+            return None
+        return np.nonzero(nuevas)
+
+class Celda:
+    """Contenido de una casilla. El tipo de terreno no se guarda aquí sino en la rejilla del escenario."""
+    __slots__ = ("_mapa", "_indice", "_poblacion", "posicion_x", "posicion_y", "entidades", "civiles", "zombies",
+                 "civiles_sanos", "civiles_infectados", "zombies_vivos")
+
+    def __init__(self, mapa:MapaTerreno, posicion_x:int, posicion_y:int, indice=None, poblacion:Counter=None):
+        self._mapa = mapa  # MapaTerreno del escenario, compartido por todas las celdas
+        self._indice = indice  # IndiceEspacial al que avisar cuando un contador pasa por cero
+        # totales del escenario por (clase, clave de conteo), compartidos por todas las celdas
+        self._poblacion = poblacion if poblacion is not None else Counter()
         self.posicion_x = posicion_x
         self.posicion_y = posicion_y
-        self.entidades = []
+        self.entidades = ConjuntoOrdenado()
+        # subconjuntos por familia y contadores para saltar celdas sin objetivos
+        self.civiles = ConjuntoOrdenado()
+        self.zombies = ConjuntoOrdenado()
+        self.civiles_sanos = 0
+        self.civiles_infectados = 0
+        self.zombies_vivos = 0
+
+    @property
+    def tipo(self):
+        return NOMBRES_TERRENO[self._mapa.codigos[self.posicion_x, self.posicion_y]]
+
+    @tipo.setter
+    def tipo(self, valor:str):
+        self._mapa.poner(self.posicion_x, self.posicion_y, CODIGOS_TERRENO[valor])
+
+    def agregar(self, entidad):
+        self.entidades.append(entidad)
+        familia = entidad.familia
+        if familia is not None:
+            entidad._celda = self
+            getattr(self, familia).append(entidad)
+            clave = entidad.clave_conteo()
+            self.contar(clave, 1)
+            self._poblacion[type(entidad), clave] += 1
+
+    def quitar(self, entidad):
+        if entidad not in self.entidades:
+            return
+        self.entidades.remove(entidad)
+        familia = entidad.familia
+        if familia is not None:
+            getattr(self, familia).remove(entidad)
+            clave = entidad.clave_conteo()
+            self.contar(clave, -1)
+            self._poblacion[type(entidad), clave] -= 1
+            entidad._celda = None
+
+    def trasladar(self, entidad, destino):
+        """Pasa un personaje de esta celda a `destino`; su clave de conteo no cambia por moverse."""
+        del self.entidades[entidad]
+        destino.entidades[entidad] = None
+        familia = entidad.familia
+        del getattr(self, familia)[entidad]
+        getattr(destino, familia)[entidad] = None
+        clave = entidad.clave_conteo()
+        self.contar(clave, -1)
+        destino.contar(clave, 1)
+        entidad._celda = destino
+
+    def reclasificar(self, entidad, antes:str, despues:str):
+        """El personaje pasó de la clave de conteo `antes` a `despues` (se infectó, murió...)."""
+        self.contar(antes, -1)
+        self.contar(despues, 1)
+        poblacion = self._poblacion
+        clase = type(entidad)
+        poblacion[clase, antes] -= 1
+        poblacion[clase, despues] += 1
+
+    def contar(self, clave:str, delta:int):
+        if clave == "sano":
+            self.civiles_sanos += delta
+            total = self.civiles_sanos
+        elif clave == "infectado":
+            self.civiles_infectados += delta
+            total = self.civiles_infectados
+        elif clave == "zombi":
+            self.zombies_vivos += delta
+            total = self.zombies_vivos
+        else:
+            return
+        # el índice solo cambia cuando un contador entra o sale de cero
+        if self._indice is not None and (total == 0 or total == delta):
+            self._indice.actualizar(self)
+
+class ColumnaTablero(dict):
+    """Columna x del tablero: las Celda se crean la primera vez que se piden (tablero[x][y]).
+
+    Si hay celdas descartadas en `libres` (vacías, compartidas por todas las columnas) se reutiliza una
+    en vez de crear otra.
+    """
+    __slots__ = ("x", "alto", "mapa", "indice", "poblacion", "libres")
+
+    def __init__(self, x:int, alto:int, mapa:MapaTerreno, poblacion:Counter=None, libres:list=None):
+        super().__init__()
+        self.x = x
+        self.alto = alto
+        self.mapa = mapa
+        self.indice = None
+        self.poblacion = poblacion
+        self.libres = libres if libres is not None else []
+
+    def __missing__(self, y:int):
+        if not 0 <= y < self.alto:
+            raise IndexError(f"fila fuera del tablero: {y}")
+        if self.libres:
+            celda = self.libres.pop()
+            celda.posicion_x = self.x
+            celda.posicion_y = y
+            celda._indice = self.indice
+        else:
+            celda = Celda(self.mapa, self.x, y, self.indice, self.poblacion)
+        self[y] = celda
+        return celda
+
+class IndiceEspacial:
+    """Rejilla de cubos de `lado_cubo` x `lado_cubo` celdas con las celdas que tienen cada clase de objetivo.
+
+    Claves: "zombi", "infectado", "civil" (sano o infectado) y "recurso" (no agotado). Las celdas avisan
+    cuando un contador entra o sale de cero, así que el índice se mantiene al moverse la población sin
+    recorrerla. Los recursos agotados se descartan de forma perezosa al consultarlos en `recursos`.
+    """
+    def __init__(self, lado_cubo:int=8, recursos:CampoRecursos=None):
+        self.lado_cubo = lado_cubo
+        self.recursos = recursos
+        self.cubos = {}  # (cx, cy) -> {clave: ConjuntoOrdenado de celdas}
+
+    def marcar(self, celda:Celda, clave:str, presente:bool):
+        coordenada = (celda.posicion_x // self.lado_cubo, celda.posicion_y // self.lado_cubo)
+        cubo = self.cubos.get(coordenada)
+        if presente:
+            if cubo is None:
+                cubo = self.cubos[coordenada] = {}
+            conjunto = cubo.get(clave)
+            if conjunto is None:
+                conjunto = cubo[clave] = ConjuntoOrdenado()
+            conjunto.append(celda)
+        elif cubo is not None:
+            conjunto = cubo.get(clave)
+            if conjunto is not None:
+                conjunto.discard(celda)
+                if not conjunto:
+                    del cubo[clave]
+
+    def tiene(self, celda:Celda, clave:str):
+        cubo = self.cubos.get((celda.posicion_x // self.lado_cubo, celda.posicion_y // self.lado_cubo))
+        return cubo is not None and celda in cubo.get(clave, ())
+
+    def actualizar(self, celda:Celda):
+        """Recalcula en qué claves está `celda` a partir de sus contadores."""
+        self.marcar(celda, "zombi", celda.zombies_vivos > 0)
+        self.marcar(celda, "infectado", celda.civiles_infectados > 0)
+        self.marcar(celda, "civil", celda.civiles_sanos + celda.civiles_infectados > 0)
+
+    def _anillo(self, cx:int, cy:int, distancia:int):
+        if distancia == 0:
+            yield cx, cy
+            return
+        for dx in range(-distancia, distancia + 1):
+            yield cx + dx, cy - distancia
+            yield cx + dx, cy + distancia
+        for dy in range(-distancia + 1, distancia):
+            yield cx - distancia, cy + dy
+            yield cx + distancia, cy + dy
+
+    def mas_cercano(self, x:int, y:int, clave:str, radio:int, excluir:Celda=None):
+        """Celda con `clave` más cercana a (x, y) en distancia de Chebyshev (pasos en 8 direcciones), hasta `radio`.
+
+        Recorre anillos de cubos alrededor del punto y se detiene cuando ningún cubo más lejano puede mejorar
+        lo encontrado. Devuelve None si no hay ninguna al alcance.
+        """
+        lado = self.lado_cubo
+        cx, cy = x // lado, y // lado
+        mejor = None
+        mejor_distancia = radio + 1
+        for anillo in range(radio // lado + 2):
+            # cualquier celda del anillo `anillo` está al menos a (anillo - 1) * lado + 1 pasos
+            if anillo and mejor_distancia <= (anillo - 1) * lado + 1:
+                break
+            for coordenada in self._anillo(cx, cy, anillo):
+                cubo = self.cubos.get(coordenada)
+                if cubo is None:
+                    continue
+                conjunto = cubo.get(clave)
+                if not conjunto:
+                    continue
+                for celda in list(conjunto):
+                    if celda is excluir:
+                        continue
+                    distancia = max(abs(celda.posicion_x - x), abs(celda.posicion_y - y))
+                    if distancia >= mejor_distancia:
+                        continue
+                    if clave == "recurso" and not self.recursos.hay(celda.posicion_x, celda.posicion_y):
+                        self.marcar(celda, "recurso", False)
+                        continue
+                    mejor, mejor_distancia = celda, distancia
+        return mejor
+
+# pasos posibles de un campo de flujo; quedarse quieto va primero para que gane los empates
+PASOS_FLUJO = ((0, 0), (-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+SIN_PASO = len(PASOS_FLUJO)
+
+class CampoFlujo:
+    """Campo de flujo hacia los civiles para mover a todos los zombis sin buscar caminos uno a uno.
+
+    Un BFS multi-origen (con numpy, por frentes) desde las celdas con civiles da la distancia de cada
+    celda, sin atravesar lagos ni ríos, hasta `alcance` pasos. De ahí sale para cada celda el paso hacia
+    el vecino más cercano a un civil, así que cada zombi se mueve con una sola consulta. Se recalcula
+    cada `cada` turnos y solo si los civiles cambiaron de celda.
+    """
+    def __init__(self, cada:int=5, alcance:int=64):
+        self.cada = cada
+        self.alcance = alcance
+        self.distancia = None  # int32 (ancho, alto); alcance + 1 = fuera de alcance
+        self.codigos = None  # índice en PASOS_FLUJO (o SIN_PASO) por celda, como listas para leer rápido
+        self._fuentes = None
+        self._turnos = 0
+        self.calculos = 0
+
+    def actualizar(self, escenario):
+        """Llamado una vez por turno: recalcula el campo si toca."""
+        if self.codigos is not None and self._turnos % self.cada:
+            self._turnos += 1
+            return
+        self._turnos += 1
+        fuentes = np.zeros((escenario.ancho, escenario.alto), dtype=bool)
+        for conjunto in escenario.civiles_por_rol.values():
+            for civil in conjunto:
+                if civil.con_vida:
+                    fuentes[civil.posicion_x, civil.posicion_y] = True
+        if self._fuentes is not None and np.array_equal(fuentes, self._fuentes):
+            return
+        self._fuentes = fuentes
+        self.calcular(fuentes, escenario.mapa.transitable)
+
+    @staticmethod
+    def _dilatar(mascara):
+        # vecindad de 8 como dilatación separable: 3 de ancho en x y después en y
+        salida = mascara.copy()
+        salida[1:] |= mascara[:-1]
+        salida[:-1] |= mascara[1:]
+        resultado = salida.copy()
+        resultado[:, 1:] |= salida[:, :-1]
+        resultado[:, :-1] |= salida[:, 1:]
+        return resultado
+
+    def calcular(self, fuentes, transitable):
+        fuera = self.alcance + 1
+        distancia = np.full(fuentes.shape, fuera, dtype=np.int32)
+        distancia[fuentes] = 0
+        visitado = fuentes.copy()
+        frente = fuentes
+        for paso in range(1, self.alcance + 1):
+            frente = self._dilatar(frente) & transitable & ~visitado
+            if not frente.any():
+                break
+            distancia[frente] = paso
+            visitado |= frente
+
+        # paso de cada celda: el vecino (o ella misma) con menor distancia
+        ancho, alto = fuentes.shape
+        borde = np.full((ancho + 2, alto + 2), fuera, dtype=np.int32)
+        borde[1:-1, 1:-1] = distancia
+        mejor = np.full(fuentes.shape, fuera, dtype=np.int32)
+        codigos = np.full(fuentes.shape, SIN_PASO, dtype=np.int8)
+        for codigo, (dx, dy) in enumerate(PASOS_FLUJO):
+            vecino = borde[1 + dx:1 + dx + ancho, 1 + dy:1 + dy + alto]
+            menor = vecino < mejor
+            mejor[menor] = vecino[menor]
+            codigos[menor] = codigo
+        self.distancia = distancia
+        self.codigos = codigos.tolist()
+        self.calculos += 1
+
+    def paso(self, x:int, y:int):
+        """(dx, dy) hacia el civil más cercano desde (x, y), o None si no hay ninguno al alcance."""
+        codigo = self.codigos[x][y]
+        return None if codigo == SIN_PASO else PASOS_FLUJO[codigo]
+
+def _mezclar64(valores):
+    """Finalizador de splitmix64 sobre un array uint64 (las operaciones desbordan módulo 2**64)."""
+    z = valores + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+class GeneradorAleatorio:
+    """Fuente aleatoria de un escenario: reproducible con una semilla y divisible en sub-flujos.
+
+    `dividir(*claves)` da un flujo independiente y estable para cada fase o entidad (no depende de
+    cuánto se haya usado el flujo padre). Los desplazamientos de movimiento se sortean en bloque
+    con numpy y se reparten de a uno desde un buffer.
+    """
+    BLOQUE_DESPLAZAMIENTOS = 4096
+
+    def __init__(self, semilla=None, _secuencia:np.random.SeedSequence=None):
+        self.secuencia = _secuencia if _secuencia is not None else np.random.SeedSequence(semilla)
+        self.generador = np.random.Generator(np.random.PCG64(self.secuencia))
+        self._desplazamientos = []
+        self._indice = 0
+        self._clave = None  # clave de 64 bits para desplazamientos_por_id
+
+    @property
+    def semilla(self):
+        return self.secuencia.entropy
+
+    def dividir(self, *claves):
+        """Sub-generador determinado por la semilla y `claves` (enteros o textos)."""
+        clave = tuple(c if isinstance(c, int) else zlib.crc32(str(c).encode("utf-8")) for c in claves)
+        secuencia = np.random.SeedSequence(self.secuencia.entropy, spawn_key=self.secuencia.spawn_key + clave)
+        return GeneradorAleatorio(_secuencia=secuencia)
+
+    def entero(self, minimo:int, maximo:int):
+        """Entero uniforme en [minimo, maximo], como random.randint."""
+        return int(self.generador.integers(minimo, maximo + 1))
+
+    def enteros(self, minimo:int, maximo:int, cantidad:int):
+        """`cantidad` enteros en [minimo, maximo] de una sola vez, como lista."""
+        return self.generador.integers(minimo, maximo + 1, cantidad).tolist()
+
+    def elegir(self, opciones):
+        return opciones[int(self.generador.integers(len(opciones)))]
+
+    def reservar_desplazamientos(self, cantidad:int):
+        """Sortea de una vez al menos `cantidad` pares (dx, dy) para los próximos desplazamiento()."""
+        pendientes = len(self._desplazamientos) - self._indice
+        if pendientes >= 2 * cantidad:
+            return
+        nuevos = self.generador.integers(-1, 2, 2 * max(cantidad, self.BLOQUE_DESPLAZAMIENTOS), dtype=np.int8).tolist()
+        self._desplazamientos = self._desplazamientos[self._indice:] + nuevos
+        self._indice = 0
+
+    def desplazamientos_por_id(self, ids, turno:int):
+        """Arrays (dx, dy) en {-1, 0, 1} para cada id en `turno`, sin estado (basado en contador).
+
+        El mismo id y turno dan siempre el mismo paso, sin importar el orden, el proceso o el
+        fragmento del mapa en que se pidan.
+        """
+        if self._clave is None:
+            self._clave = int(self.secuencia.generate_state(1, np.uint64)[0])
+        clave_turno = _mezclar64(np.array([self._clave ^ (turno * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF)], dtype=np.uint64))
+        z = _mezclar64(np.asarray(ids).astype(np.uint64) ^ clave_turno)
+        dx = (z % np.uint64(3)).astype(np.int32) - 1
+        dy = ((z >> np.uint64(32)) % np.uint64(3)).astype(np.int32) - 1
+        return dx, dy
+
+    def desplazamiento(self):
+        """Siguiente (dx, dy) con dx, dy en {-1, 0, 1}."""
+        i = self._indice
+        if i + 2 > len(self._desplazamientos):
+            self.reservar_desplazamientos(1)
+            i = 0
+        self._indice = i + 2
+        return self._desplazamientos[i], self._desplazamientos[i + 1]
 
 class Escenario:
-    def __init__(self, ancho:int, alto:int):
+    def __init__(self, ancho:int, alto:int, semilla:int=None, aleatorio:GeneradorAleatorio=None):
         self.ancho = ancho
         self.alto = alto
-        self.tablero = [[Celda("campo", x, y) for y in range(alto)] for x in range(ancho)]
-        self.recursos = []
-        self.personajes = []
+        # una fuente por escenario; creación y movimiento usan sub-flujos separados
+        self.aleatorio = aleatorio if aleatorio is not None else GeneradorAleatorio(semilla)
+        self.aleatorio_poblacion = self.aleatorio.dividir("poblacion")
+        self.aleatorio_movimiento = self.aleatorio.dividir("movimiento")
+        # terreno como rejilla de bytes (Terreno) y celdas materializadas solo donde hace falta
+        self.mapa = MapaTerreno(ancho, alto)
+        self.terreno = self.mapa.codigos  # atajo a la rejilla de códigos
+        # personajes en el tablero por (clase, clave de conteo); lo mantienen las celdas
+        self.poblacion = Counter()
+        self.altas = Counter()  # personajes agregados por clase, para deducir los muertos
+        self.celdas_libres = []  # celdas descartadas y vacías, para reutilizarlas
+        self.tablero = [ColumnaTablero(x, alto, self.mapa, self.poblacion, self.celdas_libres) for x in range(ancho)]
+        self.recursos = CampoRecursos(self.mapa)
+        self.personajes = RegistroPersonajes()
+        self.celdas_modificadas = set()  # (x, y) con cambios de entidades desde el último dibujo
+        self.celdas_vaciadas = []  # celdas que se quedaron sin entidades en este turno
+        # colecciones por tipo para consultar una población sin recorrer a todos los personajes
+        self.por_tipo = {clase: ConjuntoOrdenado() for clase in (Verde, Morado, Amarillo, Medico, Cientifico, Productor,
+                                                                  Atacante, Defensor, Civil_Normal, Jugador)}
+        self.zombies_por_color = {"Verde": self.por_tipo[Verde], "Morado": self.por_tipo[Morado], "Amarillo": self.por_tipo[Amarillo]}
+        self.civiles_por_rol = {clase: conjunto for clase, conjunto in self.por_tipo.items() if issubclass(clase, Civil)}
+        # totales acumulados del brote (por color de zombi / tipo de recurso)
+        self.estadisticas = {
+            "infecciones": Counter(),
+            "muertes_por_color": Counter(),
+            "zombies_abatidos": Counter(),
+            "recursos_recolectados": Counter(),
+        }
+        self.perfilador = None  # PerfiladorTurno opcional; con None el turno no mide nada
+        self.metricas = None  # MetricasBrote opcional, una fila por turno
+        self.eventos = BufferEventos()
+        # con índice espacial los roles buscan su objetivo (mover_en_turno) en vez de moverse al azar
+        self.indice = None
+        self.radio_busqueda = 10
+        self.campo_flujo = None  # CampoFlujo: si existe, los zombis lo siguen hacia los civiles
 
     def agregar_personaje(self, personaje):
         x = personaje.posicion_x
         y = personaje.posicion_y
         if 0 <= x < self.ancho and 0 <= y < self.alto:
-            self.tablero[x][y].entidades.append(personaje)
+            self.tablero[x][y].agregar(personaje)
+            self.celdas_modificadas.add((x, y))
+            self.altas[type(personaje)] += 1
             self.personajes.append(personaje)
+            self.conjunto_de(type(personaje)).append(personaje)
         else:
             print(f"Posición fuera del tablero: ({x}, {y})")
 
-    def definir_ciudad(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "ciudad"
-
-    def definir_campo(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "campo"
+    def conjunto_de(self, clase):
+        """Colección de `clase` en por_tipo. Una clase que no está en la tabla inicial se añade al final y,
+        si es un Civil, también a civiles_por_rol para que cuente entre los civiles."""
+        conjunto = self.por_tipo.get(clase)
+        if conjunto is None:
+            conjunto = self.por_tipo[clase] = ConjuntoOrdenado()
+            if issubclass(clase, Civil):
+                self.civiles_por_rol[clase] = conjunto
+        return conjunto
+
+    def mover_personaje(self, personaje, nuevo_x:int, nuevo_y:int):
+        """Mueve al personaje de celda en O(1). Devuelve False si el destino está fuera del tablero."""
+        if not (0 <= nuevo_x < self.ancho and 0 <= nuevo_y < self.alto):
+            return False
+        origen = self.tablero[personaje.posicion_x][personaje.posicion_y]
+        destino = self.tablero[nuevo_x][nuevo_y]
+        if origen is not destino:
+            if personaje._celda is origen:
+                origen.trasladar(personaje, destino)
+            else:
+                origen.quitar(personaje)
+                destino.agregar(personaje)
+            if not origen.entidades:
+                self.celdas_vaciadas.append(origen)
+            self.celdas_modificadas.add((personaje.posicion_x, personaje.posicion_y))
+            self.celdas_modificadas.add((nuevo_x, nuevo_y))
+        personaje.posicion_x = nuevo_x
+        personaje.posicion_y = nuevo_y
+        return True
+
+    def eliminar_personaje(self, personaje):
+        """Quita al personaje de su celda, del registro y de su colección por tipo en O(1)."""
+        celda = self.celda_existente(personaje.posicion_x, personaje.posicion_y)
+        if celda is not None:
+            celda.quitar(personaje)
+            if not celda.entidades:
+                self.celdas_vaciadas.append(celda)
+        self.celdas_modificadas.add((personaje.posicion_x, personaje.posicion_y))
+        self.personajes.discard(personaje)
+        conjunto = self.por_tipo.get(type(personaje))
+        if conjunto is not None:
+            conjunto.discard(personaje)
+
+    def activar_movimiento_dirigido(self, radio:int=10, lado_cubo:int=8):
+        """Crea el IndiceEspacial con las celdas actuales; desde aquí cada rol se mueve hacia su objetivo."""
+        indice = IndiceEspacial(lado_cubo, self.recursos)
+        for columna in self.tablero:
+            columna.indice = indice
+        for celda in self.celdas():
+            celda._indice = indice
+            indice.actualizar(celda)
+        self.indice = indice
+        self._marcar_recursos(*self.recursos.celdas_con_recurso())
+        self.radio_busqueda = radio
+        return indice
+
+    def _marcar_recursos(self, xs, ys):
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.indice.marcar(self.tablero[x][y], "recurso", True)
+
+    def activar_regeneracion(self, reglas:dict):
+        """`reglas`: tipo -> (cantidad por turno, máximo); se aplica al empezar cada turno."""
+        for tipo, (cantidad, maximo) in reglas.items():
+            self.recursos.definir_regeneracion(tipo, cantidad, maximo)
+
+    def _regenerar_recursos(self):
+        nuevas = self.recursos.regenerar(devolver_nuevas=self.indice is not None)
+        if nuevas is not None:
+            self._marcar_recursos(*nuevas)
+
+    def activar_metricas(self, capacidad:int=1024):
+        """Empieza a guardar las series del brote (MetricasBrote); la primera fila es el estado actual."""
+        self.metricas = MetricasBrote(self, capacidad)
+        self.metricas.registrar(self)
+        return self.metricas
+
+    def activar_campo_flujo(self, cada:int=5, alcance:int=64):
+        """Los zombis dejan de vagar al azar y siguen un CampoFlujo hacia los civiles."""
+        self.campo_flujo = CampoFlujo(cada, alcance)
+        return self.campo_flujo
+
+    def desactivar_movimiento_dirigido(self):
+        for columna in self.tablero:
+            columna.indice = None
+        for celda in self.celdas():
+            celda._indice = None
+        self.indice = None
+
+    def celdas(self):
+        """Recorre solo las celdas ya materializadas (las demás están vacías)."""
+        for columna in self.tablero:
+            yield from columna.values()
+
+    def celda_existente(self, x:int, y:int):
+        """La celda (x, y) si ya fue creada, sin materializarla; None si no."""
+        return self.tablero[x].get(y)
+
+    def _soltar_vaciadas(self):
+        # al final del turno se descartan las celdas que siguen vacías; van a `celdas_libres` para que las
+        # que se ocupen en el turno siguiente no cuesten objetos nuevos (ni pasadas del recolector)
+        vaciadas, self.celdas_vaciadas = self.celdas_vaciadas, []
+        for celda in vaciadas:
+            if not celda.entidades and self.tablero[celda.posicion_x].get(celda.posicion_y) is celda:
+                self._soltar_celda(celda)
+        # de las libres basta con unas pocas más de las que se vacían en un turno
+        del self.celdas_libres[2 * len(vaciadas) + 64:]
+
+    def _soltar_celda(self, celda:Celda):
+        # la que el índice tiene como celda con recurso se queda: es el objeto que el índice conoce
+        if self.indice is not None and self.indice.tiene(celda, "recurso"):
+            return False
+        del self.tablero[celda.posicion_x][celda.posicion_y]
+        self.celdas_libres.append(celda)
+        return True
+
+    def liberar_celdas_vacias(self):
+        """Descarta las celdas sin entidades para recuperar memoria; se recrean al volver a pedirlas."""
+        liberadas = 0
+        for columna in self.tablero:
+            for celda in [celda for celda in columna.values() if not celda.entidades]:
+                liberadas += self._soltar_celda(celda)
+        return liberadas
+
+    def extraer_celdas_modificadas(self):
+        """Devuelve las celdas cambiadas desde la última llamada y vacía el registro."""
+        modificadas = self.celdas_modificadas
+        self.celdas_modificadas = set()
+        return modificadas
+
+    def definir_ciudad(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        return self.mapa.rellenar(Terreno.CIUDAD, inicio_x, inicio_y, ancho, alto, nombre)
+
+    def definir_campo(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        return self.mapa.rellenar(Terreno.CAMPO, inicio_x, inicio_y, ancho, alto, nombre)
 
     def crear_zombie_aleatorio(self, x:int, y:int):
-        import random
-        tipo = random.choice(["Verde", "Morado", "Amarillo"])
+        tipo = self.aleatorio_poblacion.elegir(["Verde", "Morado", "Amarillo"])
         if tipo == "Verde":
             return Verde(x, y)
         elif tipo == "Morado":
@@ -424,220 +1498,1670 @@ class Escenario:
         else:
             return Amarillo(x, y)
 
-    def definir_zona_zombie(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "zona_zombie"
+    def definir_zona_zombie(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        region = self.mapa.rellenar(Terreno.ZONA_ZOMBIE, inicio_x, inicio_y, ancho, alto, nombre)
+        for x in range(region.x, region.x + region.ancho):
+            for y in range(region.y, region.y + region.alto):
                 for _ in range(4):
                     zombi = self.crear_zombie_aleatorio(x, y)
-                    self.tablero[x][y].entidades.append(zombi)
-                    self.personajes.append(zombi)
-
-    def definir_lago(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "lago"
-                recurso = Recurso("agua", cantidad=50, posicion_x=x, posicion_y=y)
-                self.tablero[x][y].entidades.append(recurso)
-                self.recursos.append(recurso)
-
-    def definir_rio(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "rio"
-                recurso = Recurso("agua", cantidad=30, posicion_x=x, posicion_y=y)
-                self.tablero[x][y].entidades.append(recurso)
-                self.recursos.append(recurso)
-
-    def definir_bosque(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "bosque"
-                recurso = Recurso("madera", cantidad=40, posicion_x=x, posicion_y=y)
-                self.tablero[x][y].entidades.append(recurso)
-                self.recursos.append(recurso)
-
-    def definir_mina(self, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        for x in range(inicio_x, inicio_x + ancho):
-            for y in range(inicio_y, inicio_y + alto):
-                self.tablero[x][y].tipo = "mina"
-                recurso = Recurso("mineral", cantidad=30, posicion_x=x, posicion_y=y)
-                self.tablero[x][y].entidades.append(recurso)
-                self.recursos.append(recurso)
+                    self.agregar_personaje(zombi)
+        return region
+
+    def definir_lago(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        region = self.mapa.rellenar(Terreno.LAGO, inicio_x, inicio_y, ancho, alto, nombre)
+        self._colocar_recursos_region(region, "agua", 50)
+        return region
+
+    def definir_rio(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        region = self.mapa.rellenar(Terreno.RIO, inicio_x, inicio_y, ancho, alto, nombre)
+        self._colocar_recursos_region(region, "agua", 30)
+        return region
+
+    def definir_bosque(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        region = self.mapa.rellenar(Terreno.BOSQUE, inicio_x, inicio_y, ancho, alto, nombre)
+        self._colocar_recursos_region(region, "madera", 40)
+        return region
+
+    def definir_mina(self, inicio_x:int, inicio_y:int, ancho:int, alto:int, nombre:str=None):
+        region = self.mapa.rellenar(Terreno.MINA, inicio_x, inicio_y, ancho, alto, nombre)
+        self._colocar_recursos_region(region, "mineral", 30)
+        return region
+
+    def _colocar_recursos_region(self, region:RegionTerreno, tipo:str, cantidad:int):
+        self.recursos.agregar_region(tipo, region, cantidad)
+        if self.indice is not None and cantidad > 0:
+            xs, ys = np.mgrid[region.x:region.x + region.ancho, region.y:region.y + region.alto]
+            self._marcar_recursos(xs.ravel(), ys.ravel())
+
+    def colocar_recurso(self, recurso:Recurso):
+        """Suma la cantidad de `recurso` a su celda del CampoRecursos (no se guarda el objeto)."""
+        self.recursos.agregar(recurso.tipo, recurso.posicion_x, recurso.posicion_y, recurso.cantidad)
+        if self.indice is not None and recurso.cantidad > 0:
+            self.indice.marcar(self.tablero[recurso.posicion_x][recurso.posicion_y], "recurso", True)
 
     def imprimir_tablero(self):
-        simbolos = {"ciudad": "C", "campo": "F", "zona_zombie": "Z", "lago": "L", "rio": "R", "bosque": "B", "mina": "M"}
-
-        for y in range(self.alto):
-            fila = ""
-            for x in range(self.ancho):
-                tipo = self.tablero[x][y].tipo
-                fila += simbolos.get(tipo, "?") + " "
-            print(fila)
+        # una fila de texto por y: la rejilla es (x, y), así que se recorre traspuesta
+        for fila in SIMBOLOS_TERRENO[self.terreno.T]:
+            print(" ".join(fila) + " ")
 
     def poblar_ciudad(self, cantidad_normales:int, cantidad_atacantes:int, cantidad_defensores:int, cantidad_productores:int, cantidad_cientificos:int, cantidad_medicos:int,
                       inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        import random
+        aleatorio = self.aleatorio_poblacion
 
         for _ in range(cantidad_normales):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             civil = Civil_Normal(posicion_x=x, posicion_y=y)
             self.agregar_personaje(civil)
 
         for _ in range(cantidad_atacantes):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             atacante = Atacante(posicion_x=x, posicion_y=y)
             self.agregar_personaje(atacante)
 
         for _ in range(cantidad_defensores):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             defensor = Defensor(posicion_x=x, posicion_y=y)
             self.agregar_personaje(defensor)
 
         for _ in range(cantidad_productores):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             productor = Productor(posicion_x=x, posicion_y=y)
             self.agregar_personaje(productor)
 
         for _ in range(cantidad_cientificos):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             cientifico = Cientifico(posicion_x=x, posicion_y=y)
             self.agregar_personaje(cientifico)
 
         for _ in range(cantidad_medicos):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             medico = Medico(posicion_x=x, posicion_y=y)
             self.agregar_personaje(medico)
 
     def poblar_zona_zombie(self, cantidad_zombies:int, inicio_x:int, inicio_y:int, ancho:int, alto:int):
-        import random
+        aleatorio = self.aleatorio_poblacion
 
         for _ in range(cantidad_zombies):
-            x = random.randint(inicio_x, inicio_x + ancho - 1)
-            y = random.randint(inicio_y, inicio_y + alto - 1)
+            x = aleatorio.entero(inicio_x, inicio_x + ancho - 1)
+            y = aleatorio.entero(inicio_y, inicio_y + alto - 1)
             zombi = self.crear_zombie_aleatorio(x, y)
             self.agregar_personaje(zombi)
 
     def simular_turno(self):
-        """Simula un turno y devuelve lista de eventos (categoria, mensaje)."""
-        eventos = []
+        """Simula un turno y devuelve sus eventos (TurnoEventos: se recorre como pares (categoria, mensaje)).
+
+        Como en el bucle original, los personajes se procesan intercalados en el orden del registro
+        (RegistroPersonajes, orden de alta salvo los huecos que rellena un borrado): cada uno se mueve y
+        actúa antes de pasar al siguiente, sea zombi o civil. La acción de cada clase sale de una tabla
+        (_acciones) en vez de una cadena de isinstance.
+        """
+        eventos = self.eventos
+        eventos.iniciar_turno()
+        perfil = self.perfilador
+        if perfil is not None:
+            perfil.iniciar_turno()
+
+        # 0. Regeneración de recursos, si hay reglas (una operación por plano)
+        if self.recursos.regeneracion:
+            if perfil is not None:
+                perfil.medir("regeneracion", "recursos", self._regenerar_recursos)
+            else:
+                self._regenerar_recursos()
 
-        # 1. Avance de estados internos
-        for personaje in list(self.personajes):
-            if isinstance(personaje, Civil):
-                personaje.avanzar_turno()
-                if not personaje.con_vida:
-                    eventos.append(("General", f"{personaje.__class__.__name__} murió por infección en ({personaje.posicion_x},{personaje.posicion_y})."))
-                    try:
-                        self.tablero[personaje.posicion_x][personaje.posicion_y].entidades.remove(personaje)
-                    except ValueError:
-                        pass
-                    if personaje in self.personajes:
-                        self.personajes.remove(personaje)
+        # 1. Avance de estados internos (solo civiles infectados o con efectos activos)
+        if perfil is not None:
+            perfil.medir("avanzar_turno", "Civil", self._avanzar_estados, eventos)
+        else:
+            self._avanzar_estados(eventos)
 
         # 2. Movimiento y acciones
+        # todos los desplazamientos del turno salen de un único sorteo en bloque
+        self.aleatorio_movimiento.reservar_desplazamientos(len(self.personajes))
+        flujo = self.campo_flujo
+        if flujo is not None:
+            flujo.actualizar(self)
+        pasos = {}  # clase -> (mover, accion), resuelto una vez por turno
+        if perfil is not None:
+            self._mover_y_actuar_perfilado(perfil, pasos, eventos)
+        else:
+            for personaje in list(self.personajes):
+                if not personaje.con_vida:
+                    continue
+                clase = type(personaje)
+                paso = pasos.get(clase)
+                if paso is None:
+                    paso = pasos[clase] = self._pasos_de(clase)
+                mover, accion = paso
+                mover(personaje, self)
+                if accion is not None:
+                    accion(self, personaje, eventos)
+
+        self._soltar_vaciadas()
+        if perfil is not None:
+            perfil.terminar_turno()
+        if self.metricas is not None:
+            self.metricas.registrar(self)
+        return eventos.cerrar_turno()
+
+    def _pasos_de(self, clase):
+        """(mover, accion) de `clase` para el turno en curso."""
+        # los zombis se dirigen con el campo de flujo y los civiles con el índice espacial
+        if clase.familia == "civiles":
+            usar_dirigido = self.indice is not None
+        else:
+            usar_dirigido = self.campo_flujo is not None
+        if usar_dirigido:
+            mover = clase.mover_en_turno
+        else:
+            mover = clase.mover_aleatorio
+        return mover, self._accion_de(clase)
+
+    def _avanzar_estados(self, eventos):
+        """Avanza infección y efectos de los civiles, en el orden del registro. Devuelve cuántos avanzaron."""
+        avanzados = 0
+        for personaje in list(self.personajes):
+            if personaje.familia != "civiles" or not personaje.con_vida or not (personaje.estado or personaje._efectos):
+                continue
+            avanzados += 1
+            personaje.avanzar_turno()
+            if not personaje.con_vida:
+                eventos.registrar(EV_MUERTE_INFECCION, personaje.id, None, type(personaje), personaje.posicion_x, personaje.posicion_y)
+                self.estadisticas["muertes_por_color"][personaje.infectado_por or "Desconocido"] += 1
+                self.eliminar_personaje(personaje)
+        return avanzados
+
+    def _mover_y_actuar_perfilado(self, perfil, pasos, eventos):
+        # misma lógica que el bucle de simular_turno, pero separando por tipo el tiempo de moverse y el de
+        # actuar. sys.getallocatedblocks recorre las arenas (varios µs), así que los bloques se miden una vez
+        reloj = time.perf_counter
+        medidas = {}  # clase -> [n, t_mover, t_actuar]
+        b_inicio = sys.getallocatedblocks()
+        t_inicio = reloj()
         for personaje in list(self.personajes):
             if not personaje.con_vida:
                 continue
+            clase = type(personaje)
+            paso = pasos.get(clase)
+            if paso is None:
+                paso = pasos[clase] = self._pasos_de(clase)
+                medidas[clase] = [0, 0.0, 0.0]
+            mover, accion = paso
+            medida = medidas[clase]
+            medida[0] += 1
+            t0 = reloj()
+            mover(personaje, self)
+            t1 = reloj()
+            medida[1] += t1 - t0
+            if accion is not None:
+                accion(self, personaje, eventos)
+                medida[2] += reloj() - t1
+        total = sum(medida[0] for medida in medidas.values())
+        perfil.registrar("mover_y_actuar", "", reloj() - t_inicio, total, sys.getallocatedblocks() - b_inicio)
+        for clase, (n, t_mover, t_actuar) in medidas.items():
+            tipo = clase.__name__
+            perfil.registrar("movimiento", tipo, t_mover, n)
+            if pasos[clase][1] is not None:
+                perfil.registrar("accion", tipo, t_actuar, n)
+
+    def _accion_medico(self, personaje, eventos):
+        curado = personaje.curar_en_celda(self)
+        if curado:
+            eventos.registrar(EV_CURA, personaje.id, curado.id, type(curado), personaje.posicion_x, personaje.posicion_y)
+
+    def _accion_cientifico(self, personaje, eventos):
+        x = personaje.posicion_x
+        y = personaje.posicion_y
+        cel = self.tablero[x][y]
+        if not cel.civiles_infectados:
+            return
+        infectados = [e for e in cel.civiles if e.estado and e.con_vida]
+        personaje.reducir_tiempo_espera(infectados)
+        eventos.registrar(EV_AYUDA_CIENTIFICO, personaje.id, None, Cientifico, x, y, len(infectados))
+
+    def _accion_productor(self, personaje, eventos):
+        res = personaje.recolectar(self)
+        if res:
+            self.estadisticas["recursos_recolectados"][res[0]] += res[1]
+            eventos.registrar(EV_RECOLECCION, personaje.id, None, res[0], personaje.posicion_x, personaje.posicion_y, res[1])
+
+    def _accion_atacante(self, personaje, eventos):
+        resultado = personaje.atacar(self)
+        if resultado:
+            tipo, daño, killed, pos, objetivo = resultado
+            eventos.registrar(EV_ATAQUE, personaje.id, objetivo, tipo, pos[0], pos[1], daño)
+            if killed:
+                self.estadisticas["zombies_abatidos"][tipo] += 1
+                eventos.registrar(EV_ABATIDO, personaje.id, objetivo, tipo, pos[0], pos[1])
+
+    def _accion_defensor(self, personaje, eventos):
+        x = personaje.posicion_x
+        y = personaje.posicion_y
+        cel = self.tablero[x][y]
+        if cel.civiles_sanos + cel.civiles_infectados < 2:
+            return
+        for entidad in cel.civiles:
+            if entidad.con_vida and entidad is not personaje:
+                protegido = personaje.proteger(entidad)
+                if protegido:
+                    eventos.registrar(EV_PROTECCION, personaje.id, entidad.id, type(entidad), x, y)
+                break
+
+    def _accion_verde(self, personaje, eventos):
+        x = personaje.posicion_x
+        y = personaje.posicion_y
+        for dx in (-1, 0, 1):
+            nx = x + dx
+            if not 0 <= nx < self.ancho:
+                continue
+            columna = self.tablero[nx]
+            for dy in (-1, 0, 1):
+                ny = y + dy
+                # solo las vecinas ya materializadas (las demás están vacías); pedirlas las crearía
+                if (dx or dy) and ny in columna:
+                    celda = columna[ny]
+                    if not celda.civiles_sanos:
+                        continue
+                    for entidad in list(celda.civiles):
+                        if entidad.con_vida and not entidad.estado:
+                            infectado = personaje.escupir(entidad)
+                            if infectado:
+                                self.estadisticas["infecciones"]["Verde"] += 1
+                                eventos.registrar(EV_INFECCION_VERDE, personaje.id, infectado.id, type(infectado), nx, ny)
+                            break
+
+    def _accion_morado(self, personaje, eventos):
+        x = personaje.posicion_x
+        y = personaje.posicion_y
+        cel = self.tablero[x][y]
+        if not (cel.civiles_sanos or cel.civiles_infectados):
+            return
+        for entidad in list(cel.civiles):
+            if entidad.con_vida:
+                muerto = personaje.aplastar(entidad)
+                if muerto:
+                    self.estadisticas["muertes_por_color"]["Morado"] += 1
+                    eventos.registrar(EV_APLASTAMIENTO, personaje.id, muerto.id, type(muerto), x, y)
+                    self.eliminar_personaje(muerto)
+                break
+
+    def _accion_amarillo(self, personaje, eventos):
+        infectados = personaje.doble_atacar(self)
+        if infectados:
+            self.estadisticas["infecciones"]["Amarillo"] += len(infectados)
+            x = personaje.posicion_x
+            y = personaje.posicion_y
+            eventos.registrar(EV_INFECCION_AMARILLO, personaje.id, None, Amarillo, x, y, len(infectados))
+
+    _acciones = {
+        Verde: _accion_verde,
+        Morado: _accion_morado,
+        Amarillo: _accion_amarillo,
+        Medico: _accion_medico,
+        Cientifico: _accion_cientifico,
+        Productor: _accion_productor,
+        Atacante: _accion_atacante,
+        Defensor: _accion_defensor,
+    }
+
+    def _accion_de(self, clase):
+        # una subclase sin entrada propia usa la acción de su clase base, como hacía el isinstance original
+        for base in clase.__mro__:
+            accion = self._acciones.get(base)
+            if accion is not None:
+                return accion
+        return None
+
+    def civiles_vivos(self):
+        return sum(1 for conjunto in self.civiles_por_rol.values() for p in conjunto if p.con_vida)
+
+    def instantanea(self):
+        """Captura el estado actual (ver Instantanea); el escenario sigue intacto."""
+        return Instantanea(self)
+
+_ATRIBUTOS_INSTANTANEA = {}
+
+def _atributos_personaje(clase):
+    """Slots de `clase` y sus bases que definen el estado de un personaje (sin la referencia a su celda)."""
+    atributos = _ATRIBUTOS_INSTANTANEA.get(clase)
+    if atributos is None:
+        nombres = [nombre for base in reversed(clase.__mro__) for nombre in getattr(base, "__slots__", ())]
+        atributos = _ATRIBUTOS_INSTANTANEA[clase] = tuple(nombre for nombre in nombres if nombre != "_celda")
+    return atributos
+
+def _copiar_valor(valor):
+    # efectos e inventario son los únicos atributos mutables de un personaje
+    if isinstance(valor, dict):
+        return dict(valor)
+    if isinstance(valor, list):
+        return list(valor)
+    return valor
+
+class Instantanea:
+    """Estado de un Escenario en un turno, para seguirlo desde ahí tantas veces como haga falta.
+
+    Los personajes se guardan como tuplas de sus atributos y el terreno y los recursos como copias de
+    sus arrays; no se copia ninguna Celda ni estructura derivada (contadores, índice espacial), que se
+    rehacen al restaurar. El campo de flujo se comparte hasta que alguna copia lo recalcula. También
+    guarda el orden de cada colección, así que sin semilla nueva la copia sigue exactamente igual que
+    el original. Es serializable para mandarla a otros procesos (ver bifurcar).
+    """
+    def __init__(self, escenario:Escenario):
+        self.ancho = escenario.ancho
+        self.alto = escenario.alto
+        self.terreno = escenario.mapa.codigos.copy()
+        self.regiones = [(r.nombre, r.tipo, r.x, r.y, r.ancho, r.alto) for r in escenario.mapa.regiones]
+        self.recursos = {tipo: plano.copy() for tipo, plano in escenario.recursos.planos.items()}
+        self.restante = Counter(escenario.recursos.restante)
+        self.regeneracion = dict(escenario.recursos.regeneracion)
+
+        registro = escenario.personajes
+        self.personajes = [(type(p), tuple(_copiar_valor(getattr(p, nombre)) for nombre in _atributos_personaje(type(p))))
+                           for p in registro]
+        self.siguiente_id = registro._siguiente_id
+        self.por_tipo = [(clase, [p.id for p in conjunto]) for clase, conjunto in escenario.por_tipo.items()]
+        self.celdas = [(celda.posicion_x, celda.posicion_y, [p.id for p in celda.entidades])
+                       for celda in escenario.celdas() if celda.entidades]
+        self.altas = Counter(escenario.altas)
+        self.estadisticas = {clave: Counter(contador) for clave, contador in escenario.estadisticas.items()}
+
+        self.semilla = escenario.aleatorio.semilla
+        movimiento = escenario.aleatorio_movimiento
+        self.estado_movimiento = (movimiento.generador.bit_generator.state, movimiento._desplazamientos[movimiento._indice:])
+        indice = escenario.indice
+        self.movimiento_dirigido = None if indice is None else (escenario.radio_busqueda, indice.lado_cubo)
+        self.campo_flujo = copy.copy(escenario.campo_flujo)
+
+    def restaurar(self, semilla=None, opciones:dict=None):
+        """Escenario nuevo en el estado capturado.
+
+        Sin `semilla` continúa la misma secuencia aleatoria que el original; con ella, la del escenario
+        de esa semilla. `opciones` acepta las mismas claves que construir_escenario ("movimiento_dirigido",
+        "campo_flujo", "regeneracion_recursos").
+        """
+        escenario = Escenario(self.ancho, self.alto, semilla=self.semilla if semilla is None else semilla)
+        mapa = escenario.mapa
+        mapa.codigos[...] = self.terreno
+        mapa.regiones = [RegionTerreno(*region) for region in self.regiones]
+        mapa._cambiado()
+        for tipo, plano in self.recursos.items():
+            escenario.recursos.plano(tipo)[...] = plano
+        escenario.recursos.restante = Counter(self.restante)
+        escenario.recursos.regeneracion = dict(self.regeneracion)
+
+        personajes = {}
+        for clase, valores in self.personajes:
+            personaje = clase.__new__(clase)
+            personaje._celda = None
+            for nombre, valor in zip(_atributos_personaje(clase), valores):
+                setattr(personaje, nombre, _copiar_valor(valor))
+            personajes[personaje.id] = personaje
+            escenario.personajes.append(personaje)
+        escenario.personajes._siguiente_id = self.siguiente_id
+        for clase, ids in self.por_tipo:
+            conjunto = escenario.conjunto_de(clase)
+            for id_personaje in ids:
+                conjunto.append(personajes[id_personaje])
+        for x, y, ids in self.celdas:
+            celda = escenario.tablero[x][y]
+            for id_personaje in ids:
+                celda.agregar(personajes[id_personaje])
+            escenario.celdas_modificadas.add((x, y))
+        escenario.altas = Counter(self.altas)
+        escenario.estadisticas = {clave: Counter(contador) for clave, contador in self.estadisticas.items()}
+
+        if semilla is None:
+            movimiento = escenario.aleatorio_movimiento
+            estado, pendientes = self.estado_movimiento
+            movimiento.generador.bit_generator.state = estado
+            movimiento._desplazamientos = list(pendientes)
+            movimiento._indice = 0
+        if self.movimiento_dirigido is not None:
+            escenario.activar_movimiento_dirigido(*self.movimiento_dirigido)
+        escenario.campo_flujo = copy.copy(self.campo_flujo)
+        aplicar_opciones(escenario, opciones or {})
+        return escenario
+
+#----------P E R F I L A D O R----------
+class PerfiladorTurno:
+    """Instrumentación de Escenario.simular_turno por fase y tipo de entidad.
+
+    Por turno guarda, para cada (fase, tipo), el tiempo de reloj, las llamadas y los bloques de memoria
+    asignados (delta de sys.getallocatedblocks; None en las fases medidas entidad a entidad, donde
+    consultarlo costaría más que la propia fase). Se activa con `escenario.perfilador = PerfiladorTurno()`;
+    solo conserva los últimos `historial` turnos.
+    """
+    CAMPOS = ("turno", "fase", "tipo", "segundos", "llamadas", "bloques")
+
+    def __init__(self, historial:int=1000):
+        self.turnos = deque(maxlen=historial)  # (turno, {(fase, tipo): [segundos, llamadas, bloques]})
+        self.turno = 0
+        self._actual = None
+        self._inicio = 0.0
+        self._bloques_inicio = 0
+
+    def iniciar_turno(self):
+        self._actual = {}
+        self._bloques_inicio = sys.getallocatedblocks()
+        self._inicio = time.perf_counter()
+
+    def registrar(self, fase:str, tipo:str, segundos:float, llamadas:int, bloques:int=None):
+        medida = self._actual.get((fase, tipo))
+        if medida is None:
+            self._actual[(fase, tipo)] = [segundos, llamadas, bloques]
+        else:
+            medida[0] += segundos
+            medida[1] += llamadas
+            if bloques is not None:
+                medida[2] = bloques if medida[2] is None else medida[2] + bloques
+
+    def medir(self, fase:str, tipo:str, funcion, *args):
+        """Ejecuta funcion(*args) y la registra; si devuelve un entero se usa como número de llamadas."""
+        b0 = sys.getallocatedblocks()
+        t0 = time.perf_counter()
+        resultado = funcion(*args)
+        segundos = time.perf_counter() - t0
+        llamadas = resultado if isinstance(resultado, int) else 1
+        self.registrar(fase, tipo, segundos, llamadas, sys.getallocatedblocks() - b0)
+        return resultado
+
+    def terminar_turno(self):
+        segundos = time.perf_counter() - self._inicio
+        self.registrar("turno", "", segundos, 1, sys.getallocatedblocks() - self._bloques_inicio)
+        self.turnos.append((self.turno, self._actual))
+        self.turno += 1
+        self._actual = None
+
+    def ultimo_turno(self):
+        """{(fase, tipo): {"segundos", "llamadas", "bloques"}} del último turno medido."""
+        if not self.turnos:
+            return {}
+        return {clave: dict(zip(self.CAMPOS[3:], medida)) for clave, medida in self.turnos[-1][1].items()}
+
+    def resumen(self):
+        """Totales y medias por (fase, tipo) sobre el historial, de más a menos costoso."""
+        totales = {}
+        for _, medidas in self.turnos:
+            for clave, (segundos, llamadas, bloques) in medidas.items():
+                t = totales.setdefault(clave, [0.0, 0, None, 0])
+                t[0] += segundos
+                t[1] += llamadas
+                if bloques is not None:
+                    t[2] = bloques if t[2] is None else t[2] + bloques
+                t[3] += 1
+        resumen = {}
+        for clave, (segundos, llamadas, bloques, turnos) in sorted(totales.items(), key=lambda kv: -kv[1][0]):
+            resumen[clave] = {
+                "segundos": segundos,
+                "segundos_por_turno": segundos / turnos,
+                "llamadas": llamadas,
+                "bloques": bloques,
+                "turnos": turnos,
+            }
+        return resumen
+
+    def filas(self):
+        for turno, medidas in self.turnos:
+            for (fase, tipo), (segundos, llamadas, bloques) in medidas.items():
+                yield turno, fase, tipo, segundos, llamadas, bloques
+
+    def exportar_csv(self, ruta:str):
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(self.CAMPOS)
+            escritor.writerows(self.filas())
+
+    def exportar_json(self, ruta:str):
+        datos = {
+            "resumen": [dict(fase=fase, tipo=tipo, **valores) for (fase, tipo), valores in self.resumen().items()],
+            "turnos": [dict(zip(self.CAMPOS, fila)) for fila in self.filas()],
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f, indent=1)
+
+    def exportar(self, ruta:str):
+        """Elige CSV o JSON según la extensión de `ruta`."""
+        if ruta.lower().endswith(".csv"):
+            self.exportar_csv(ruta)
+        else:
+            self.exportar_json(ruta)
+
+    def lineas(self, maximo:int=8):
+        """Texto del último turno para el overlay: las fases más costosas primero."""
+        ultimo = self.ultimo_turno()
+        if not ultimo:
+            return ["Perfil: sin turnos medidos"]
+        total = ultimo.pop(("turno", ""))
+        lineas = [f"Turno {self.turno - 1}: {total['segundos'] * 1000:.2f} ms, {total['bloques']:+d} bloques"]
+        for (fase, tipo), m in sorted(ultimo.items(), key=lambda kv: -kv[1]["segundos"])[:maximo]:
+            linea = f"{fase} {tipo}: {m['segundos'] * 1000:.2f} ms x{m['llamadas']}"
+            if m["bloques"] is not None:
+                linea += f" {m['bloques']:+d}b"
+            lineas.append(linea)
+        return lineas
+
+
+#----------M E T R I C A S----------
+class MetricasBrote:
+    """Series por turno del brote: civiles sanos/infectados/muertos por rol, zombis por color y recursos restantes.
+
+    Cada turno es una fila de un array int64 preasignado (se duplica al llenarse). Los valores salen de
+    contadores que el escenario ya mantiene (Escenario.poblacion, CampoRecursos.restante), así que el
+    coste por turno no depende de la población. Se exporta a CSV o a .npz con una columna por serie.
+    """
+    def __init__(self, escenario, capacidad:int=1024):
+        self.roles = list(escenario.civiles_por_rol)
+        self.colores = [Verde, Morado, Amarillo]
+        self.tipos_recurso = list(dict.fromkeys(TIPOS_RECURSO + list(escenario.recursos.planos)))
+        self.columnas = (["turno"]
+                         + [f"{rol.__name__}_{estado}" for rol in self.roles for estado in ("sanos", "infectados", "muertos")]
+                         + [f"zombies_{color.__name__}" for color in self.colores]
+                         + [f"recurso_{tipo}" for tipo in self.tipos_recurso])
+        self.datos = np.zeros((capacidad, len(self.columnas)), dtype=np.int64)
+        self.n = 0
+
+    def registrar(self, escenario):
+        """Añade la fila del turno actual."""
+        if self.n == len(self.datos):
+            self.datos = np.concatenate([self.datos, np.zeros_like(self.datos)])
+        poblacion = escenario.poblacion
+        fila = [self.n]
+        for rol in self.roles:
+            sanos = poblacion[rol, "sano"]
+            infectados = poblacion[rol, "infectado"]
+            fila += (sanos, infectados, escenario.altas[rol] - sanos - infectados)
+        for color in self.colores:
+            fila.append(poblacion[color, "zombi"])
+        restante = escenario.recursos.restante
+        for tipo in self.tipos_recurso:
+            fila.append(restante[tipo])
+        self.datos[self.n] = fila
+        self.n += 1
+
+    def columna(self, nombre:str):
+        """Serie `nombre` (vista sobre el array, sin copiar)."""
+        return self.datos[:self.n, self.columnas.index(nombre)]
+
+    def como_dict(self):
+        return {nombre: self.datos[:self.n, j] for j, nombre in enumerate(self.columnas)}
+
+    def exportar_csv(self, ruta:str):
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(self.columnas)
+            escritor.writerows(self.datos[:self.n].tolist())
+
+    def exportar_npz(self, ruta:str):
+        np.savez_compressed(ruta, **self.como_dict())
+
+    def exportar(self, ruta:str):
+        """Elige CSV o .npz según la extensión de `ruta`."""
+        if ruta.lower().endswith(".csv"):
+            self.exportar_csv(ruta)
+        else:
+            self.exportar_npz(ruta)
+
+    @staticmethod
+    def leer(ruta:str):
+        """Columnas de un .npz exportado, como {nombre: array}."""
+        with np.load(ruta) as datos:
+            return {nombre: datos[nombre] for nombre in datos.files}
+
+#----------M O T O R   V E C T O R I Z A D O----------
+# Códigos de tipo del motor vectorizado; los civiles van primero para filtrar con `tipo <= JUGADOR`
+TIPOS_VECTORIZADOS = [Civil_Normal, Atacante, Defensor, Productor, Cientifico, Medico, Jugador, Verde, Morado, Amarillo]
+CODIGO_TIPO = {clase: codigo for codigo, clase in enumerate(TIPOS_VECTORIZADOS)}
+NORMAL, ATACANTE, DEFENSOR, PRODUCTOR, CIENTIFICO, MEDICO, JUGADOR, VERDE, MORADO, AMARILLO = range(len(TIPOS_VECTORIZADOS))
+
+# Estadísticas base sacadas de los constructores de cada clase
+_PLANTILLAS = [clase(posicion_x=0, posicion_y=0) for clase in TIPOS_VECTORIZADOS]
+VIDA_BASE = np.array([p.vida for p in _PLANTILLAS], dtype=np.float32)
+ATAQUE_BASE = np.array([p.ataque for p in _PLANTILLAS], dtype=np.float32)
+DEFENSA_BASE = np.array([p.defensa for p in _PLANTILLAS], dtype=np.float32)
+del _PLANTILLAS
+
+# Mensajes de cada fase del motor vectorizado, en el orden de las fases; las fases solo guardan los números
+MENSAJES_VECTORIZADOS = {
+    "General": "{} civil(es) murieron por infección.",
+    "Zombie_Verde": "Zombis Verdes infectan a {} civil(es).",
+    "Zombie_Morado": "Zombis Morados aplastan a {} civil(es).",
+    "Zombie_Amarillo": "Zombis Amarillos infectan {} civil(es).",
+    "Medicos": "Médicos curan a {} civil(es).",
+    "Cientificos": "Científicos ayudan a {} infectado(s).",
+    "Productores": "Productores recolectan {} recurso(s).",
+    "Atacantes": "Atacantes golpean a {} zombi(s), {} abatido(s).",
+    "Defensores": "{} defensor(es) protegen a un civil.",
+}
+CAMPOS_VECTORIZADOS = ("ids", "posicion_x", "posicion_y", "vida", "estado", "turnos_infeccion", "tipo", "con_vida")
+
+def formatear_eventos_vectorizados(conteos:dict):
+    """{categoria: (números...)} -> lista de eventos (categoria, mensaje) en el orden de las fases."""
+    return [(categoria, MENSAJES_VECTORIZADOS[categoria].format(*conteos[categoria]))
+            for categoria in MENSAJES_VECTORIZADOS if categoria in conteos]
+
+class EscenarioVectorizado:
+    """Mundo en arrays (struct-of-arrays) con las mismas reglas que Escenario.simular_turno.
+
+    Cada fase se aplica en bloque: primero se mueven todas las entidades vivas y después
+    actúan por tipo (zombis y luego civiles, el orden en que los crea el escenario
+    predeterminado). Dentro de una celda los objetivos se eligen por orden de id, igual que
+    el primer elemento de `celda.entidades` en el motor de objetos.
+
+    Diferencia con Escenario, a propósito: allí cada personaje se mueve y actúa antes de que se
+    mueva el siguiente, aquí todos se mueven antes de que nadie actúe (es lo que permite partir
+    el mapa en fragmentos con un solo intercambio por turno). Con la misma situación inicial las
+    partidas no coinciden una a una; en media las infecciones, aplastamientos y curas quedan
+    cerca (ver tests/test_motores.py).
+
+    El paso de cada entidad sale de un sorteo por contador (id, turno), así que el resultado no
+    depende del orden de las entidades: un fragmento del mapa (ver extraer_fragmento) simula su
+    zona igual que el mundo completo.
+    """
+    def __init__(self, ancho:int, alto:int, semilla:int=None, aleatorio:GeneradorAleatorio=None):
+        self.ancho = ancho
+        self.alto = alto
+        # las posiciones son del mundo; las rejillas (recursos, conteos) empiezan en el origen
+        self.origen_x = 0
+        self.origen_y = 0
+        self.ancho_mundo = ancho
+        self.alto_mundo = alto
+        self.region = None  # (x0, x1, y0, y1) propia si es un fragmento
+        self.turno = 0
+        self.aleatorio = aleatorio if aleatorio is not None else GeneradorAleatorio(semilla)
+        self.rng = self.aleatorio.generador
+        self.aleatorio_movimiento = self.aleatorio.dividir("movimiento")
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.posicion_x = np.zeros(0, dtype=np.int32)
+        self.posicion_y = np.zeros(0, dtype=np.int32)
+        self.vida = np.zeros(0, dtype=np.float32)
+        self.estado = np.zeros(0, dtype=bool)
+        self.turnos_infeccion = np.zeros(0, dtype=np.int16)  # -1 equivale a None
+        self.tipo = np.zeros(0, dtype=np.uint8)
+        self.con_vida = np.zeros(0, dtype=bool)
+        self.recursos = {tipo: np.zeros((ancho, alto), dtype=np.int32) for tipo in TIPOS_RECURSO}
+        self._siguiente_id = 0
+
+    @classmethod
+    def desde_escenario(cls, escenario:Escenario, semilla:int=None):
+        """Convierte un Escenario de objetos (personajes vivos y recursos) en arrays.
+
+        Sin `semilla` usa un sub-flujo del generador del escenario, así la conversión también es reproducible.
+        """
+        aleatorio = GeneradorAleatorio(semilla) if semilla is not None else escenario.aleatorio.dividir("vectorizado")
+        mundo = cls(escenario.ancho, escenario.alto, aleatorio=aleatorio)
+        vivos = [p for p in escenario.personajes if p.con_vida and type(p) in CODIGO_TIPO]
+        n = len(vivos)
+        mundo._reservar(n)
+        mundo.tipo[:] = [CODIGO_TIPO[type(p)] for p in vivos]
+        mundo.posicion_x[:] = [p.posicion_x for p in vivos]
+        mundo.posicion_y[:] = [p.posicion_y for p in vivos]
+        mundo.vida[:] = [p.vida for p in vivos]
+        mundo.estado[:] = [bool(p.estado) and isinstance(p, Civil) for p in vivos]
+        mundo.turnos_infeccion[:] = [getattr(p, "turnos_infeccion", None) if getattr(p, "turnos_infeccion", None) is not None else -1 for p in vivos]
+        mundo.con_vida[:] = True
+        for tipo, plano in escenario.recursos.planos.items():
+            if tipo in mundo.recursos:
+                mundo.recursos[tipo] += plano
+        return mundo
+
+    def _reservar(self, n:int):
+        """Añade `n` entidades nuevas al final de los arrays y devuelve su slice."""
+        inicio = self.tipo.size
+        self.ids = np.concatenate([self.ids, np.arange(self._siguiente_id, self._siguiente_id + n, dtype=np.int64)])
+        self.posicion_x = np.concatenate([self.posicion_x, np.zeros(n, dtype=np.int32)])
+        self.posicion_y = np.concatenate([self.posicion_y, np.zeros(n, dtype=np.int32)])
+        self.vida = np.concatenate([self.vida, np.zeros(n, dtype=np.float32)])
+        self.estado = np.concatenate([self.estado, np.zeros(n, dtype=bool)])
+        self.turnos_infeccion = np.concatenate([self.turnos_infeccion, np.full(n, -1, dtype=np.int16)])
+        self.tipo = np.concatenate([self.tipo, np.zeros(n, dtype=np.uint8)])
+        self.con_vida = np.concatenate([self.con_vida, np.ones(n, dtype=bool)])
+        self._siguiente_id += n
+        return slice(inicio, inicio + n)
+
+    def poblar(self, clase, cantidad:int, inicio_x:int, inicio_y:int, ancho:int, alto:int):
+        """Equivalente en bloque de poblar_ciudad/poblar_zona_zombie para una sola clase."""
+        nuevos = self._reservar(cantidad)
+        codigo = CODIGO_TIPO[clase]
+        self.tipo[nuevos] = codigo
+        self.posicion_x[nuevos] = self.rng.integers(inicio_x, min(inicio_x + ancho, self.ancho_mundo), cantidad)
+        self.posicion_y[nuevos] = self.rng.integers(inicio_y, min(inicio_y + alto, self.alto_mundo), cantidad)
+        self.vida[nuevos] = VIDA_BASE[codigo]
+
+    def poblar_zombies(self, cantidad:int, inicio_x:int, inicio_y:int, ancho:int, alto:int):
+        """Zombis de color aleatorio, como crear_zombie_aleatorio."""
+        colores = self.rng.integers(VERDE, AMARILLO + 1, cantidad)
+        for codigo in (VERDE, MORADO, AMARILLO):
+            self.poblar(TIPOS_VECTORIZADOS[codigo], int((colores == codigo).sum()), inicio_x, inicio_y, ancho, alto)
+
+    def agregar_recurso(self, tipo:str, cantidad:int, inicio_x:int, inicio_y:int, ancho:int, alto:int):
+        x, y = inicio_x - self.origen_x, inicio_y - self.origen_y
+        self.recursos[tipo][max(0, x):max(0, x + ancho), max(0, y):max(0, y + alto)] += cantidad
+
+    def compactar(self):
+        """Descarta las entidades muertas conservando el orden por id."""
+        vivos = self.con_vida
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(self, nombre, getattr(self, nombre)[vivos])
+
+    def extraer_fragmento(self, x0:int, x1:int, y0:int, y1:int):
+        """Copia de la zona [x0, x1) x [y0, y1) del mundo, con un borde de una celda para el halo."""
+        fragmento = EscenarioVectorizado((x1 - x0) + 2, (y1 - y0) + 2, aleatorio=self.aleatorio)
+        fragmento.origen_x, fragmento.origen_y = x0 - 1, y0 - 1
+        fragmento.ancho_mundo, fragmento.alto_mundo = self.ancho_mundo, self.alto_mundo
+        fragmento.region = (x0, x1, y0, y1)
+        fragmento.turno = self.turno
+        fragmento._siguiente_id = self._siguiente_id
+        dentro = (self.con_vida & (self.posicion_x >= x0) & (self.posicion_x < x1)
+                  & (self.posicion_y >= y0) & (self.posicion_y < y1))
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(fragmento, nombre, getattr(self, nombre)[dentro])
+        for tipo, plano in self.recursos.items():
+            fragmento.recursos[tipo][1:-1, 1:-1] = plano[x0 - self.origen_x:x1 - self.origen_x, y0 - self.origen_y:y1 - self.origen_y]
+        return fragmento
+
+    def _separar(self, mascara):
+        """Quita las entidades de `mascara` y las devuelve como dict de arrays."""
+        separadas = {nombre: getattr(self, nombre)[mascara] for nombre in CAMPOS_VECTORIZADOS}
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(self, nombre, getattr(self, nombre)[~mascara])
+        return separadas
+
+    def _incorporar(self, entidades:dict, ordenar:bool=True):
+        """Añade entidades (dict de arrays); con `ordenar` se mantiene el orden por id."""
+        if entidades["ids"].size == 0:
+            return
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(self, nombre, np.concatenate([getattr(self, nombre), entidades[nombre]]))
+        if ordenar:
+            orden = np.argsort(self.ids, kind="stable")
+            for nombre in CAMPOS_VECTORIZADOS:
+                setattr(self, nombre, getattr(self, nombre)[orden])
+
+    # Un turno de un fragmento son tres pasos con intercambio entre medias (ver EscenarioFragmentado)
+    def fragmento_mover(self):
+        """Paso 1: estados internos y movimiento. Devuelve (conteos, entidades que salen de la región)."""
+        self.compactar()
+        conteos = {}
+        self._avanzar_y_mover(conteos)
+        x0, x1, y0, y1 = self.region
+        fuera = (self.posicion_x < x0) | (self.posicion_x >= x1) | (self.posicion_y < y0) | (self.posicion_y >= y1)
+        return conteos, self._separar(fuera)
+
+    def fragmento_recibir(self, inmigrantes:dict):
+        """Paso 2: incorpora las entidades que llegan. Devuelve (x, y) de los Verdes en el borde propio."""
+        self._incorporar(inmigrantes)
+        x0, x1, y0, y1 = self.region
+        borde = (self.con_vida & (self.tipo == VERDE)
+                 & ((self.posicion_x == x0) | (self.posicion_x == x1 - 1) | (self.posicion_y == y0) | (self.posicion_y == y1 - 1)))
+        return self.posicion_x[borde], self.posicion_y[borde]
+
+    def fragmento_actuar(self, halo_x, halo_y):
+        """Paso 3: acciones, con los Verdes vecinos del halo como fantasmas que solo cuentan para escupir.
+
+        Devuelve (conteos, civiles vivos, zombis vivos) de la región.
+        """
+        propios = self.ids.size
+        self._incorporar({
+            "ids": np.full(halo_x.size, -1, dtype=np.int64),
+            "posicion_x": halo_x.astype(np.int32),
+            "posicion_y": halo_y.astype(np.int32),
+            "vida": np.full(halo_x.size, VIDA_BASE[VERDE], dtype=np.float32),
+            "estado": np.zeros(halo_x.size, dtype=bool),
+            "turnos_infeccion": np.full(halo_x.size, -1, dtype=np.int16),
+            "tipo": np.full(halo_x.size, VERDE, dtype=np.uint8),
+            "con_vida": np.ones(halo_x.size, dtype=bool),
+        }, ordenar=False)
+        conteos = {}
+        self._acciones(conteos)
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(self, nombre, getattr(self, nombre)[:propios])
+        return conteos, self.civiles_vivos(), self.zombies_vivos()
+
+    def civiles_vivos(self):
+        return int(np.count_nonzero(self.con_vida & (self.tipo <= JUGADOR)))
+
+    def zombies_vivos(self):
+        return int(np.count_nonzero(self.con_vida & (self.tipo >= VERDE)))
+
+    def _celdas(self, indices):
+        return (self.posicion_x[indices].astype(np.int64) - self.origen_x) * self.alto + (self.posicion_y[indices] - self.origen_y)
+
+    def _conteo_por_celda(self, indices):
+        return np.bincount(self._celdas(indices), minlength=self.ancho * self.alto)
+
+    def _primeros_por_celda(self, candidatos, cupo_por_celda):
+        """De `candidatos` (índices ordenados por id) elige en cada celda los primeros `cupo_por_celda[celda]`."""
+        celdas = self._celdas(candidatos)
+        con_cupo = cupo_por_celda[celdas] > 0
+        candidatos, celdas = candidatos[con_cupo], celdas[con_cupo]
+        if candidatos.size == 0:
+            return candidatos
+        orden = np.argsort(celdas, kind="stable")
+        celdas_ordenadas = celdas[orden]
+        inicio_grupo = np.flatnonzero(np.r_[True, celdas_ordenadas[1:] != celdas_ordenadas[:-1]])
+        tam_grupo = np.diff(np.r_[inicio_grupo, celdas_ordenadas.size])
+        rango = np.arange(celdas_ordenadas.size) - np.repeat(inicio_grupo, tam_grupo)
+        return np.sort(candidatos[orden[rango < cupo_por_celda[celdas_ordenadas]]])
+
+    def _indices(self, codigo:int):
+        return np.flatnonzero(self.con_vida & (self.tipo == codigo))
+
+    def _infectar(self, indices):
+        self.estado[indices] = True
+        self.turnos_infeccion[indices] = 3
+
+    def _morir(self, indices):
+        self.con_vida[indices] = False
+        self.estado[indices] = False
+        self.turnos_infeccion[indices] = -1
+
+    def simular_turno(self):
+        """Simula un turno y devuelve lista de eventos (categoria, mensaje) agregados por fase."""
+        conteos = {}
+        self._avanzar_y_mover(conteos)
+        self._acciones(conteos)
+        return formatear_eventos_vectorizados(conteos)
+
+    def _avanzar_y_mover(self, conteos:dict):
+        civil = self.tipo <= JUGADOR
+
+        # 1. Avance de estados internos
+        infectados = self.con_vida & civil & self.estado & (self.turnos_infeccion >= 0)
+        self.turnos_infeccion[infectados] -= 1
+        muertos = np.flatnonzero(infectados & (self.turnos_infeccion <= 0))
+        self._morir(muertos)
+        if muertos.size:
+            conteos["General"] = (muertos.size,)
+
+        # 2. Movimiento aleatorio de todas las entidades vivas (los bordes son los del mundo)
+        vivos = np.flatnonzero(self.con_vida)
+        dx, dy = self.aleatorio_movimiento.desplazamientos_por_id(self.ids[vivos], self.turno)
+        nuevo_x = self.posicion_x[vivos] + dx
+        nuevo_y = self.posicion_y[vivos] + dy
+        dentro = (nuevo_x >= 0) & (nuevo_x < self.ancho_mundo) & (nuevo_y >= 0) & (nuevo_y < self.alto_mundo)
+        self.posicion_x[vivos[dentro]] = nuevo_x[dentro]
+        self.posicion_y[vivos[dentro]] = nuevo_y[dentro]
+        self.turno += 1
+
+    def _acciones(self, conteos:dict):
+        # 3. Acciones por tipo
+        self._fase_verde(conteos)
+        self._fase_morado(conteos)
+        self._fase_amarillo(conteos)
+        self._fase_medico(conteos)
+        self._fase_cientifico(conteos)
+        self._fase_productor(conteos)
+        self._fase_atacante(conteos)
+        self._fase_defensor(conteos)
+
+    def _civiles(self, sanos:bool=None):
+        mascara = self.con_vida & (self.tipo <= JUGADOR)
+        if sanos is True:
+            mascara &= ~self.estado
+        elif sanos is False:
+            mascara &= self.estado
+        return np.flatnonzero(mascara)
+
+    def _fase_verde(self, conteos):
+        verdes = self._indices(VERDE)
+        sanos = self._civiles(sanos=True)
+        if verdes.size == 0 or sanos.size == 0:
+            return
+        # Cada Verde escupe a un civil sano en cada una de sus 8 celdas vecinas
+        conteo = np.zeros((self.ancho + 2, self.alto + 2), dtype=np.int32)
+        conteo[1:-1, 1:-1] = self._conteo_por_celda(verdes).reshape(self.ancho, self.alto)
+        cupo = -conteo[1:-1, 1:-1]
+        for dx in (0, 1, 2):
+            for dy in (0, 1, 2):
+                cupo = cupo + conteo[dx:dx + self.ancho, dy:dy + self.alto]
+        cupo = cupo.reshape(-1)
+        infectados = self._primeros_por_celda(sanos, cupo)
+        self._infectar(infectados)
+        if infectados.size:
+            conteos["Zombie_Verde"] = (infectados.size,)
+
+    def _fase_morado(self, conteos):
+        morados = self._indices(MORADO)
+        if morados.size == 0:
+            return
+        muertos = self._primeros_por_celda(self._civiles(), self._conteo_por_celda(morados))
+        self._morir(muertos)
+        if muertos.size:
+            conteos["Zombie_Morado"] = (muertos.size,)
+
+    def _fase_amarillo(self, conteos):
+        amarillos = self._indices(AMARILLO)
+        if amarillos.size == 0:
+            return
+        infectados = self._primeros_por_celda(self._civiles(sanos=True), 2 * self._conteo_por_celda(amarillos))
+        self._infectar(infectados)
+        if infectados.size:
+            conteos["Zombie_Amarillo"] = (infectados.size,)
+
+    def _fase_medico(self, conteos):
+        medicos = self._indices(MEDICO)
+        if medicos.size == 0:
+            return
+        curados = self._primeros_por_celda(self._civiles(sanos=False), self._conteo_por_celda(medicos))
+        self.estado[curados] = False
+        self.turnos_infeccion[curados] = -1
+        if curados.size:
+            conteos["Medicos"] = (curados.size,)
+
+    def _fase_cientifico(self, conteos):
+        cientificos = self._indices(CIENTIFICO)
+        if cientificos.size == 0:
+            return
+        infectados = self._civiles(sanos=False)
+        infectados = infectados[self.turnos_infeccion[infectados] >= 0]
+        ayudas = self._conteo_por_celda(cientificos)[self._celdas(infectados)]
+        self.turnos_infeccion[infectados] += (2 * ayudas).astype(np.int16)
+        ayudados = int(np.count_nonzero(ayudas))
+        if ayudados:
+            conteos["Cientificos"] = (ayudados,)
+
+    def _fase_productor(self, conteos):
+        productores = self._indices(PRODUCTOR)
+        if productores.size == 0:
+            return
+        celdas, pendientes = np.unique(self._celdas(productores), return_counts=True)
+        total = 0
+        for tipo in TIPOS_RECURSO:
+            plano = self.recursos[tipo].reshape(-1)
+            tomado = np.minimum(pendientes, plano[celdas])
+            plano[celdas] -= tomado.astype(np.int32)
+            pendientes = pendientes - tomado
+            total += int(tomado.sum())
+        if total:
+            conteos["Productores"] = (total,)
+
+    def _fase_atacante(self, conteos):
+        atacantes = self._indices(ATACANTE)
+        zombies = np.flatnonzero(self.con_vida & (self.tipo >= VERDE))
+        if atacantes.size == 0 or zombies.size == 0:
+            return
+        # Cada atacante golpea al primer zombi vivo de su celda y, cuando ese cae, los golpes siguientes van
+        # al próximo (como Atacante.atacar): los golpes de la celda se reparten en orden de id
+        golpes = self._conteo_por_celda(atacantes)
+        celdas = self._celdas(zombies)
+        con_golpes = golpes[celdas] > 0
+        zombies, celdas = zombies[con_golpes], celdas[con_golpes]
+        if zombies.size == 0:
+            return
+        orden = np.argsort(celdas, kind="stable")
+        zombies, celdas = zombies[orden], celdas[orden]
+        daño = np.maximum(0, ATAQUE_BASE[ATACANTE] - DEFENSA_BASE[self.tipo[zombies]])
+        # golpes que aguanta cada zombi antes de caer; sin daño se queda con todos los de su celda
+        necesarios = np.where(daño > 0, np.ceil(self.vida[zombies] / np.maximum(daño, 1e-9)), np.inf)
+        disponibles = golpes[celdas]
+        tope = np.minimum(necesarios, disponibles)
+        previos = np.cumsum(tope) - tope
+        inicio_grupo = np.flatnonzero(np.r_[True, celdas[1:] != celdas[:-1]])
+        previos -= np.repeat(previos[inicio_grupo], np.diff(np.r_[inicio_grupo, celdas.size]))
+        recibidos = np.clip(disponibles - previos, 0, tope)
+        golpeados = recibidos > 0
+        self.vida[zombies] -= daño * recibidos
+        abatidos = zombies[golpeados & (recibidos >= necesarios)]
+        self.con_vida[abatidos] = False
+        conteos["Atacantes"] = (int(np.count_nonzero(golpeados)), abatidos.size)
+
+    def _fase_defensor(self, conteos):
+        defensores = self._indices(DEFENSOR)
+        if defensores.size == 0:
+            return
+        # "protegido" no altera ninguna otra regla; solo se cuenta como evento
+        civiles = self._conteo_por_celda(self._civiles())
+        protectores = int(np.count_nonzero(civiles[self._celdas(defensores)] > 1))
+        if protectores:
+            conteos["Defensores"] = (protectores,)
+
+def crear_escenario_vectorizado_masivo(ancho:int, alto:int, cantidad_civiles:int, cantidad_zombies:int, semilla:int=None):
+    """Mundo vectorizado grande: ciudad central con civiles de todos los roles y zombis en las esquinas."""
+    mundo = EscenarioVectorizado(ancho, alto, semilla)
+    lado_ciudad_x, lado_ciudad_y = max(1, ancho // 3), max(1, alto // 3)
+    ciudad_x, ciudad_y = (ancho - lado_ciudad_x) // 2, (alto - lado_ciudad_y) // 2
+    roles = [Civil_Normal, Atacante, Defensor, Productor, Cientifico, Medico]
+    for i, clase in enumerate(roles):
+        cantidad = cantidad_civiles // len(roles) + (1 if i < cantidad_civiles % len(roles) else 0)
+        mundo.poblar(clase, cantidad, ciudad_x, ciudad_y, lado_ciudad_x, lado_ciudad_y)
+
+    lado_zona_x, lado_zona_y = max(1, ancho // 10), max(1, alto // 10)
+    esquinas = [(0, 0), (ancho - lado_zona_x, 0), (0, alto - lado_zona_y), (ancho - lado_zona_x, alto - lado_zona_y)]
+    for i, (x, y) in enumerate(esquinas):
+        cantidad = cantidad_zombies // 4 + (1 if i < cantidad_zombies % 4 else 0)
+        mundo.poblar_zombies(cantidad, x, y, lado_zona_x, lado_zona_y)
+
+    mundo.agregar_recurso("agua", 50, ancho // 10, alto // 10, max(1, ancho // 8), max(1, alto // 8))
+    mundo.agregar_recurso("madera", 40, ancho // 10, alto // 2, max(1, ancho // 6), max(1, alto // 6))
+    return mundo
+
+#----------M O T O R   F R A G M E N T A D O----------
+def _trabajar_fragmento(conexion, fragmento:EscenarioVectorizado):
+    """Bucle de un proceso trabajador: atiende las órdenes del EscenarioFragmentado."""
+    while True:
+        orden, datos = conexion.recv()
+        if orden == "mover":
+            conexion.send(fragmento.fragmento_mover())
+        elif orden == "recibir":
+            conexion.send(fragmento.fragmento_recibir(datos))
+        elif orden == "actuar":
+            conexion.send(fragmento.fragmento_actuar(*datos))
+        elif orden == "reunir":
+            fragmento.compactar()
+            conexion.send(({nombre: getattr(fragmento, nombre) for nombre in CAMPOS_VECTORIZADOS},
+                           {tipo: plano[1:-1, 1:-1] for tipo, plano in fragmento.recursos.items()}))
+        elif orden == "fin":
+            conexion.close()
+            return
+
+class EscenarioFragmentado:
+    """EscenarioVectorizado repartido en bloques rectangulares, cada uno simulado por su propio proceso.
+
+    Cada turno tiene tres pasos con intercambio por este proceso: (1) cada bloque avanza estados y
+    mueve, y entrega las entidades que salieron de su zona; (2) recibe las que entraron y entrega
+    sus Verdes del borde; (3) actúa con los Verdes vecinos como halo de una celda. Como los pasos
+    salen de un sorteo por (id, turno) y todas las reglas alcanzan como mucho a la celda vecina,
+    el resultado es idéntico al de EscenarioVectorizado con la misma semilla.
+    """
+    def __init__(self, mundo:EscenarioVectorizado, bloques_x:int, bloques_y:int):
+        self.ancho = mundo.ancho_mundo
+        self.alto = mundo.alto_mundo
+        self.turno = mundo.turno
+        self.limites_x = np.array([i * self.ancho // bloques_x for i in range(bloques_x + 1)])
+        self.limites_y = np.array([j * self.alto // bloques_y for j in range(bloques_y + 1)])
+        self.regiones = [(self.limites_x[i], self.limites_x[i + 1], self.limites_y[j], self.limites_y[j + 1])
+                         for i in range(bloques_x) for j in range(bloques_y)]
+        self._aleatorio = mundo.aleatorio
+        self._siguiente_id = mundo._siguiente_id
+        self._vivos = (mundo.civiles_vivos(), mundo.zombies_vivos())
+        self._conexiones = []
+        self._procesos = []
+        for region in self.regiones:
+            local, remota = multiprocessing.Pipe()
+            proceso = multiprocessing.Process(target=_trabajar_fragmento, args=(remota, mundo.extraer_fragmento(*region)),
+                                              daemon=True)
+            proceso.start()
+            remota.close()
+            self._conexiones.append(local)
+            self._procesos.append(proceso)
+
+    def _bloque_de(self, x, y):
+        i = np.searchsorted(self.limites_x, x, side="right") - 1
+        j = np.searchsorted(self.limites_y, y, side="right") - 1
+        return i * (self.limites_y.size - 1) + j
+
+    def _pedir(self, orden:str, datos_por_bloque):
+        for conexion, datos in zip(self._conexiones, datos_por_bloque):
+            conexion.send((orden, datos))
+        return [conexion.recv() for conexion in self._conexiones]
+
+    def simular_turno(self):
+        """Simula un turno en todos los bloques y devuelve los eventos agregados, como EscenarioVectorizado."""
+        bloques = len(self._conexiones)
+        # 1. mover y recoger las entidades que cambian de bloque
+        movidos = self._pedir("mover", [None] * bloques)
+        conteos = [c for c, _ in movidos]
+        emigrantes = {nombre: np.concatenate([e[nombre] for _, e in movidos]) for nombre in CAMPOS_VECTORIZADOS}
+        destino = self._bloque_de(emigrantes["posicion_x"], emigrantes["posicion_y"])
+
+        # 2. entregarlas a su nuevo bloque y recoger los Verdes de cada borde
+        bordes = self._pedir("recibir", [{nombre: valores[destino == k] for nombre, valores in emigrantes.items()}
+                                        for k in range(bloques)])
+        verdes_x = np.concatenate([x for x, _ in bordes])
+        verdes_y = np.concatenate([y for _, y in bordes])
+        origen = np.repeat(np.arange(bloques), [x.size for x, _ in bordes])
+
+        # 3. actuar con el halo de Verdes vecinos
+        halos = []
+        for k, (x0, x1, y0, y1) in enumerate(self.regiones):
+            cerca = ((origen != k) & (verdes_x >= x0 - 1) & (verdes_x <= x1)
+                     & (verdes_y >= y0 - 1) & (verdes_y <= y1))
+            halos.append((verdes_x[cerca], verdes_y[cerca]))
+        actuados = self._pedir("actuar", halos)
+        conteos += [c for c, _, _ in actuados]
+        self._vivos = (sum(c for _, c, _ in actuados), sum(z for _, _, z in actuados))
+        self.turno += 1
+
+        total = {}
+        for parcial in conteos:
+            for categoria, numeros in parcial.items():
+                previo = total.get(categoria)
+                total[categoria] = numeros if previo is None else tuple(a + b for a, b in zip(previo, numeros))
+        return formatear_eventos_vectorizados(total)
+
+    def civiles_vivos(self):
+        return self._vivos[0]
+
+    def zombies_vivos(self):
+        return self._vivos[1]
+
+    def reunir(self):
+        """Junta los bloques en un EscenarioVectorizado (entidades vivas, por id) para revisar o guardar."""
+        mundo = EscenarioVectorizado(self.ancho, self.alto, aleatorio=self._aleatorio)
+        mundo.turno = self.turno
+        mundo._siguiente_id = self._siguiente_id
+        partes = self._pedir("reunir", [None] * len(self._conexiones))
+        for (entidades, recursos), (x0, x1, y0, y1) in zip(partes, self.regiones):
+            mundo._incorporar(entidades, ordenar=False)
+            for tipo, plano in recursos.items():
+                mundo.recursos[tipo][x0:x1, y0:y1] = plano
+        orden = np.argsort(mundo.ids, kind="stable")
+        for nombre in CAMPOS_VECTORIZADOS:
+            setattr(mundo, nombre, getattr(mundo, nombre)[orden])
+        return mundo
+
+    def cerrar(self):
+        for conexion in self._conexiones:
+            conexion.send(("fin", None))
+            conexion.close()
+        for proceso in self._procesos:
+            proceso.join()
+        self._conexiones = []
+        self._procesos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+#----------P L A N I F I C A D O R----------
+# Hay una copia idéntica en "GeoZ v1 definitivo.0": cada script se ejecuta por separado, así que los
+# cambios se hacen en las dos (las pruebas comprueban que sigan iguales).
+class PlanificadorTurnos:
+    """Paso fijo de simulación independiente de los frames dibujados.
+
+    Acumula el tiempo real de cada frame y dice cuántos turnos tocan según `turnos_por_segundo`
+    y la velocidad actual. Si la simulación se atrasa más de `max_turnos_por_frame` (escalado por
+    la velocidad) o del presupuesto de tiempo del frame, descarta el atraso en vez de congelar la
+    ventana. A velocidades altas se ejecutan varios turnos por frame y solo se dibuja el último.
+    """
+    VELOCIDADES = [0.25, 0.5, 1, 2, 5, 10, 100]
+
+    def __init__(self, turnos_por_segundo:float=1.0, fps_max:int=60, max_turnos_por_frame:int=4):
+        self.turnos_por_segundo = turnos_por_segundo
+        self.fps_max = fps_max
+        self.max_turnos_por_frame = max_turnos_por_frame
+        self.presupuesto_frame = 0.8 / fps_max  # segundos de simulación permitidos por frame
+        self.velocidad = 1
+        self.pausado = False
+        self.pasos_pendientes = 0
+        self.acumulado = 0.0
+
+    def alternar_pausa(self):
+        self.pausado = not self.pausado
+        self.acumulado = 0.0
+
+    def paso(self):
+        """En pausa, pide un único turno en el próximo frame."""
+        self.pausado = True
+        self.pasos_pendientes += 1
+
+    def acelerar(self):
+        indice = self.VELOCIDADES.index(self.velocidad) if self.velocidad in self.VELOCIDADES else 2
+        self.velocidad = self.VELOCIDADES[min(indice + 1, len(self.VELOCIDADES) - 1)]
+
+    def frenar(self):
+        indice = self.VELOCIDADES.index(self.velocidad) if self.velocidad in self.VELOCIDADES else 2
+        self.velocidad = self.VELOCIDADES[max(indice - 1, 0)]
+
+    def turnos_pendientes(self, dt:float):
+        """Turnos a simular tras un frame de `dt` segundos."""
+        if self.pausado:
+            pasos, self.pasos_pendientes = self.pasos_pendientes, 0
+            return pasos
+        self.acumulado += min(dt, 0.25) * self.turnos_por_segundo * self.velocidad
+        turnos = int(self.acumulado)
+        tope = max(1, int(self.max_turnos_por_frame * self.velocidad))
+        if turnos > tope:
+            turnos = tope
+            self.acumulado = 0.0
+        else:
+            self.acumulado -= turnos
+        return turnos
+
+    def ejecutar(self, dt:float, turno):
+        """Llama a `turno()` tantas veces como toque este frame, sin pasarse del presupuesto."""
+        pendientes = self.turnos_pendientes(dt)
+        limite = time.perf_counter() + self.presupuesto_frame
+        hechos = 0
+        for _ in range(pendientes):
+            turno()
+            hechos += 1
+            if time.perf_counter() > limite:
+                self.acumulado = 0.0
+                break
+        return hechos
+
+    def descripcion(self):
+        if self.pausado:
+            return "Pausa (N = paso)"
+        return f"x{self.velocidad:g} ({self.turnos_por_segundo * self.velocidad:g} turnos/s)"
+
+#----------R E N D E R I Z A D O----------
+COLORES_TERRENO = {
+    "ciudad": (169, 169, 169),
+    "zona_zombie": (255, 0, 0),
+    "campo": (34, 139, 34),
+    "lago": (0, 191, 255),
+    "rio": (30, 144, 255),
+    "bosque": (0, 100, 0),
+    "mina": (139, 69, 19),
+}
+COLOR_TERRENO_DEFECTO = (34, 139, 34)
+# color por código de terreno, para pintar la rejilla entera con una sola indexación
+PALETA_TERRENO = np.array([COLORES_TERRENO.get(nombre, COLOR_TERRENO_DEFECTO) for nombre in NOMBRES_TERRENO], dtype=np.uint8)
+COLOR_JUGADOR = (255, 255, 255)
+COLORES_ENTIDAD = {
+    Civil_Normal: (0, 0, 255),
+    Atacante: (0, 255, 255),
+    Defensor: (255, 165, 0),
+    Productor: (255, 192, 203),
+    Cientifico: (75, 0, 150),
+    Medico: (0, 255, 0),
+    Verde: (34, 119, 34),
+    Morado: (128, 0, 128),
+    Amarillo: (255, 255, 0),
+}
+# mismos colores por código de tipo del motor vectorizado
+COLORES_TIPO_VECTORIZADO = np.array([COLOR_JUGADOR if clase is Jugador else COLORES_ENTIDAD[clase]
+                                     for clase in TIPOS_VECTORIZADOS], dtype=np.uint8)
+
+def codificar_png(imagen, nivel:int=6):
+    """Bytes de un PNG RGB de 8 bits a partir de un array (alto, ancho, 3) uint8, sin dependencias."""
+    alto, ancho, _ = imagen.shape
+    filas = np.zeros((alto, ancho * 3 + 1), dtype=np.uint8)  # cada fila empieza con el filtro 0 (ninguno)
+    filas[:, 1:] = imagen.reshape(alto, ancho * 3)
+
+    def bloque(tipo:bytes, datos:bytes):
+        return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", zlib.crc32(tipo + datos) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + bloque(b"IHDR", struct.pack(">IIBBBBB", ancho, alto, 8, 2, 0, 0, 0))
+            + bloque(b"IDAT", zlib.compress(filas.tobytes(), nivel))
+            + bloque(b"IEND", b""))
+
+class RenderizadorRGB:
+    """Dibuja un escenario en un array RGB (alto * escala, ancho * escala, 3) sin pygame ni ventana.
+
+    Usa los colores de la Vista: terreno de fondo y, en las celdas ocupadas, el color de la entidad que la
+    Vista pintaría encima (la última de la celda). Con escala 1 cada celda es un píxel; con más, la entidad
+    es un cuadrado centrado de media celda. Acepta Escenario y EscenarioVectorizado (leído de sus arrays);
+    un EscenarioFragmentado se reúne antes de dibujarlo.
+    """
+    def __init__(self, escala:int=1):
+        self.escala = escala
+        self._fondo = None
+        self._clave_fondo = None
+
+    def fondo(self, escenario):
+        """Colores del terreno por celda (alto, ancho, 3); se rehace solo si cambia el mapa."""
+        mapa = getattr(escenario, "mapa", None)
+        clave = (escenario.ancho, escenario.alto) if mapa is None else (id(mapa), mapa.version)
+        if clave != self._clave_fondo:
+            if mapa is None:
+                self._fondo = np.empty((escenario.alto, escenario.ancho, 3), dtype=np.uint8)
+                self._fondo[...] = COLOR_TERRENO_DEFECTO
+            else:
+                self._fondo = mapa.colores(PALETA_TERRENO).transpose(1, 0, 2)
+            self._clave_fondo = clave
+        return self._fondo
+
+    def entidades(self, escenario):
+        """(ocupada, color): máscara (alto, ancho) de celdas con entidad visible y su color."""
+        ocupada = np.zeros((escenario.alto, escenario.ancho), dtype=bool)
+        color = np.zeros((escenario.alto, escenario.ancho, 3), dtype=np.uint8)
+        if isinstance(escenario, EscenarioVectorizado):
+            vivos = np.flatnonzero(escenario.con_vida)
+            xs = escenario.posicion_x[vivos] - escenario.origen_x
+            ys = escenario.posicion_y[vivos] - escenario.origen_y
+            ocupada[ys, xs] = True
+            color[ys, xs] = COLORES_TIPO_VECTORIZADO[escenario.tipo[vivos]]
+            return ocupada, color
+        for celda in escenario.celdas():
+            for entidad in reversed(celda.entidades):
+                color_entidad = COLOR_JUGADOR if isinstance(entidad, Jugador) else COLORES_ENTIDAD.get(type(entidad))
+                if color_entidad is not None:
+                    ocupada[celda.posicion_y, celda.posicion_x] = True
+                    color[celda.posicion_y, celda.posicion_x] = color_entidad
+                    break
+        return ocupada, color
+
+    def renderizar(self, escenario):
+        """Array nuevo en cada llamada, así que se puede pasar a otro hilo sin copiarlo."""
+        if isinstance(escenario, EscenarioFragmentado):
+            escenario = escenario.reunir()
+        fondo = self.fondo(escenario)
+        ocupada, color = self.entidades(escenario)
+        escala = self.escala
+        if escala == 1:
+            return np.where(ocupada[:, :, None], color, fondo)
+        alto, ancho = ocupada.shape
+        bloques = np.empty((alto, ancho, escala, escala, 3), dtype=np.uint8)
+        bloques[...] = fondo[:, :, None, None, :]
+        lado = max(1, escala // 2)
+        inicio = (escala - lado) // 2
+        bloques[ocupada, inicio:inicio + lado, inicio:inicio + lado] = color[ocupada][:, None, None, :]
+        return bloques.transpose(0, 2, 1, 3, 4).reshape(alto * escala, ancho * escala, 3)
+
+class GrabadorFrames:
+    """Graba un frame cada `cada` turnos: secuencia PNG en el directorio `ruta`, o vídeo RGB24 crudo si
+    `ruta` termina en .rgb/.raw (un frame tras otro, sin cabecera).
+
+    El dibujo (numpy) se hace en el hilo de la simulación; la compresión y la escritura van a un pool de
+    hilos (zlib suelta el GIL). Con más de `max_pendientes` frames en cola se espera al más antiguo.
+    """
+    def __init__(self, ruta:str, escala:int=1, cada:int=1, hilos:int=2, max_pendientes:int=16):
+        self.ruta = ruta
+        self.cada = cada
+        self.max_pendientes = max_pendientes
+        self.renderizador = RenderizadorRGB(escala)
+        self.crudo = ruta.lower().endswith((".rgb", ".raw"))
+        if self.crudo:
+            self.archivo = open(ruta, "wb")
+            hilos = 1  # los frames crudos tienen que escribirse en orden
+        else:
+            self.archivo = None
+            os.makedirs(ruta, exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=hilos)
+        self.pendientes = deque()
+        self.turnos = 0
+        self.frames = 0
+        self.tamaño = None  # (ancho, alto) en píxeles del primer frame
+
+    def capturar(self, escenario):
+        turno = self.turnos
+        self.turnos += 1
+        if turno % self.cada:
+            return
+        imagen = self.renderizador.renderizar(escenario)
+        if self.tamaño is None:
+            self.tamaño = (imagen.shape[1], imagen.shape[0])
+        if self.crudo:
+            tarea = self.pool.submit(self.archivo.write, imagen.tobytes())
+        else:
+            tarea = self.pool.submit(self._escribir_png, os.path.join(self.ruta, f"frame_{self.frames:06d}.png"), imagen)
+        self.pendientes.append(tarea)
+        self.frames += 1
+        while len(self.pendientes) > self.max_pendientes:
+            self.pendientes.popleft().result()
+
+    @staticmethod
+    def _escribir_png(ruta:str, imagen):
+        with open(ruta, "wb") as f:
+            f.write(codificar_png(imagen))
+
+    def cerrar(self):
+        """Espera a que se escriban todos los frames; devuelve cuántos se grabaron."""
+        while self.pendientes:
+            self.pendientes.popleft().result()
+        self.pool.shutdown()
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
+        return self.frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+class RenderizadorEscenario:
+    """Dibuja el tablero con una capa de terreno cacheada y solo repinta las celdas modificadas."""
+    def __init__(self, escenario:Escenario, jugador:Jugador, celda_ancho:int, celda_alto:int):
+        self.escenario = escenario
+        self.jugador = jugador
+        self.celda_ancho = celda_ancho
+        self.celda_alto = celda_alto
+        self.radio = min(celda_ancho, celda_alto) // 4
+        self.capa_terreno = None
+        self.version_terreno = None
+        self.pos_jugador = None
+        self.construir_capa_terreno()
+
+    def construir_capa_terreno(self):
+        """Pinta el terreno una sola vez; solo hace falta repetirlo si cambian los tipos de celda."""
+        escenario = self.escenario
+        # un píxel por celda desde la rejilla de terreno y después escalado sin suavizar al tamaño de celda
+        pixeles = pygame.Surface((escenario.ancho, escenario.alto))
+        pygame.surfarray.blit_array(pixeles, escenario.mapa.colores(PALETA_TERRENO))
+        self.version_terreno = escenario.mapa.version
+        self.capa_terreno = pygame.transform.scale(pixeles, (escenario.ancho * self.celda_ancho, escenario.alto * self.celda_alto))
+
+    def rect_celda(self, x:int, y:int):
+        return pygame.Rect(x * self.celda_ancho, y * self.celda_alto, self.celda_ancho, self.celda_alto)
+
+    def dibujar_celda(self, superficie, x:int, y:int):
+        rect = self.rect_celda(x, y)
+        superficie.blit(self.capa_terreno, rect, rect)
+        celda = self.escenario.celda_existente(x, y)
+        if celda is None:
+            return rect
+        centro = (rect.x + self.celda_ancho // 2, rect.y + self.celda_alto // 2)
+        for entidad in celda.entidades:
+            if entidad is self.jugador:
+                color_entidad = COLOR_JUGADOR
+            else:
+                color_entidad = COLORES_ENTIDAD.get(type(entidad))
+                if color_entidad is None:
+                    continue
+            pygame.draw.circle(superficie, color_entidad, centro, self.radio)
+        return rect
+
+    def dibujar_completo(self, superficie):
+        """Repinta todo el tablero; devuelve el rect cubierto."""
+        self.escenario.extraer_celdas_modificadas()
+        superficie.blit(self.capa_terreno, (0, 0))
+        for celda in self.escenario.celdas():
+            if celda.entidades:
+                self.dibujar_celda(superficie, celda.posicion_x, celda.posicion_y)
+        self.pos_jugador = (self.jugador.posicion_x, self.jugador.posicion_y)
+        return [self.capa_terreno.get_rect()]
+
+    def dibujar_modificadas(self, superficie):
+        """Repinta solo las celdas cambiadas desde el último dibujo; devuelve sus rects."""
+        if self.escenario.mapa.version != self.version_terreno:
+            # cambió el terreno: se rehace la capa y se repinta entero
+            self.construir_capa_terreno()
+            return self.dibujar_completo(superficie)
+        modificadas = self.escenario.extraer_celdas_modificadas()
+        # el jugador puede quedar fuera de los personajes (p. ej. muerto), se sigue su posición aparte
+        pos_jugador = (self.jugador.posicion_x, self.jugador.posicion_y)
+        if pos_jugador != self.pos_jugador:
+            if self.pos_jugador is not None:
+                modificadas.add(self.pos_jugador)
+            modificadas.add(pos_jugador)
+            self.pos_jugador = pos_jugador
+        return [self.dibujar_celda(superficie, x, y) for x, y in modificadas]
+
+    def dibujar_area(self, superficie, rect):
+        """Repinta terreno y entidades bajo `rect` (p. ej. al quitar un recuadro superpuesto)."""
+        rect = rect.clip(self.capa_terreno.get_rect())
+        superficie.blit(self.capa_terreno, rect, rect)
+        tablero = self.escenario.tablero
+        for x in range(rect.left // self.celda_ancho, (rect.right - 1) // self.celda_ancho + 1):
+            columna = tablero[x]
+            for y in range(rect.top // self.celda_alto, (rect.bottom - 1) // self.celda_alto + 1):
+                celda = columna.get(y)
+                if celda is not None and celda.entidades:
+                    self.dibujar_celda(superficie, x, y)
+        return rect
+
+class OverlayPerfil:
+    """Recuadro sobre el tablero con las fases más costosas del último turno de un PerfiladorTurno."""
+    def __init__(self, renderizador:RenderizadorEscenario, ancho:int=320, alto_linea:int=16):
+        self.renderizador = renderizador
+        self.ancho = ancho
+        self.alto_linea = alto_linea
+        self.fuente = pygame.font.SysFont(None, 18)
+        self.superficie = None
+        self.rect = None  # zona ocupada en pantalla por el último dibujo
+        self.turno = None
+
+    def dibujar(self, ventana, perfilador:PerfiladorTurno, rects_tablero):
+        """Pinta el recuadro si hay un turno nuevo o el tablero lo tapó; devuelve los rects a actualizar."""
+        nuevo = perfilador.turno != self.turno
+        if nuevo:
+            self.turno = perfilador.turno
+            lineas = perfilador.lineas()
+            self.superficie = pygame.Surface((self.ancho, len(lineas) * self.alto_linea + 8), pygame.SRCALPHA)
+            self.superficie.fill((0, 0, 0, 180))
+            for i, texto in enumerate(lineas):
+                self.superficie.blit(self.fuente.render(texto, True, (255, 255, 255)), (6, 4 + i * self.alto_linea))
+        elif self.rect is not None and self.rect.collidelist(rects_tablero) < 0:
+            return []
+        # el recuadro es translúcido: antes de pintarlo se restaura el tablero que tenía debajo
+        rects = self.quitar(ventana)
+        self.rect = ventana.blit(self.superficie, (4, 4))
+        return rects + [self.rect]
+
+    def quitar(self, ventana):
+        """Borra el recuadro restaurando el tablero; devuelve los rects a actualizar."""
+        if self.rect is None:
+            return []
+        rect = self.renderizador.dibujar_area(ventana, self.rect)
+        self.rect = None
+        return [rect]
+
+class RegistroMensajes:
+    """Últimos `capacidad` mensajes de la partida en un anillo (deque con maxlen), con totales por categoría.
+
+    `version` sube con cada lote nuevo; la barra lateral la usa para saber si tiene que rehacer sus líneas.
+    """
+    def __init__(self, capacidad:int=20):
+        self.mensajes = deque(maxlen=capacidad)  # (categoria, mensaje), el más reciente al final
+        self.por_categoria = Counter()  # cuenta también los que ya no caben
+        self.version = 0
+
+    def agregar(self, mensaje:str, categoria:str="Jugador"):
+        self.mensajes.append((categoria, mensaje))
+        self.por_categoria[categoria] += 1
+        self.version += 1
+
+    def agregar_turno(self, eventos):
+        """Añade los eventos de un turno; solo se formatean los que caben en el registro."""
+        if not eventos:
+            return
+        contar = getattr(eventos, "contar", None)
+        self.por_categoria.update(contar() if contar is not None else Counter(categoria for categoria, _ in eventos))
+        self.mensajes.extend(eventos[-self.mensajes.maxlen:])
+        self.version += 1
+
+    def ultimos(self, n:int):
+        """Los `n` mensajes más recientes, del más nuevo al más viejo."""
+        return [mensaje for _, mensaje in islice(reversed(self.mensajes), n)]
+
+    def __iter__(self):
+        return (mensaje for _, mensaje in self.mensajes)
+
+    def __len__(self):
+        return len(self.mensajes)
+
+class BarraLateral:
+    """Barra lateral con la fuente cargada una sola vez y caché LRU de líneas ya renderizadas.
+
+    El contenido se compone en una superficie propia y solo se rehace cuando cambian las
+    líneas (firma distinta) o el scroll.
+    """
+    def __init__(self, x:int, ancho:int, alto:int, alto_linea:int=25, capacidad_cache:int=256):
+        self.rect = pygame.Rect(x, 0, ancho, alto)
+        self.alto_linea = alto_linea
+        self.fuente = pygame.font.SysFont(None, 20)
+        self.superficie = pygame.Surface((ancho, alto))
+        self.cache = OrderedDict()
+        self.capacidad_cache = capacidad_cache
+        self.lineas = []
+        self.firma = None
+        self.scroll = 0
+        self.sucia = True
+
+    def renderizar_texto(self, texto:str, color):
+        clave = (texto, color)
+        render = self.cache.get(clave)
+        if render is None:
+            render = self.fuente.render(texto, True, color)
+            self.cache[clave] = render
+            if len(self.cache) > self.capacidad_cache:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(clave)
+        return render
+
+    def actualizar_lineas(self, firma, construir_lineas):
+        """Reconstruye las líneas con `construir_lineas()` solo si la firma cambió."""
+        if firma != self.firma:
+            self.firma = firma
+            self.lineas = construir_lineas()
+            self.sucia = True
+
+    def desplazar(self, delta_px:int):
+        self.scroll += delta_px
+        self.sucia = True
+
+    def dibujar(self, ventana, forzar:bool=False):
+        """Copia la barra a la ventana si cambió; devuelve el rect actualizado o None."""
+        if self.sucia:
+            self.componer()
+        elif not forzar:
+            return None
+        ventana.blit(self.superficie, self.rect)
+        return self.rect
+
+    def componer(self):
+        self.sucia = False
+        ancho, visible_height = self.rect.width, self.rect.height
+        self.superficie.fill((30, 30, 30))
+
+        # Calcular scroll
+        total_lines = len(self.lineas)
+        total_height = total_lines * self.alto_linea
+        max_scroll_px = max(0, total_height - visible_height)
+
+        # Limitar scroll
+        self.scroll = min(max(self.scroll, 0), max_scroll_px)
+
+        start_line = int(self.scroll // self.alto_linea)
+        y_offset_px = -(self.scroll % self.alto_linea)
+
+        # Dibujar líneas visibles
+        y = y_offset_px + 20
+        max_visible_lines = visible_height // self.alto_linea + 2
+        end_line = min(total_lines, start_line + max_visible_lines)
+
+        for idx in range(start_line, end_line):
+            text = self.lineas[idx]
+            if text.startswith("•"):
+                color = (200, 200, 100)
+            else:
+                color = (255, 255, 255)
+            self.superficie.blit(self.renderizar_texto(text, color), (10, y))
+            y += self.alto_linea
+
+        # Dibujar scrollbar si hace falta
+        if total_height > visible_height:
+            bar_w = 6
+            bar_x = ancho - 12
+            bar_y = 4
+            bar_h = visible_height - 8
+            pygame.draw.rect(self.superficie, (60, 60, 60), (bar_x, bar_y, bar_w, bar_h))
 
-            personaje.mover_aleatorio(self)
-
-            if isinstance(personaje, Medico):
-                curado = personaje.curar_en_celda(self)
-                if curado:
-                    eventos.append(("Medicos", f"Médico cura a {curado.__class__.__name__} en ({personaje.posicion_x},{personaje.posicion_y})."))
-
-            elif isinstance(personaje, Cientifico):
-                x = personaje.posicion_x
-                y = personaje.posicion_y
-                cel = self.tablero[x][y]
-                infectados = [e for e in cel.entidades if isinstance(e, Civil) and e.estado and e.con_vida]
-                if infectados:
-                    personaje.reducir_tiempo_espera(infectados)
-                    eventos.append(("Cientificos", f"Científico ayuda a {len(infectados)} infectado(s) en ({x},{y})."))
-
-            elif isinstance(personaje, Productor):
-                x = personaje.posicion_x
-                y = personaje.posicion_y
-                cel = self.tablero[x][y]
-                for ent in list(cel.entidades):
-                    if isinstance(ent, Recurso) and ent.cantidad > 0:
-                        res = personaje.recolectar(ent)
-                        if res:
-                            eventos.append(("Productores", f"Productor en ({x},{y}) recolecta {res[1]}x {res[0]}."))
-                        break
-
-            elif isinstance(personaje, Atacante):
-                resultado = personaje.atacar(self)
-                if resultado:
-                    tipo, daño, killed, pos = resultado
-                    eventos.append(("Atacantes", f"Atacante en ({pos[0]},{pos[1]}) ataca {tipo} (-{daño} vida)."))
-                    if killed:
-                        eventos.append(("Atacantes", f"Atacante mata a {tipo} en ({pos[0]},{pos[1]})."))
-
-            elif isinstance(personaje, Defensor):
-                x = personaje.posicion_x
-                y = personaje.posicion_y
-                cel = self.tablero[x][y]
-                for entidad in cel.entidades:
-                    if isinstance(entidad, Civil) and entidad.con_vida and entidad is not personaje:
-                        protegido = personaje.proteger(entidad)
-                        if protegido:
-                            eventos.append(("Defensores", f"Defensor protege a {entidad.__class__.__name__} en ({x},{y})."))
-                        break
-
-            elif isinstance(personaje, Verde):
-                x = personaje.posicion_x
-                y = personaje.posicion_y
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        if dx == 0 and dy == 0:
-                            continue
-                        nx = x + dx
-                        ny = y + dy
-                        if 0 <= nx < self.ancho and 0 <= ny < self.alto:
-                            celda = self.tablero[nx][ny]
-                            for entidad in list(celda.entidades):
-                                if isinstance(entidad, Civil) and entidad.con_vida and not entidad.estado:
-                                    infectado = personaje.escupir(entidad)
-                                    if infectado:
-                                        eventos.append(("Zombie_Verde", f"Zombi Verde infecta a {infectado.__class__.__name__} en ({nx},{ny})."))
-                                    break
-
-            elif isinstance(personaje, Morado):
-                x = personaje.posicion_x
-                y = personaje.posicion_y
-                cel = self.tablero[x][y]
-                for entidad in list(cel.entidades):
-                    if isinstance(entidad, Civil) and entidad.con_vida:
-                        muerto = personaje.aplastar(entidad)
-                        if muerto:
-                            eventos.append(("Zombie_Morado", f"Zombi Morado aplasta a {muerto.__class__.__name__} en ({x},{y})."))
-                            try:
-                                cel.entidades.remove(muerto)
-                            except ValueError:
-                                pass
-                            if muerto in self.personajes:
-                                self.personajes.remove(muerto)
-                        break
-
-            elif isinstance(personaje, Amarillo):
-                infectados = personaje.doble_atacar(self)
-                if infectados:
-                    x = personaje.posicion_x
-                    y = personaje.posicion_y
-                    eventos.append(("Zombie_Amarillo", f"Zombi Amarillo infecta {len(infectados)} civil(es) en ({x},{y})."))
-
-        return eventos
+            handle_h = max(20, int(bar_h * (visible_height / total_height)))
+            if max_scroll_px > 0:
+                handle_y = bar_y + int((bar_h - handle_h) * (self.scroll / max_scroll_px))
+            else:
+                handle_y = bar_y
+            pygame.draw.rect(self.superficie, (160, 160, 160), (bar_x, handle_y, bar_w, handle_h))
 
 class Vista:
-    def __init__(self, escenario:Escenario, jugador:Jugador, ancho_ventana:int=800, alto_ventana:int=600):
+    def __init__(self, escenario:Escenario, jugador:Jugador, ancho_ventana:int=800, alto_ventana:int=600,
+                 turnos_por_segundo:float=1.0, fps_max:int=60):
+        cargar_pygame()
         pygame.init()
         self.jugador = jugador
         self.escenario = escenario
@@ -650,36 +3174,41 @@ class Vista:
         celda_alto = min(20, (pantalla_alto - margen) // self.escenario.alto)
         self.alto_ventana = celda_alto * self.escenario.alto
 
-        self.mensajes = []
+        self.mensajes = RegistroMensajes(20)
         self.tiempo_mensaje = 0
         
         # SCROLL para la barra lateral completa
-        self.sidebar_scroll = 0
         self.sidebar_line_h = 25
         self.sidebar_scroll_speed = 3
         
         self.ventana = pygame.display.set_mode((self.ancho_ventana, self.alto_ventana))
         pygame.display.set_caption("GeoZ4 - Simulación de Supervivencia Zombie")
         self.reloj = pygame.time.Clock()
+        self.planificador = PlanificadorTurnos(turnos_por_segundo, fps_max)
+        self.renderizador = RenderizadorEscenario(self.escenario, self.jugador,
+                                                  (self.ancho_ventana - self.barra_ancho) // self.escenario.ancho,
+                                                  self.alto_ventana // self.escenario.alto)
+        self.barra = BarraLateral(self.ancho_ventana - self.barra_ancho, self.barra_ancho, self.alto_ventana, self.sidebar_line_h)
+        self.overlay_perfil = OverlayPerfil(self.renderizador)
         self.correr_simulacion()
 
     def ejecutar_turno(self):
         """Ejecuta el turno de todas las entidades y registra eventos."""
         # Simular turno del escenario (zombies atacan civiles, etc.)
         eventos = self.escenario.simular_turno()
-        for categoria, mensaje in eventos:
-            self.mensajes.append(mensaje)
-        
-        # Mantener solo los últimos mensajes
-        while len(self.mensajes) > 20:
-            self.mensajes.pop(0)
+        self.mensajes.agregar_turno(eventos)
 
     def correr_simulacion(self):
         corriendo = True
-        contador_turnos = 0
         contador_movimiento = 0
         velocidad_movimiento = 8
 
+        # primer frame completo; después solo se repinta lo que cambia
+        self.ventana.fill((0, 0, 0))
+        self.dibujar_escenario(completo=True)
+        self.dibujar_barra_lateral(forzar=True)
+        pygame.display.flip()
+
         while corriendo:
             for evento in pygame.event.get():
                 if evento.type == pygame.QUIT:
@@ -697,100 +3226,82 @@ class Vista:
                     elif evento.key == pygame.K_e:
                         resultado = self.jugador.interactuar(self.escenario)
                         if resultado:
-                            self.mensajes.append(resultado)
-                            if len(self.mensajes) > 20:
-                                self.mensajes.pop(0)
+                            self.mensajes.agregar(resultado)
+                    elif evento.key == pygame.K_p:
+                        self.planificador.alternar_pausa()
+                    elif evento.key == pygame.K_n:
+                        self.planificador.paso()
+                    elif evento.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        self.planificador.acelerar()
+                    elif evento.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        self.planificador.frenar()
+                    elif evento.key == pygame.K_F3:
+                        self.alternar_perfil()
+                    elif evento.key == pygame.K_F4:
+                        self.exportar_perfil()
 
                 elif evento.type == pygame.MOUSEWHEEL:
                     # Scroll de la barra lateral con rueda del ratón
                     delta_px = -evento.y * self.sidebar_line_h * self.sidebar_scroll_speed
-                    self.sidebar_scroll += delta_px
+                    self.barra.desplazar(delta_px)
 
-            self.ventana.fill((0, 0, 0))
-            self.dibujar_escenario()
-            self.dibujar_barra_lateral()
+            # solo se envían a pantalla las celdas que cambiaron y la barra lateral
+            rects = self.dibujar_escenario()
+            if self.escenario.perfilador is not None:
+                rects += self.overlay_perfil.dibujar(self.ventana, self.escenario.perfilador, rects)
+            rect_barra = self.dibujar_barra_lateral()
+            if rect_barra:
+                rects.append(rect_barra)
+            pygame.display.update(rects)
 
-            pygame.display.flip()
-            contador_turnos += 1
-            if contador_turnos >= 30:
-                self.ejecutar_turno()
-                contador_turnos = 0
+            # los turnos dependen del tiempo real, no del número de frames dibujados
+            dt = self.reloj.tick(self.planificador.fps_max) / 1000
+            self.planificador.ejecutar(dt, self.ejecutar_turno)
 
             if not self.jugador.con_vida:
                 if not any("ha muerto" in m.lower() for m in self.mensajes):
-                    self.mensajes.append("El jugador ha muerto. Fin de la simulación.")
+                    self.mensajes.agregar("El jugador ha muerto. Fin de la simulación.", "General")
                 self.ventana.fill((0, 0, 0))
-                self.dibujar_escenario()
-                self.dibujar_barra_lateral()
+                self.dibujar_escenario(completo=True)
+                self.dibujar_barra_lateral(forzar=True)
                 pygame.display.flip()
                 pygame.time.delay(3000)
                 corriendo = False
                 break
-
-            self.reloj.tick(30)
         pygame.quit()
 
-    def dibujar_escenario(self):
-        celda_ancho = (self.ancho_ventana - self.barra_ancho) // self.escenario.ancho
-        celda_alto = self.alto_ventana // self.escenario.alto
-
-        for x in range(self.escenario.ancho):
-            for y in range(self.escenario.alto):
-                celda = self.escenario.tablero[x][y]
-                color_celda = (34, 139, 34)
-
-                if celda.tipo == "ciudad":
-                    color_celda = (169, 169, 169)
-                elif celda.tipo == "zona_zombie":
-                    color_celda = (255, 0, 0)
-                elif celda.tipo == "campo":
-                    color_celda = (34, 139, 34)
-                elif celda.tipo == "lago":
-                    color_celda = (0, 191, 255)
-                elif celda.tipo == "rio":
-                    color_celda = (30, 144, 255)
-                elif celda.tipo == "bosque":
-                    color_celda = (0, 100, 0)
-                elif celda.tipo == "mina":
-                    color_celda = (139, 69, 19)
-                
-                pygame.draw.rect(self.ventana, color_celda, (x * celda_ancho, y * celda_alto, celda_ancho, celda_alto))
-
-                for entidad in celda.entidades:
-                    if entidad is self.jugador:
-                        color_entidad = (255, 255, 255)
-                    elif isinstance(entidad, Civil_Normal):
-                        color_entidad = (0, 0, 255)
-                    elif isinstance(entidad, Atacante):
-                        color_entidad = (0, 255, 255)
-                    elif isinstance(entidad, Defensor):
-                        color_entidad = (255, 165, 0)
-                    elif isinstance(entidad, Productor):
-                        color_entidad = (255, 192, 203)
-                    elif isinstance(entidad, Cientifico):
-                        color_entidad = (75, 0, 150)
-                    elif isinstance(entidad, Medico):
-                        color_entidad = (0, 255, 0)
-                    elif isinstance(entidad, Verde):
-                        color_entidad = (34, 119, 34)
-                    elif isinstance(entidad, Morado):
-                        color_entidad = (128, 0, 128)
-                    elif isinstance(entidad, Amarillo):
-                        color_entidad = (255, 255, 0)
-                    else:
-                        continue
-
-                    pygame.draw.circle(self.ventana, color_entidad,
-                                       (x * celda_ancho + celda_ancho // 2,
-                                        y * celda_alto + celda_alto // 2),
-                                       min(celda_ancho, celda_alto) // 4)
-
-    def dibujar_barra_lateral(self):
-        fuente = pygame.font.SysFont(None, 20)
-        x_base = self.ancho_ventana - self.barra_ancho + 10
-        
-        pygame.draw.rect(self.ventana, (30, 30, 30), (self.ancho_ventana - self.barra_ancho, 0, self.barra_ancho, self.alto_ventana))
+    def dibujar_escenario(self, completo:bool=False):
+        """Dibuja el tablero y devuelve los rects de pantalla que cambiaron."""
+        if completo:
+            self.overlay_perfil.rect = None
+            return self.renderizador.dibujar_completo(self.ventana)
+        return self.renderizador.dibujar_modificadas(self.ventana)
+
+    def alternar_perfil(self):
+        """F3: activa o quita el perfilador del escenario y su recuadro en pantalla."""
+        if self.escenario.perfilador is None:
+            self.escenario.perfilador = PerfiladorTurno(historial=600)
+            self.overlay_perfil.turno = None
+        else:
+            self.escenario.perfilador = None
+            pygame.display.update(self.overlay_perfil.quitar(self.ventana))
 
+    def exportar_perfil(self, ruta:str="perfil_turnos.csv"):
+        """F4: vuelca el historial del perfilador a CSV."""
+        if self.escenario.perfilador is None:
+            return
+        self.escenario.perfilador.exportar(ruta)
+        self.mensajes.agregar(f"Perfil exportado a {ruta}", "Perfil")
+
+    def dibujar_barra_lateral(self, forzar:bool=False):
+        """Actualiza la barra lateral si cambió algo; devuelve su rect o None."""
+        j = self.jugador
+        firma = (j.vida, j.energia, j.estado, j.posicion_x, j.posicion_y, len(j.inventario), self.mensajes.version,
+                 self.planificador.descripcion())
+        self.barra.actualizar_lineas(firma, self.lineas_barra_lateral)
+        return self.barra.dibujar(self.ventana, forzar)
+
+    def lineas_barra_lateral(self):
         # Construir lista de líneas para la barra lateral
         lines = []
         lines.append("🧍 JUGADOR")
@@ -798,7 +3309,10 @@ class Vista:
         lines.append("W = Arriba, A = Izquierda")
         lines.append("S = Abajo, D = Derecha")
         lines.append("E: Interactuar")
+        lines.append("P: Pausa, N: Paso, +/-: Velocidad")
+        lines.append("F3: Perfil, F4: Exportar perfil")
         lines.append(" ---------------------------- ")
+        lines.append(f"Velocidad: {self.planificador.descripcion()}")
         lines.append(f"Vida: {self.jugador.vida}")
         lines.append(f"Energía: {self.jugador.energia}")
         lines.append(f"Infectado: {'Sí' if self.jugador.estado else 'No'}")
@@ -808,116 +3322,398 @@ class Vista:
             lines.append(f" - {item}")
         lines.append("")
         lines.append("Últimas acciones:")
-        for mensaje in reversed(self.mensajes[-10:]):
+        for mensaje in self.mensajes.ultimos(10):
             lines.append(f"• {mensaje}")
+        return lines
 
-        # Calcular scroll
-        total_lines = len(lines)
-        total_height = total_lines * self.sidebar_line_h
-        visible_height = self.alto_ventana
-        max_scroll_px = max(0, total_height - visible_height)
-
-        # Limitar scroll
-        if self.sidebar_scroll < 0:
-            self.sidebar_scroll = 0
-        if self.sidebar_scroll > max_scroll_px:
-            self.sidebar_scroll = max_scroll_px
-
-        start_line = int(self.sidebar_scroll // self.sidebar_line_h)
-        y_offset_px = -(self.sidebar_scroll % self.sidebar_line_h)
-
-        # Dibujar líneas visibles
-        y = y_offset_px + 20
-        max_visible_lines = visible_height // self.sidebar_line_h + 2
-        end_line = min(total_lines, start_line + max_visible_lines)
-
-        for idx in range(start_line, end_line):
-            text = lines[idx]
-            if text.startswith("•"):
-                color = (200, 200, 100)
-            else:
-                color = (255, 255, 255)
-            render = fuente.render(text, True, color)
-            self.ventana.blit(render, (x_base, y))
-            y += self.sidebar_line_h
-
-        # Dibujar scrollbar si hace falta
-        if total_height > visible_height:
-            bar_w = 6
-            bar_x = self.ancho_ventana - 12
-            bar_y = 4
-            bar_h = visible_height - 8
-            pygame.draw.rect(self.ventana, (60, 60, 60), (bar_x, bar_y, bar_w, bar_h))
-            
-            handle_h = max(20, int(bar_h * (visible_height / total_height)))
-            if max_scroll_px > 0:
-                handle_y = bar_y + int((bar_h - handle_h) * (self.sidebar_scroll / max_scroll_px))
-            else:
-                handle_y = bar_y
-            pygame.draw.rect(self.ventana, (160, 160, 160), (bar_x, handle_y, bar_w, handle_h))
-
-# Configuración del escenario
-escenario = Escenario(50, 50)
-
-escenario.definir_ciudad(17, 17, 16, 16)
-
-escenario.definir_zona_zombie(0, 0, 5, 5)
-escenario.definir_zona_zombie(45, 0, 5, 5)
-escenario.definir_zona_zombie(0, 45, 5, 5)
-escenario.definir_zona_zombie(45, 45, 5, 5)
-
-escenario.definir_lago(20, 40, 5, 5)
-escenario.definir_lago(5, 5, 6, 6)
-escenario.definir_lago(44, 15, 4, 4)
-escenario.definir_lago(44, 11, 5, 5)
-escenario.definir_lago(44, 19, 5, 5)
-
-escenario.definir_rio(7, 14, 30, 2)
-escenario.definir_rio(33, 33, 2, 10)
-escenario.definir_bosque(5, 20, 8, 8)
-escenario.definir_bosque(35, 5, 10, 10)
-
-# Poblar ciudad
-escenario.poblar_ciudad(
-    cantidad_normales=10,
-    cantidad_atacantes=5,
-    cantidad_defensores=3,
-    cantidad_productores=4,
-    cantidad_cientificos=2,
-    cantidad_medicos=3,
-    inicio_x=17, inicio_y=17, ancho=16, alto=16
-)
-
-# Crear jugador
-jugador = Jugador(posicion_x=24, posicion_y=24)
-escenario.agregar_personaje(jugador)
-
-# Iniciar vista
-if __name__ == "__main__":
+#----------S I M U L A C I O N   H E A D L E S S----------
+class SimulacionHeadless:
+    """Avanza el escenario lo más rápido posible, sin ventana, fuentes ni reloj de frames."""
+    def __init__(self, escenario:Escenario, grabador:GrabadorFrames=None):
+        self.escenario = escenario
+        self.grabador = grabador  # si hay, se graba un frame tras cada turno
+        self.turno = 0
+        self.total_eventos = 0
+
+    def civiles_vivos(self):
+        return self.escenario.civiles_vivos()
+
+    def correr(self, turnos:int, detener_sin_civiles:bool=False):
+        """Simula hasta `turnos` turnos y devuelve un resumen con los turnos por segundo."""
+        inicio = self.inicio = time.perf_counter()
+        simulados = 0
+        for _ in range(turnos):
+            eventos = self.escenario.simular_turno()
+            self.total_eventos += len(eventos)
+            self.turno += 1
+            simulados += 1
+            if self.grabador is not None:
+                self.grabador.capturar(self.escenario)
+            if detener_sin_civiles and self.civiles_vivos() == 0:
+                break
+        segundos = time.perf_counter() - inicio
+
+        return {
+            "turnos": simulados,
+            "segundos": segundos,
+            "turnos_por_segundo": simulados / segundos if segundos > 0 else float("inf"),
+            "eventos": self.total_eventos,
+            "civiles_vivos": self.civiles_vivos(),
+        }
+
+# Configuración del escenario: llamadas definir_*/poblar_* en orden, con sus argumentos
+CONFIGURACION_PREDETERMINADA = {
+    "ancho": 50,
+    "alto": 50,
+    "llamadas": [
+        ("definir_ciudad", (17, 17, 16, 16)),
+
+        ("definir_zona_zombie", (0, 0, 5, 5)),
+        ("definir_zona_zombie", (45, 0, 5, 5)),
+        ("definir_zona_zombie", (0, 45, 5, 5)),
+        ("definir_zona_zombie", (45, 45, 5, 5)),
+
+        ("definir_lago", (20, 40, 5, 5)),
+        ("definir_lago", (5, 5, 6, 6)),
+        ("definir_lago", (44, 15, 4, 4)),
+        ("definir_lago", (44, 11, 5, 5)),
+        ("definir_lago", (44, 19, 5, 5)),
+
+        ("definir_rio", (7, 14, 30, 2)),
+        ("definir_rio", (33, 33, 2, 10)),
+        ("definir_bosque", (5, 20, 8, 8)),
+        ("definir_bosque", (35, 5, 10, 10)),
+
+        # Poblar ciudad
+        ("poblar_ciudad", {
+            "cantidad_normales": 10,
+            "cantidad_atacantes": 5,
+            "cantidad_defensores": 3,
+            "cantidad_productores": 4,
+            "cantidad_cientificos": 2,
+            "cantidad_medicos": 3,
+            "inicio_x": 17, "inicio_y": 17, "ancho": 16, "alto": 16,
+        }),
+    ],
+}
+
+def construir_escenario(configuracion:dict, semilla:int=None):
+    """Crea un Escenario aplicando las llamadas definir_*/poblar_* de `configuracion`.
+
+    Si la configuración trae "movimiento_dirigido" (radio de búsqueda), los roles persiguen a su objetivo;
+    con "campo_flujo" (cada cuántos turnos recalcularlo) los zombis van hacia los civiles.
+    "regeneracion_recursos" es {tipo: (cantidad por turno, máximo)}.
+    """
+    escenario = Escenario(configuracion["ancho"], configuracion["alto"], semilla=semilla)
+    for nombre, argumentos in configuracion["llamadas"]:
+        if not nombre.startswith(("definir_", "poblar_")) or not hasattr(escenario, nombre):
+            raise ValueError(f"llamada de configuración no válida: {nombre}")
+        metodo = getattr(escenario, nombre)
+        if isinstance(argumentos, dict):
+            metodo(**argumentos)
+        else:
+            metodo(*argumentos)
+    aplicar_opciones(escenario, configuracion)
+    return escenario
+
+def aplicar_opciones(escenario:Escenario, opciones:dict):
+    """Activa movimiento dirigido, campo de flujo o regeneración de recursos si vienen en `opciones`."""
+    if opciones.get("movimiento_dirigido"):
+        escenario.activar_movimiento_dirigido(opciones["movimiento_dirigido"])
+    if opciones.get("campo_flujo"):
+        escenario.activar_campo_flujo(opciones["campo_flujo"])
+    if opciones.get("regeneracion_recursos"):
+        escenario.activar_regeneracion(opciones["regeneracion_recursos"])
+
+def crear_escenario_predeterminado(semilla:int=None):
+    return construir_escenario(CONFIGURACION_PREDETERMINADA, semilla)
+
+def correr_headless(turnos:int, repeticiones:int=1, semilla:int=None, detener_sin_civiles:bool=False, motor:str="objetos",
+                    masivo:tuple=None, fragmentos:tuple=None, perfilar:str=None, configuracion:dict=None,
+                    metricas:str=None, grabar:str=None, grabar_escala:int=1, grabar_cada:int=1):
+    """Lanza `repeticiones` simulaciones independientes sin pygame.
+
+    `motor` elige entre el Escenario de objetos y EscenarioVectorizado; `masivo` es una tupla
+    (ancho, alto, civiles, zombies) para generar un mundo vectorizado grande en lugar del predeterminado.
+    `fragmentos` (bloques_x, bloques_y) reparte el mundo vectorizado en procesos (EscenarioFragmentado).
+    `perfilar` es la ruta (.json o .csv) donde volcar el perfil por fases (solo motor de objetos).
+    `configuracion` sustituye a CONFIGURACION_PREDETERMINADA.
+    `metricas` es la ruta (.csv o .npz) de las series del brote (solo motor de objetos); con varias
+    repeticiones se añade el número de repetición al nombre.
+    `grabar` es un directorio para una secuencia PNG o un archivo .rgb de vídeo crudo (GrabadorFrames),
+    con `grabar_escala` píxeles por celda y un frame cada `grabar_cada` turnos.
+    """
+    configuracion = configuracion or CONFIGURACION_PREDETERMINADA
+    resultados = []
+    perfilador = PerfiladorTurno(historial=turnos * repeticiones) if perfilar else None
+    for i in range(repeticiones):
+        semilla_run = semilla + i if semilla is not None else None
+        if masivo is not None:
+            escenario = crear_escenario_vectorizado_masivo(*masivo, semilla=semilla_run)
+        elif motor == "vectorizado":
+            escenario = EscenarioVectorizado.desde_escenario(construir_escenario(configuracion, semilla_run))
+        else:
+            escenario = construir_escenario(configuracion, semilla_run)
+        if fragmentos is not None:
+            if not isinstance(escenario, EscenarioVectorizado):
+                escenario = EscenarioVectorizado.desde_escenario(escenario)
+            escenario = EscenarioFragmentado(escenario, *fragmentos)
+        if perfilador is not None and isinstance(escenario, Escenario):
+            escenario.perfilador = perfilador
+        if metricas and isinstance(escenario, Escenario):
+            escenario.activar_metricas(turnos + 1)
+        grabador = None
+        if grabar:
+            raiz, extension = os.path.splitext(grabar)
+            grabador = GrabadorFrames(grabar if repeticiones == 1 else f"{raiz}_{i}{extension}", grabar_escala, grabar_cada)
+        simulacion = SimulacionHeadless(escenario, grabador)
+        resumen = simulacion.correr(turnos, detener_sin_civiles=detener_sin_civiles)
+        if grabador is not None:
+            frames = grabador.cerrar()
+            segundos_totales = time.perf_counter() - simulacion.inicio
+            print(f"[Grabación] {frames} frames en {grabador.ruta} ({frames / segundos_totales:.1f} frames/s)")
+            if grabador.crudo and grabador.tamaño:
+                ancho_px, alto_px = grabador.tamaño
+                print(f"  ffmpeg -f rawvideo -pix_fmt rgb24 -s {ancho_px}x{alto_px} -r 30 -i {grabador.ruta} salida.mp4")
+        if metricas and isinstance(escenario, Escenario):
+            raiz, extension = os.path.splitext(metricas)
+            ruta = metricas if repeticiones == 1 else f"{raiz}_{i}{extension}"
+            escenario.metricas.exportar(ruta)
+            print(f"[Métricas] {escenario.metricas.n} filas volcadas en {ruta}")
+        if fragmentos is not None:
+            escenario.cerrar()
+        resumen["repeticion"] = i
+        resultados.append(resumen)
+        print(f"[Headless] run {i + 1}/{repeticiones}: {resumen['turnos']} turnos en {resumen['segundos']:.3f}s "
+              f"({resumen['turnos_por_segundo']:.1f} turnos/s), civiles vivos: {resumen['civiles_vivos']}")
+    if perfilador is not None:
+        if perfilador.turnos:
+            perfilador.exportar(perfilar)
+            print(f"[Perfil] {perfilador.turno} turnos volcados en {perfilar}")
+            for (fase, tipo), valores in list(perfilador.resumen().items())[:10]:
+                bloques = "" if valores["bloques"] is None else f"{valores['bloques']:>+10} bloques en total"
+                print(f"  {fase:<14}{tipo:<13}{valores['segundos_por_turno'] * 1000:8.3f} ms/turno"
+                      f"{valores['llamadas']:>9} llamadas{bloques}")
+        else:
+            print("[Perfil] el perfilador solo instrumenta el motor de objetos; no se midió nada")
+    return resultados
+
+#----------M O N T E   C A R L O----------
+def simular_corrida(configuracion:dict, semilla:int, turnos:int, detener_sin_civiles:bool=True):
+    """Una corrida completa en el proceso actual. Devuelve solo el resumen (nunca el mundo)."""
+    inicio = time.perf_counter()
+    escenario = construir_escenario(configuracion, semilla)
+    turnos_sobrevividos = turnos
+    for turno in range(1, turnos + 1):
+        escenario.simular_turno()
+        if escenario.civiles_vivos() == 0:
+            turnos_sobrevividos = turno
+            if detener_sin_civiles:
+                break
+    resumen = {
+        "semilla": semilla,
+        "turnos_sobrevividos": turnos_sobrevividos,
+        "civiles_vivos": escenario.civiles_vivos(),
+        "segundos": time.perf_counter() - inicio,
+    }
+    for clave, contador in escenario.estadisticas.items():
+        resumen[clave] = dict(contador)
+    return resumen
+
+def correr_montecarlo(configuracion:dict, semillas, turnos:int, procesos:int=None, detener_sin_civiles:bool=True):
+    """Reparte las corridas (una por semilla) entre `procesos` procesos y va devolviendo cada
+    resumen en cuanto termina, en orden de llegada. Con procesos=1 corre todo en este proceso."""
+    semillas = list(semillas)
+    if procesos == 1:
+        for semilla in semillas:
+            yield simular_corrida(configuracion, semilla, turnos, detener_sin_civiles)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes = [pool.submit(simular_corrida, configuracion, semilla, turnos, detener_sin_civiles) for semilla in semillas]
+        for futuro in as_completed(pendientes):
+            yield futuro.result()
+
+def agregar_montecarlo(resumenes):
+    """Combina resúmenes de corridas: probabilidad de supervivencia, medias y totales por clave."""
+    resumenes = list(resumenes)
+    n = len(resumenes)
+    total = {"corridas": n}
+    if not n:
+        return total
+    total["probabilidad_supervivencia"] = sum(1 for r in resumenes if r["civiles_vivos"] > 0) / n
+    total["turnos_sobrevividos_medio"] = sum(r["turnos_sobrevividos"] for r in resumenes) / n
+    for clave in ("infecciones", "muertes_por_color", "zombies_abatidos", "recursos_recolectados"):
+        acumulado = Counter()
+        for r in resumenes:
+            acumulado.update(r[clave])
+        total[clave + "_medio"] = {k: v / n for k, v in sorted(acumulado.items())}
+    return total
+
+#----------B I F U R C A C I O N E S----------
+def continuar_instantanea(instantanea:Instantanea, variante:dict, turnos:int, indice:int=0):
+    """Restaura `instantanea` con la `variante` ({"semilla": ..., opciones de construir_escenario}) y la
+    simula `turnos` turnos en el proceso actual. Devuelve las series del brote y totales por turno."""
+    inicio = time.perf_counter()
+    opciones = {clave: valor for clave, valor in variante.items() if clave != "semilla"}
+    escenario = instantanea.restaurar(variante.get("semilla"), opciones)
+    metricas = escenario.activar_metricas(turnos + 1)
+    for _ in range(turnos):
+        escenario.simular_turno()
+    series = {nombre: valores.copy() for nombre, valores in metricas.como_dict().items()}
+    civiles = sum(valores for nombre, valores in series.items() if nombre.endswith(("_sanos", "_infectados")))
+    zombies = sum(valores for nombre, valores in series.items() if nombre.startswith("zombies_"))
+    resultado = {
+        "indice": indice,
+        "variante": variante,
+        "series": series,
+        "civiles": civiles,
+        "zombies": zombies,
+        "segundos": time.perf_counter() - inicio,
+    }
+    for clave, contador in escenario.estadisticas.items():
+        resultado[clave] = dict(contador)
+    return resultado
+
+def bifurcar(instantanea:Instantanea, variantes, turnos:int, procesos:int=None):
+    """Una continuación por variante, repartidas entre `procesos` procesos como correr_montecarlo.
+    Devuelve cada resultado en cuanto termina; con procesos=1 corre todo en este proceso."""
+    variantes = list(variantes)
+    if procesos == 1:
+        for i, variante in enumerate(variantes):
+            yield continuar_instantanea(instantanea, variante, turnos, i)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        pendientes = [pool.submit(continuar_instantanea, instantanea, variante, turnos, i) for i, variante in enumerate(variantes)]
+        for futuro in as_completed(pendientes):
+            yield futuro.result()
+
+def resumir_divergencia(resultados):
+    """Compara las continuaciones de una misma instantánea, tomando la primera variante como referencia.
+
+    Da la dispersión de civiles y zombis vivos al final y su desviación máxima a lo largo de la corrida, y
+    para cada variante el primer turno en que se separa de la referencia y su mayor diferencia.
+    """
+    resultados = sorted(resultados, key=lambda r: r["indice"])
+    civiles = np.array([r["civiles"] for r in resultados], dtype=np.float64)
+    zombies = np.array([r["zombies"] for r in resultados], dtype=np.float64)
+    resumen = {
+        "continuaciones": len(resultados),
+        "civiles_final_media": float(civiles[:, -1].mean()),
+        "civiles_final_desviacion": float(civiles[:, -1].std()),
+        "zombies_final_media": float(zombies[:, -1].mean()),
+        "zombies_final_desviacion": float(zombies[:, -1].std()),
+        "civiles_desviacion_maxima": float(civiles.std(axis=0).max()),
+        "zombies_desviacion_maxima": float(zombies.std(axis=0).max()),
+        "variantes": [],
+    }
+    for r, fila_civiles, fila_zombies in zip(resultados, civiles, zombies):
+        distinto = np.flatnonzero((fila_civiles != civiles[0]) | (fila_zombies != zombies[0]))
+        resumen["variantes"].append({
+            "variante": r["variante"],
+            "primer_turno_distinto": int(distinto[0]) if distinto.size else None,
+            "diferencia_maxima_civiles": int(np.abs(fila_civiles - civiles[0]).max()),
+            "diferencia_maxima_zombies": int(np.abs(fila_zombies - zombies[0]).max()),
+            "civiles_final": int(fila_civiles[-1]),
+            "zombies_final": int(fila_zombies[-1]),
+        })
+    return resumen
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GeoZ4 - Simulación de Supervivencia Zombie")
+    parser.add_argument("--headless", action="store_true", help="simular sin ventana y reportar turnos/segundo")
+    parser.add_argument("--turnos", type=int, default=1000, help="turnos a simular en modo headless")
+    parser.add_argument("--repeticiones", type=int, default=1, help="simulaciones independientes en modo headless")
+    parser.add_argument("--semilla", type=int, default=None, help="semilla aleatoria inicial")
+    parser.add_argument("--detener-sin-civiles", action="store_true", help="cortar la simulación cuando no quedan civiles vivos")
+    parser.add_argument("--motor", choices=["objetos", "vectorizado"], default="objetos", help="motor de simulación headless")
+    parser.add_argument("--masivo", type=int, nargs=4, metavar=("ANCHO", "ALTO", "CIVILES", "ZOMBIES"),
+                        help="mundo vectorizado generado de ese tamaño (implica --motor vectorizado)")
+    parser.add_argument("--fragmentos", type=int, nargs=2, metavar=("BLOQUES_X", "BLOQUES_Y"),
+                        help="repartir el mundo vectorizado en bloques, un proceso por bloque (implica --motor vectorizado)")
+    parser.add_argument("--montecarlo", type=int, metavar="CORRIDAS",
+                        help="corridas del escenario predeterminado en paralelo (semillas desde --semilla) y resumen")
+    parser.add_argument("--perfilar", metavar="RUTA",
+                        help="en modo headless, medir cada fase del turno y volcarlo a RUTA (.json o .csv)")
+    parser.add_argument("--metricas", metavar="RUTA",
+                        help="en modo headless, guardar por turno civiles, zombis y recursos en RUTA (.csv o .npz)")
+    parser.add_argument("--grabar", metavar="RUTA",
+                        help="en modo headless, grabar un frame por turno: directorio para PNG o archivo .rgb de vídeo crudo")
+    parser.add_argument("--escala", type=int, default=1, metavar="PIXELES", help="píxeles por celda en --grabar")
+    parser.add_argument("--grabar-cada", type=int, default=1, metavar="TURNOS", help="grabar un frame cada TURNOS turnos")
+    parser.add_argument("--bifurcar", type=int, metavar="CONTINUACIONES",
+                        help="simular --desde turnos, tomar una instantánea y seguirla con tantas semillas nuevas en paralelo")
+    parser.add_argument("--desde", type=int, default=100, metavar="TURNOS", help="turnos antes de la instantánea de --bifurcar")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos para --montecarlo (por defecto, uno por núcleo)")
+    parser.add_argument("--dirigido", type=int, nargs="?", const=10, metavar="RADIO",
+                        help="los roles buscan a su objetivo más cercano dentro de RADIO celdas (10 por defecto) en vez de moverse al azar")
+    parser.add_argument("--flujo", type=int, nargs="?", const=5, metavar="CADA",
+                        help="los zombis siguen un campo de flujo hacia los civiles, recalculado cada CADA turnos (5 por defecto)")
+    args = parser.parse_args(argv)
+
+    configuracion = CONFIGURACION_PREDETERMINADA
+    if args.dirigido:
+        configuracion = dict(configuracion, movimiento_dirigido=args.dirigido)
+    if args.flujo:
+        configuracion = dict(configuracion, campo_flujo=args.flujo)
+
+    if args.montecarlo:
+        primera = args.semilla if args.semilla is not None else 0
+        resumenes = []
+        for resumen in correr_montecarlo(configuracion, range(primera, primera + args.montecarlo),
+                                         args.turnos, args.procesos):
+            resumenes.append(resumen)
+            print(f"[MonteCarlo] semilla {resumen['semilla']}: {resumen['turnos_sobrevividos']} turnos, "
+                  f"civiles vivos {resumen['civiles_vivos']}, muertes {resumen['muertes_por_color']}")
+        total = agregar_montecarlo(resumenes)
+        print(f"[MonteCarlo] {total['corridas']} corridas: supervivencia {total['probabilidad_supervivencia']:.1%}, "
+              f"turnos medios {total['turnos_sobrevividos_medio']:.1f}")
+        for clave in ("infecciones", "muertes_por_color", "zombies_abatidos", "recursos_recolectados"):
+            print(f"  {clave} (media): {total[clave + '_medio']}")
+        return
+
+    if args.bifurcar:
+        primera = args.semilla if args.semilla is not None else 0
+        escenario = construir_escenario(configuracion, primera)
+        for _ in range(args.desde):
+            escenario.simular_turno()
+        instantanea = escenario.instantanea()
+        # la primera continuación sigue la secuencia aleatoria original y sirve de referencia
+        variantes = [{"semilla": None}] + [{"semilla": primera + 1 + i} for i in range(args.bifurcar)]
+        resultados = []
+        for resultado in bifurcar(instantanea, variantes, args.turnos, args.procesos):
+            resultados.append(resultado)
+            print(f"[Bifurcación] semilla {resultado['variante']['semilla']}: civiles vivos {resultado['civiles'][-1]}, "
+                  f"zombis {resultado['zombies'][-1]} ({resultado['segundos']:.2f}s)")
+        resumen = resumir_divergencia(resultados)
+        print(f"[Bifurcación] {resumen['continuaciones']} continuaciones desde el turno {args.desde}: "
+              f"civiles al final {resumen['civiles_final_media']:.1f} ± {resumen['civiles_final_desviacion']:.1f}, "
+              f"zombis {resumen['zombies_final_media']:.1f} ± {resumen['zombies_final_desviacion']:.1f}")
+        for variante in resumen["variantes"][1:]:
+            print(f"  semilla {variante['variante']['semilla']}: se separa en el turno {variante['primer_turno_distinto']}, "
+                  f"diferencia máxima {variante['diferencia_maxima_civiles']} civiles / {variante['diferencia_maxima_zombies']} zombis")
+        return
+
+    if args.headless:
+        correr_headless(args.turnos, args.repeticiones, args.semilla, args.detener_sin_civiles, args.motor, args.masivo,
+                        args.fragmentos, args.perfilar, configuracion, args.metricas, args.grabar, args.escala,
+                        args.grabar_cada)
+        return
+
+    try:
+        cargar_pygame()
+    except ImportError:
+        parser.error("pygame no está instalado; usa --headless para simular sin ventana")
+
+    escenario = construir_escenario(configuracion, args.semilla)
+
+    # Crear jugador
+    jugador = Jugador(posicion_x=24, posicion_y=24)
+    escenario.agregar_personaje(jugador)
+
+    # Iniciar vista
     ancho_total = 1200
     alto_total = 800
     vista = Vista(escenario, jugador, ancho_ventana=ancho_total, alto_ventana=alto_total)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+if __name__ == "__main__":
+    main()
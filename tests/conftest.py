@@ -0,0 +1,35 @@
+import os
+import sys
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+
+import pytest
+
+# sin ventana: pygame dibuja en memoria
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_GEOZ = os.path.join(CARPETA, "GeoZ Definitivo.py")
+RUTA_GEOZ_V1 = os.path.join(CARPETA, "GeoZ v1 definitivo.0")
+
+
+def cargar_modulo(ruta:str, nombre:str):
+    """Importa un script del proyecto por ruta (los nombres llevan espacios y el v1 no termina en .py)."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    cargador = SourceFileLoader(nombre, ruta)
+    modulo = module_from_spec(spec_from_loader(nombre, cargador))
+    sys.modules[nombre] = modulo
+    cargador.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture(scope="session")
+def geoz():
+    return cargar_modulo(RUTA_GEOZ, "geoz")
+
+
+@pytest.fixture(scope="session")
+def geoz_v1():
+    return cargar_modulo(RUTA_GEOZ_V1, "geoz_v1")
@@ -0,0 +1,86 @@
+from collections import Counter
+
+import pytest
+
+
+def test_turno_intercalado_en_orden_del_registro(geoz, monkeypatch):
+    escenario = geoz.Escenario(30, 30, semilla=1)
+    clases = [geoz.Verde, geoz.Medico, geoz.Morado, geoz.Civil_Normal, geoz.Amarillo, geoz.Atacante]
+    for i in range(12):
+        # cada uno en su celda y lejos de los demás: nadie actúa sobre nadie
+        escenario.agregar_personaje(clases[i % len(clases)](posicion_x=2 * i + 1, posicion_y=(i % 3) * 10 + 1))
+    movidos = []
+    monkeypatch.setattr(geoz.Personaje, "mover_aleatorio", lambda personaje, _: movidos.append(personaje.id))
+    escenario.simular_turno()
+    assert movidos == [p.id for p in escenario.personajes]
+
+
+def test_subclase_de_civil_usa_la_accion_de_su_rol(geoz):
+    class MedicoRural(geoz.Medico):
+        __slots__ = ()
+
+    escenario = geoz.Escenario(5, 5, semilla=1)
+    assert escenario._accion_de(MedicoRural) is escenario._acciones[geoz.Medico]
+    escenario.agregar_personaje(MedicoRural(posicion_x=2, posicion_y=2))
+    assert MedicoRural in escenario.civiles_por_rol
+
+
+@pytest.mark.parametrize("semilla", [2, 9])
+def test_contadores_y_colecciones_siguen_al_tablero(geoz, semilla):
+    escenario = geoz.crear_escenario_predeterminado(semilla)
+    for _ in range(40):
+        escenario.simular_turno()
+        poblacion = Counter()
+        for celda in escenario.celdas():
+            claves = Counter(e.clave_conteo() for e in celda.entidades if e.familia is not None)
+            assert (celda.civiles_sanos, celda.civiles_infectados, celda.zombies_vivos) == \
+                   (claves["sano"], claves["infectado"], claves["zombi"])
+            assert list(celda.civiles) == [e for e in celda.entidades if e.familia == "civiles"]
+            assert list(celda.zombies) == [e for e in celda.entidades if e.familia == "zombies"]
+            for e in celda.entidades:
+                if e.familia is not None:
+                    poblacion[type(e), e.clave_conteo()] += 1
+        assert +escenario.poblacion == poblacion
+        vivos = {p for p in escenario.personajes}
+        assert {p for conjunto in escenario.por_tipo.values() for p in conjunto} == vivos
+        for clase, conjunto in escenario.por_tipo.items():
+            assert all(type(p) is clase for p in conjunto)
+
+
+def test_registro_borra_intercambiando_con_el_ultimo(geoz):
+    registro = geoz.RegistroPersonajes()
+    personajes = [geoz.Civil_Normal(posicion_x=i, posicion_y=0) for i in range(5)]
+    for p in personajes:
+        registro.append(p)
+    assert [p.id for p in registro] == [0, 1, 2, 3, 4]
+
+    registro.remove(personajes[1])
+    # el último ocupa el hueco; los ids no cambian
+    assert list(registro) == [personajes[0], personajes[4], personajes[2], personajes[3]]
+    assert registro.obtener(4) is personajes[4]
+    assert registro.obtener(1) is None
+    assert personajes[1] not in registro and len(registro) == 4
+
+    registro.remove(personajes[3])  # era el último: no se mueve nadie
+    assert list(registro) == [personajes[0], personajes[4], personajes[2]]
+    with pytest.raises(ValueError):
+        registro.remove(personajes[3])
+    registro.discard(personajes[3])
+
+    # un alta nueva no reutiliza ids
+    nuevo = geoz.Verde(posicion_x=0, posicion_y=0)
+    registro.append(nuevo)
+    assert nuevo.id == 5 and registro[-1] is nuevo
+
+
+def test_eliminar_personaje_lo_quita_de_todas_partes(geoz):
+    escenario = geoz.Escenario(4, 4, semilla=1)
+    civiles = [geoz.Civil_Normal(posicion_x=1, posicion_y=1) for _ in range(3)]
+    for civil in civiles:
+        escenario.agregar_personaje(civil)
+    escenario.eliminar_personaje(civiles[0])
+    celda = escenario.tablero[1][1]
+    assert list(celda.entidades) == civiles[1:]
+    assert celda.civiles_sanos == 2
+    assert civiles[0] not in escenario.personajes
+    assert civiles[0] not in escenario.por_tipo[geoz.Civil_Normal]
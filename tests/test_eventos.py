@@ -0,0 +1,105 @@
+def registrar_curas(geoz, buffer, n, desde=0):
+    for i in range(desde, desde + n):
+        buffer.registrar(geoz.EV_CURA, i, i + 100, geoz.Civil_Normal, i, 0)
+
+
+def test_turno_formatea_como_la_lista_de_antes(geoz):
+    buffer = geoz.BufferEventos(capacidad=8)
+    buffer.iniciar_turno()
+    buffer.registrar(geoz.EV_RECOLECCION, 3, None, "agua", 1, 2, 4)
+    buffer.registrar(geoz.EV_ATAQUE, 5, 7, geoz.Verde, 0, 1, 2.5)
+    turno = buffer.cerrar_turno()
+    assert list(turno) == [("Productores", "Productor en (1,2) recolecta 4x agua."),
+                           ("Atacantes", "Atacante en (0,1) ataca Verde (-2.5 vida).")]
+    assert turno[1] == list(turno)[1]
+    assert turno.registros()[0] == (geoz.EV_RECOLECCION, 3, -1, "agua", 1, 2, 4.0)
+
+
+def test_anillo_pisa_los_eventos_mas_antiguos(geoz):
+    buffer = geoz.BufferEventos(capacidad=4)
+    buffer.iniciar_turno()
+    registrar_curas(geoz, buffer, 6)
+    turno = buffer.cerrar_turno()
+    # len cuenta los 6, pero solo quedan los 4 últimos
+    assert len(turno) == 6
+    assert [registro[1] for registro in turno.registros()] == [2, 3, 4, 5]
+    assert not buffer.disponible(1) and buffer.disponible(2) and not buffer.disponible(6)
+
+    buffer.iniciar_turno()
+    registrar_curas(geoz, buffer, 3, desde=6)
+    siguiente = buffer.cerrar_turno()
+    assert [registro[1] for registro in siguiente.registros()] == [6, 7, 8]
+    # del turno anterior solo sobrevive el último evento
+    assert [registro[1] for registro in turno.registros()] == [5]
+
+
+def test_filtrar_y_suscriptores_por_categoria(geoz):
+    buffer = geoz.BufferEventos()
+    recibidos = []
+    buffer.suscribir(lambda turno: recibidos.append(list(turno)), categorias=["Zombie_Morado"])
+    todos = []
+    funcion = buffer.suscribir(lambda turno: todos.append(len(turno)))
+    buffer.iniciar_turno()
+    registrar_curas(geoz, buffer, 2)
+    buffer.registrar(geoz.EV_APLASTAMIENTO, 9, 1, geoz.Medico, 3, 3)
+    turno = buffer.cerrar_turno()
+
+    assert recibidos == [[("Zombie_Morado", "Zombi Morado aplasta a Medico en (3,3).")]]
+    assert todos == [3]
+    assert turno.contar() == {"Medicos": 2, "Zombie_Morado": 1}
+    medicos = turno.filtrar(["Medicos"])
+    assert len(medicos) == 2 and medicos.contar() == {"Medicos": 2}
+
+    buffer.desuscribir(funcion)
+    buffer.iniciar_turno()
+    buffer.cerrar_turno()
+    assert todos == [3] and recibidos[-1] == []
+
+
+def test_eventos_del_escenario_coinciden_con_estadisticas(geoz):
+    escenario = geoz.Escenario(12, 12, semilla=4)
+    escenario.poblar_ciudad(10, 0, 0, 0, 0, 10, 3, 3, 6, 6)
+    escenario.poblar_zona_zombie(8, 2, 2, 8, 8)
+    infecciones = {"Verde": 0, "Amarillo": 0}
+    for _ in range(20):
+        for tipo, _, _, _, _, _, valor in escenario.simular_turno().registros():
+            if tipo == geoz.EV_INFECCION_VERDE:
+                infecciones["Verde"] += 1
+            elif tipo == geoz.EV_INFECCION_AMARILLO:
+                infecciones["Amarillo"] += int(valor)
+    assert sum(infecciones.values()) > 0
+    assert infecciones == {color: escenario.estadisticas["infecciones"][color] for color in infecciones}
+
+
+def test_registro_de_mensajes_guarda_los_ultimos(geoz):
+    registro = geoz.RegistroMensajes(3)
+    version = registro.version
+    for i in range(5):
+        registro.agregar(f"m{i}")
+    assert list(registro) == ["m2", "m3", "m4"] and len(registro) == 3
+    assert registro.ultimos(2) == ["m4", "m3"]
+    assert registro.por_categoria == {"Jugador": 5}
+    assert registro.version == version + 5
+
+    registro.agregar_turno([("General", "g0"), ("Medicos", "c0")])
+    assert list(registro) == ["m4", "g0", "c0"]
+    assert registro.por_categoria == {"Jugador": 5, "General": 1, "Medicos": 1}
+    version = registro.version
+    registro.agregar_turno([])
+    assert registro.version == version
+
+
+def test_registro_de_mensajes_solo_formatea_lo_que_cabe(geoz, monkeypatch):
+    buffer = geoz.BufferEventos()
+    buffer.iniciar_turno()
+    registrar_curas(geoz, buffer, 500)
+    turno = buffer.cerrar_turno()
+    formateados = []
+    mensaje = buffer.mensaje
+    monkeypatch.setattr(buffer, "mensaje", lambda n: formateados.append(n) or mensaje(n))
+
+    registro = geoz.RegistroMensajes(20)
+    registro.agregar_turno(turno)
+    assert formateados == list(range(480, 500))
+    assert registro.por_categoria == {"Medicos": 500}
+    assert registro.ultimos(1) == ["Médico cura a Civil_Normal en (499,0)."]
@@ -0,0 +1,78 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+import pygame
+import pytest
+
+
+def leer_png(datos:bytes):
+    """Decodificador mínimo para los PNG de codificar_png: comprueba los CRC y devuelve (cabecera, imagen)."""
+    assert datos[:8] == b"\x89PNG\r\n\x1a\n"
+    bloques = []
+    i = 8
+    while i < len(datos):
+        (largo,) = struct.unpack(">I", datos[i:i + 4])
+        tipo, contenido = datos[i + 4:i + 8], datos[i + 8:i + 8 + largo]
+        (crc,) = struct.unpack(">I", datos[i + 8 + largo:i + 12 + largo])
+        assert crc == zlib.crc32(tipo + contenido) & 0xFFFFFFFF, tipo
+        bloques.append((tipo, contenido))
+        i += 12 + largo
+    assert [tipo for tipo, _ in bloques] == [b"IHDR", b"IDAT", b"IEND"]
+    cabecera = struct.unpack(">IIBBBBB", bloques[0][1])
+    ancho, alto = cabecera[:2]
+    filas = np.frombuffer(zlib.decompress(bloques[1][1]), dtype=np.uint8).reshape(alto, ancho * 3 + 1)
+    assert (filas[:, 0] == 0).all()
+    return cabecera, filas[:, 1:].reshape(alto, ancho, 3)
+
+
+@pytest.mark.parametrize("alto, ancho", [(1, 1), (7, 13), (32, 5)])
+def test_codificar_png_sin_perdidas(geoz, alto, ancho):
+    imagen = np.random.default_rng(alto * ancho).integers(0, 256, (alto, ancho, 3), dtype=np.uint8)
+    cabecera, leida = leer_png(geoz.codificar_png(imagen))
+    assert cabecera == (ancho, alto, 8, 2, 0, 0, 0)
+    assert np.array_equal(leida, imagen)
+
+
+def test_png_legible_por_pygame(geoz, tmp_path):
+    imagen = np.random.default_rng(1).integers(0, 256, (9, 6, 3), dtype=np.uint8)
+    ruta = tmp_path / "frame.png"
+    ruta.write_bytes(geoz.codificar_png(imagen, nivel=9))
+    superficie = pygame.image.load(str(ruta))
+    assert superficie.get_size() == (6, 9)
+    # array3d indexa (x, y); la imagen es (y, x)
+    assert np.array_equal(pygame.surfarray.array3d(superficie).transpose(1, 0, 2), imagen)
+
+
+def test_grabador_escribe_un_png_por_frame(geoz, tmp_path):
+    escenario = geoz.crear_escenario_predeterminado(3)
+    carpeta = tmp_path / "frames"
+    renderizador = geoz.RenderizadorRGB(escala=2)
+    esperados = []
+    with geoz.GrabadorFrames(str(carpeta), escala=2, cada=2) as grabador:
+        for _ in range(6):
+            escenario.simular_turno()
+            if grabador.turnos % 2 == 0:
+                esperados.append(renderizador.renderizar(escenario))
+            grabador.capturar(escenario)
+    assert grabador.frames == 3
+    archivos = sorted(os.listdir(carpeta))
+    assert archivos == [f"frame_{i:06d}.png" for i in range(3)]
+    for archivo, esperado in zip(archivos, esperados):
+        _, imagen = leer_png((carpeta / archivo).read_bytes())
+        assert imagen.shape == (escenario.alto * 2, escenario.ancho * 2, 3)
+        assert np.array_equal(imagen, esperado)
+
+
+def test_grabador_crudo_concatena_frames(geoz, tmp_path):
+    escenario = geoz.crear_escenario_predeterminado(3)
+    ruta = tmp_path / "video.rgb"
+    with geoz.GrabadorFrames(str(ruta)) as grabador:
+        for _ in range(4):
+            escenario.simular_turno()
+            grabador.capturar(escenario)
+    ultimo = geoz.RenderizadorRGB().renderizar(escenario)
+    datos = ruta.read_bytes()
+    assert len(datos) == 4 * ultimo.nbytes
+    assert datos[-ultimo.nbytes:] == ultimo.tobytes()
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+
+def mas_cercano_a_mano(escenario, x, y, radio):
+    distancias = [max(abs(p.posicion_x - x), abs(p.posicion_y - y)) for p in escenario.personajes]
+    distancias = [d for d in distancias if d <= radio]
+    return min(distancias) if distancias else None
+
+
+@pytest.mark.parametrize("lado_cubo", [1, 3, 8])
+@pytest.mark.parametrize("radio", [4, 10, 25])
+def test_mas_cercano_igual_que_recorrer_todo(geoz, lado_cubo, radio):
+    azar = random.Random(lado_cubo * 100 + radio)
+    escenario = geoz.Escenario(40, 40, semilla=1)
+    for _ in range(15):
+        escenario.agregar_personaje(geoz.Civil_Normal(posicion_x=azar.randrange(40), posicion_y=azar.randrange(40)))
+    indice = escenario.activar_movimiento_dirigido(radio=radio, lado_cubo=lado_cubo)
+    for _ in range(200):
+        x, y = azar.randrange(40), azar.randrange(40)
+        celda = indice.mas_cercano(x, y, "civil", radio)
+        esperada = mas_cercano_a_mano(escenario, x, y, radio)
+        if esperada is None:
+            assert celda is None
+        else:
+            assert max(abs(celda.posicion_x - x), abs(celda.posicion_y - y)) == esperada
+
+
+def test_mas_cercano_deja_de_buscar_cuando_no_puede_mejorar(geoz, monkeypatch):
+    escenario = geoz.Escenario(64, 64, semilla=1)
+    for x, y in ((9, 9), (5, 15), (24, 15)):
+        escenario.agregar_personaje(geoz.Civil_Normal(posicion_x=x, posicion_y=y))
+    indice = escenario.activar_movimiento_dirigido(radio=60, lado_cubo=8)
+    anillos = []
+    original = indice._anillo
+    monkeypatch.setattr(indice, "_anillo", lambda cx, cy, d: anillos.append(d) or original(cx, cy, d))
+
+    def buscar(x, y, radio=60):
+        anillos.clear()
+        celda = indice.mas_cercano(x, y, "civil", radio)
+        return (celda.posicion_x, celda.posicion_y) if celda else None, list(anillos)
+
+    # en la propia celda basta el anillo 0
+    assert buscar(9, 9) == ((9, 9), [0])
+    # a 2 pasos en el cubo vecino: el anillo 2 empieza a 9 pasos como mínimo
+    assert buscar(7, 7) == ((9, 9), [0, 1])
+    # desde (15, 15) el anillo 1 solo da (9, 9) a 6 pasos: se corta tras él
+    assert buscar(15, 15) == ((9, 9), [0, 1])
+    # límite justo: lo mejor del anillo 1 está a 10 pasos y el anillo 2 tiene uno a 9, el mínimo posible
+    escenario.eliminar_personaje(next(p for p in escenario.personajes if (p.posicion_x, p.posicion_y) == (9, 9)))
+    assert buscar(15, 15) == ((24, 15), [0, 1, 2])
+    # sin nada al alcance se recorren todos los anillos que caben en el radio
+    assert buscar(40, 40, radio=5) == (None, [0, 1])
+
+
+def test_indice_sigue_a_los_civiles_al_moverse(geoz):
+    escenario = geoz.Escenario(20, 20, semilla=1)
+    civil = geoz.Civil_Normal(posicion_x=2, posicion_y=2)
+    escenario.agregar_personaje(civil)
+    indice = escenario.activar_movimiento_dirigido(radio=30, lado_cubo=4)
+    escenario.mover_personaje(civil, 15, 15)
+    celda = indice.mas_cercano(0, 0, "civil", 30)
+    assert (celda.posicion_x, celda.posicion_y) == (15, 15)
+    civil.infectar("Verde")
+    assert indice.mas_cercano(0, 0, "infectado", 30) is celda
+    escenario.eliminar_personaje(civil)
+    assert indice.mas_cercano(0, 0, "civil", 30) is None
@@ -0,0 +1,67 @@
+import itertools
+
+import numpy as np
+import pytest
+
+OPCIONES = {
+    "movimiento_dirigido": 10,
+    "campo_flujo": 3,
+    "regeneracion_recursos": {"agua": (2, 60), "madera": (1, 50)},
+}
+COMBINACIONES = [dict(zip(OPCIONES, activas)) for activas in itertools.product((False, True), repeat=len(OPCIONES))]
+
+
+def estado(geoz, escenario):
+    """Todo lo que decide los turnos siguientes, en un valor comparable."""
+    personajes = [(type(p).__name__, tuple(repr(getattr(p, nombre)) for nombre in geoz._atributos_personaje(type(p))))
+                  for p in escenario.personajes]
+    celdas = sorted((c.posicion_x, c.posicion_y, tuple(p.id for p in c.entidades))
+                    for c in escenario.celdas() if c.entidades)
+    recursos = {tipo: plano.tobytes() for tipo, plano in escenario.recursos.planos.items()}
+    por_tipo = [(clase.__name__, [p.id for p in conjunto]) for clase, conjunto in escenario.por_tipo.items()]
+    estadisticas = {clave: dict(contador) for clave, contador in escenario.estadisticas.items()}
+    return personajes, celdas, recursos, por_tipo, estadisticas
+
+
+def con_opciones(geoz, activas):
+    escenario = geoz.crear_escenario_predeterminado(5)
+    geoz.aplicar_opciones(escenario, {clave: OPCIONES[clave] for clave, activa in activas.items() if activa})
+    for _ in range(10):
+        escenario.simular_turno()
+    return escenario
+
+
+@pytest.mark.parametrize("activas", COMBINACIONES, ids=lambda a: "+".join(k for k, v in a.items() if v) or "base")
+def test_restaurar_sigue_igual_que_el_original(geoz, activas):
+    original = con_opciones(geoz, activas)
+    instantanea = original.instantanea()
+    inicial = estado(geoz, original)
+    copia = instantanea.restaurar()
+    assert estado(geoz, copia) == inicial
+    for turno in range(1, 41):
+        assert copia.simular_turno().registros() == original.simular_turno().registros(), turno
+        if turno % 8 == 0:
+            assert estado(geoz, copia) == estado(geoz, original), turno
+    # la instantánea no se gasta: otra copia vuelve a empezar desde el turno 10
+    assert estado(geoz, instantanea.restaurar()) == inicial
+
+
+def test_restaurar_con_otra_semilla_se_separa(geoz):
+    original = con_opciones(geoz, {})
+    instantanea = original.instantanea()
+    inicial = estado(geoz, original)
+    copia = instantanea.restaurar(semilla=99)
+    assert estado(geoz, copia) == inicial
+    for _ in range(5):
+        copia.simular_turno()
+        original.simular_turno()
+    assert estado(geoz, copia) != estado(geoz, original)
+
+
+def test_restaurar_con_opciones_nuevas(geoz):
+    instantanea = con_opciones(geoz, {}).instantanea()
+    copia = instantanea.restaurar(opciones={"campo_flujo": 2, "regeneracion_recursos": {"madera": (1, 50)}})
+    assert copia.campo_flujo is not None and copia.campo_flujo.cada == 2
+    assert "madera" in copia.recursos.regeneracion
+    assert instantanea.restaurar().campo_flujo is None
+    assert np.array_equal(copia.terreno, instantanea.terreno)
@@ -0,0 +1,68 @@
+import csv
+
+import numpy as np
+
+
+def fila_a_mano(geoz, escenario, metricas):
+    """La fila que debería registrar MetricasBrote, contada recorriendo a los personajes."""
+    vivos = [p for p in escenario.personajes if p.con_vida]
+    fila = {}
+    for rol in metricas.roles:
+        sanos = sum(1 for p in vivos if type(p) is rol and not p.estado)
+        infectados = sum(1 for p in vivos if type(p) is rol and p.estado)
+        fila[f"{rol.__name__}_sanos"] = sanos
+        fila[f"{rol.__name__}_infectados"] = infectados
+        fila[f"{rol.__name__}_muertos"] = escenario.altas[rol] - sanos - infectados
+    for color in metricas.colores:
+        fila[f"zombies_{color.__name__}"] = sum(1 for p in vivos if type(p) is color)
+    for tipo in metricas.tipos_recurso:
+        plano = escenario.recursos.planos.get(tipo)
+        fila[f"recurso_{tipo}"] = 0 if plano is None else int(plano.sum())
+    return fila
+
+
+def escenario_denso(geoz):
+    escenario = geoz.Escenario(12, 12, semilla=4)
+    escenario.definir_bosque(3, 3, 6, 6)
+    escenario.poblar_ciudad(6, 2, 2, 4, 2, 4, 3, 3, 6, 6)
+    escenario.poblar_zona_zombie(10, 2, 2, 8, 8)
+    return escenario
+
+
+def test_columnas_coinciden_con_el_tablero(geoz):
+    escenario = escenario_denso(geoz)
+    metricas = escenario.activar_metricas(capacidad=4)
+    # la primera fila es el estado al activar
+    esperadas = [fila_a_mano(geoz, escenario, metricas)]
+    for _ in range(30):
+        escenario.simular_turno()
+        esperadas.append(fila_a_mano(geoz, escenario, metricas))
+    # la capacidad inicial se desborda y el array crece sin perder filas
+    assert metricas.n == 31 and len(metricas.datos) >= 31
+    datos = metricas.como_dict()
+    assert datos["turno"].tolist() == list(range(31))
+    for nombre in esperadas[0]:
+        assert datos[nombre].tolist() == [fila[nombre] for fila in esperadas], nombre
+    # el escenario es lo bastante denso para que cambien todas las clases de columna
+    assert sum(datos[f"{rol.__name__}_muertos"][-1] for rol in metricas.roles) > 0
+    assert any(datos[f"{rol.__name__}_infectados"].any() for rol in metricas.roles)
+    assert datos["recurso_madera"][-1] < datos["recurso_madera"][0]
+
+
+def test_exportar_csv_y_npz(geoz, tmp_path):
+    escenario = geoz.crear_escenario_predeterminado(2)
+    metricas = escenario.activar_metricas()
+    for _ in range(5):
+        escenario.simular_turno()
+
+    metricas.exportar(str(tmp_path / "brote.csv"))
+    with open(tmp_path / "brote.csv", newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    assert filas[0] == metricas.columnas
+    assert [[int(v) for v in fila] for fila in filas[1:]] == metricas.datos[:metricas.n].tolist()
+
+    metricas.exportar(str(tmp_path / "brote.npz"))
+    leidas = geoz.MetricasBrote.leer(str(tmp_path / "brote.npz"))
+    assert list(leidas) == metricas.columnas
+    for nombre, serie in metricas.como_dict().items():
+        assert np.array_equal(leidas[nombre], serie)
@@ -0,0 +1,121 @@
+import os
+import random
+
+import pytest
+
+
+def foto(geoz_v1, escenario, jugador):
+    """Estado completo del mundo como (cabecera, bytes de cada columna)."""
+    cabecera, columnas = geoz_v1.capturar_columnas(escenario, jugador)
+    return cabecera, {nombre: datos.tobytes() for nombre, datos in columnas.items()}
+
+
+@pytest.fixture
+def partida(geoz_v1):
+    random.seed(3)
+    escenario = geoz_v1.crear_escenario_predeterminado()
+    jugador = geoz_v1.Jugador(posicion_x=24, posicion_y=24)
+    escenario.agregar_personaje(jugador)
+    for _ in range(20):
+        escenario.simular_turno()
+    return escenario, jugador
+
+
+@pytest.mark.parametrize("comprimir", [False, True])
+def test_guardar_y_cargar_slot_exacto(geoz_v1, partida, tmp_path, comprimir):
+    escenario, jugador = partida
+    persistencia = geoz_v1.Persistencia(str(tmp_path / "saves"), comprimir=comprimir)
+    assert persistencia.guarda_slot(0, escenario, jugador, ciclo=20)
+    cargado, jugador_cargado = persistencia.rescatar_slot(0)
+    assert foto(geoz_v1, cargado, jugador_cargado) == foto(geoz_v1, escenario, jugador)
+
+
+def test_autoguardado_en_segundo_plano_exacto(geoz_v1, partida, tmp_path):
+    escenario, jugador = partida
+    persistencia = geoz_v1.Persistencia(str(tmp_path / "saves"))
+    autoguardado = geoz_v1.AutoguardadoSegundoPlano(persistencia)
+    try:
+        assert autoguardado.entregar(1, escenario, jugador, ciclo=20)
+        assert autoguardado.esperar(timeout=30)
+        informes = autoguardado.resultados()
+    finally:
+        autoguardado.cerrar()
+    assert [informe["ok"] for informe in informes] == [True]
+    cargado, jugador_cargado = persistencia.rescatar_slot(1)
+    assert foto(geoz_v1, cargado, jugador_cargado) == foto(geoz_v1, escenario, jugador)
+
+
+def test_limpiar_temporales(geoz_v1, tmp_path):
+    persistencia = geoz_v1.Persistencia(str(tmp_path / "saves"))
+    temporal = os.path.join(persistencia.carpeta, "slot.tmp")
+    open(temporal, "w").close()
+    persistencia.limpiar_temporales()
+    assert not os.path.exists(temporal)
+
+
+def test_diario_rebobina_al_estado_exacto(geoz_v1, partida, tmp_path):
+    escenario, jugador = partida
+    diario = geoz_v1.DiarioPartida(str(tmp_path / "diario"), puntos_cada=10)
+    fotos = {}
+    try:
+        for turno in range(1, 36):
+            escenario.simular_turno()
+            diario.registrar_turno(escenario, jugador, turno)
+            fotos[turno] = foto(geoz_v1, escenario, jugador)
+        # a ambos lados de los puntos de control (turnos 1, 11, 21, 31)
+        for turno in (1, 10, 11, 12, 25, 35):
+            restaurado, jugador_restaurado, alcanzado = diario.restaurar(turno)
+            assert alcanzado == turno
+            assert foto(geoz_v1, restaurado, jugador_restaurado) == fotos[turno]
+
+        # seguir jugando después de rebobinar descarta lo posterior y anota la nueva rama
+        escenario, jugador, _ = diario.restaurar(15)
+        for turno in range(16, 26):
+            escenario.simular_turno()
+            diario.registrar_turno(escenario, jugador, turno)
+            fotos[turno] = foto(geoz_v1, escenario, jugador)
+        for turno in (15, 20, 25):
+            restaurado, jugador_restaurado, _ = diario.restaurar(turno)
+            assert foto(geoz_v1, restaurado, jugador_restaurado) == fotos[turno]
+    finally:
+        diario.cerrar()
+
+
+@pytest.fixture
+def controlador(geoz_v1, tmp_path, monkeypatch):
+    # el Controlador guarda en ./saves
+    monkeypatch.chdir(tmp_path)
+    controlador = geoz_v1.Controlador()
+    yield controlador
+    controlador.cerrar()
+
+
+def test_autoguardado_no_pisa_un_guardado_manual(geoz_v1, partida, controlador):
+    escenario, jugador = partida
+    controlador.configurar_autoguardado(2)
+    assert controlador.guardar_partida_en_slot(0, escenario, jugador)
+    manual = foto(geoz_v1, escenario, jugador)
+    vueltas = controlador.autoguardado_n * controlador.persistencia.max_slots * 2
+    for _ in range(vueltas):
+        controlador.avanzar_turno(escenario, jugador)
+        controlador.esperar_autoguardado()
+    cargado, jugador_cargado = controlador.rescatar_slot(0)
+    assert foto(geoz_v1, cargado, jugador_cargado) == manual
+    index = controlador.listar_saves()
+    assert not index[0]['automatico']
+    # los otros dos slots se turnan los autoguardados y el último es el del turno final
+    assert all(meta['automatico'] for meta in index[1:])
+    assert max(meta['ciclo'] for meta in index[1:]) == vueltas
+
+
+def test_autoguardado_se_omite_si_todos_los_slots_son_manuales(geoz_v1, partida, controlador):
+    escenario, jugador = partida
+    controlador.configurar_autoguardado(1)
+    for slot in range(controlador.persistencia.max_slots):
+        assert controlador.guardar_partida_en_slot(slot, escenario, jugador)
+    antes = [meta['fecha'] for meta in controlador.listar_saves()]
+    for _ in range(3):
+        controlador.avanzar_turno(escenario, jugador)
+        controlador.esperar_autoguardado()
+    assert [meta['fecha'] for meta in controlador.listar_saves()] == antes
+    assert controlador.autoguardados_aplazados == 0
@@ -0,0 +1,27 @@
+import ast
+
+import pytest
+
+from conftest import RUTA_GEOZ, RUTA_GEOZ_V1
+
+
+def fuente_de_clase(ruta:str, nombre:str):
+    with open(ruta, encoding="utf-8") as f:
+        texto = f.read().replace("\r\n", "\n")
+    for nodo in ast.parse(texto).body:
+        if isinstance(nodo, ast.ClassDef) and nodo.name == nombre:
+            return "\n".join(texto.split("\n")[nodo.lineno - 1:nodo.end_lineno])
+    raise AssertionError(f"{nombre} no está en {ruta}")
+
+
+def test_copias_del_planificador_iguales():
+    # los dos scripts se ejecutan por separado y llevan cada uno su copia de la clase
+    assert fuente_de_clase(RUTA_GEOZ, "PlanificadorTurnos") == fuente_de_clase(RUTA_GEOZ_V1, "PlanificadorTurnos")
+
+
+def test_turnos_por_tiempo_real(geoz):
+    planificador = geoz.PlanificadorTurnos(turnos_por_segundo=10, fps_max=60)
+    hechos = []
+    for _ in range(60):
+        planificador.ejecutar(1 / 60, lambda: hechos.append(1))
+    assert len(hechos) == pytest.approx(10, abs=1)
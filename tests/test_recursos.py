@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def test_tomar_y_vaciar_siguen_el_orden_de_los_planos(geoz):
+    recursos = geoz.CampoRecursos(geoz.MapaTerreno(4, 4))
+    recursos.agregar("madera", 1, 1, 3)
+    recursos.agregar("agua", 1, 1, 5)
+    assert recursos.tomar(1, 1, 2) == ("madera", 2)
+    assert recursos.tomar(1, 1, 5) == ("madera", 1)
+    assert recursos.tomar(1, 1, 2) == ("agua", 2)
+    assert recursos.totales() == {"madera": 0, "agua": 3}
+    assert recursos.vaciar(1, 1) == "agua"
+    assert not recursos.hay(1, 1)
+    assert recursos.tomar(1, 1, 1) is None and recursos.vaciar(1, 1) is None
+
+
+def test_regeneracion_solo_en_su_terreno_y_hasta_el_maximo(geoz):
+    mapa = geoz.MapaTerreno(6, 6)
+    mapa.rellenar(geoz.Terreno.BOSQUE, 0, 0, 2, 6)
+    recursos = geoz.CampoRecursos(mapa)
+    recursos.agregar("madera", 0, 0, 9)
+    recursos.definir_regeneracion("madera", 4, 10)
+
+    xs, ys = recursos.regenerar(devolver_nuevas=True)
+    plano = recursos.plano("madera")
+    # la celda que tenía 9 llega al tope; las demás del bosque estaban agotadas y vuelven
+    assert plano[0, 0] == 10 and plano[1, 3] == 4
+    assert len(xs) == 11 and (0, 0) not in set(zip(xs.tolist(), ys.tolist()))
+    assert plano[2:].sum() == 0
+    for _ in range(5):
+        recursos.regenerar()
+    assert (plano[:2] == 10).all()
+    assert recursos.restante["madera"] == int(plano.sum()) == 120
+
+    recursos.definir_regeneracion("madera", 0, 10)
+    recursos.tomar(0, 0, 10)
+    recursos.regenerar()
+    assert plano[0, 0] == 0
+
+
+def test_celdas_regeneradas_vuelven_al_indice(geoz):
+    escenario = geoz.Escenario(8, 8, semilla=1)
+    escenario.definir_bosque(5, 5, 1, 1)
+    escenario.activar_movimiento_dirigido(radio=10, lado_cubo=4)
+    escenario.recursos.vaciar(5, 5)
+    assert escenario.indice.mas_cercano(0, 0, "recurso", 10) is None
+    escenario.activar_regeneracion({"madera": (2, 8)})
+    escenario.simular_turno()
+    celda = escenario.indice.mas_cercano(0, 0, "recurso", 10)
+    assert (celda.posicion_x, celda.posicion_y) == (5, 5)
+    assert np.array_equal(escenario.recursos.celdas_con_recurso()[0], [5])
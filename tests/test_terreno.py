@@ -0,0 +1,61 @@
+def test_campo_flujo_rodea_lagos_y_rios(geoz):
+    # muro de agua en x=4 con un único paso en y=4; el civil está en (0, 0)
+    escenario = geoz.Escenario(9, 5, semilla=1)
+    for y in range(4):
+        escenario.mapa.poner(4, y, geoz.Terreno.LAGO if y % 2 else geoz.Terreno.RIO)
+    escenario.agregar_personaje(geoz.Civil_Normal(posicion_x=0, posicion_y=0))
+    campo = geoz.CampoFlujo(alcance=30)
+    campo.actualizar(escenario)
+
+    assert [int(campo.distancia[4, y]) for y in range(4)] == [campo.alcance + 1] * 4
+    assert campo.distancia[4, 4] == 4
+    # en línea recta serían 5 pasos; rodeando por el hueco, 8
+    assert campo.distancia[5, 0] == 8
+
+    x, y = 5, 0
+    recorrido = []
+    while (x, y) != (0, 0):
+        dx, dy = campo.paso(x, y)
+        x, y = x + dx, y + dy
+        assert escenario.mapa.transitable[x, y]
+        recorrido.append((x, y))
+    assert len(recorrido) == 8
+    assert (4, 4) in recorrido
+
+
+def test_mapa_recorta_regiones_y_la_ultima_manda(geoz):
+    mapa = geoz.MapaTerreno(10, 8)
+    lago = mapa.rellenar(geoz.Terreno.LAGO, -2, 6, 5, 5, "lago")
+    assert (lago.x, lago.y, lago.ancho, lago.alto) == (0, 6, 3, 2)
+    mapa.rellenar(geoz.Terreno.BOSQUE, 2, 4, 4, 4, "bosque")
+    assert mapa.region_en(2, 6).nombre == "bosque"
+    assert mapa.region_en(1, 6).nombre == "lago"
+    assert mapa.region_en(9, 0) is None
+    assert mapa.region("lago") is lago
+    assert mapa.tipo_en(2, 6) == geoz.Terreno.BOSQUE
+    assert mapa.contar(geoz.Terreno.LAGO) == 4
+    assert mapa.contar(geoz.Terreno.BOSQUE) == 16
+
+
+def test_consultas_del_mapa_se_recalculan_al_cambiar(geoz):
+    mapa = geoz.MapaTerreno(6, 6)
+    assert mapa.transitable.all()
+    assert mapa.contar(geoz.Terreno.RIO) == 0
+    version = mapa.version
+    mapa.poner(3, 3, geoz.Terreno.RIO)
+    assert mapa.version > version
+    assert not mapa.transitable[3, 3] and mapa.transitable.sum() == 35
+    xs, ys = mapa.celdas_de(geoz.Terreno.RIO)
+    assert (xs.tolist(), ys.tolist()) == ([3], [3])
+    assert mapa.mascara(geoz.Terreno.RIO, geoz.Terreno.CAMPO).all()
+
+
+def test_tipo_de_celda_lee_y_escribe_la_rejilla(geoz):
+    escenario = geoz.Escenario(5, 5, semilla=1)
+    escenario.definir_mina(1, 1, 2, 2, "mina")
+    celda = escenario.tablero[1][2]
+    assert celda.tipo == "mina"
+    celda.tipo = "ciudad"
+    assert escenario.terreno[1, 2] == geoz.Terreno.CIUDAD
+    # la mina deja su mineral aunque luego cambie el terreno
+    assert escenario.recursos.cantidad(1, 2, "mineral") == 30